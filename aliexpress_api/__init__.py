@@ -4,3 +4,4 @@ __author__ = 'Sergio Abad'
 
 from .api import AliexpressApi
 from .api import models
+from .async_api import AsyncAliexpressApi
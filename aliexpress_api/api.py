@@ -5,19 +5,23 @@ to get product information and affiliate links from AliExpress using the officia
 API in an easier way.
 """
 
-from aliexpress_api.errors.exceptions import CategoriesNotFoudException
-from aliexpress_api.helpers.categories import filter_child_categories, filter_parent_categories
 from aliexpress_api.models.category import ChildCategory
-from .skd import setDefaultAppInfo
-from .skd import api as aliapi
-from .errors import ProductsNotFoudException, InvalidTrackingIdException
-from .helpers import api_request, parse_products, get_list_as_string, get_product_ids
+from .base import ApiCall, BaseAliexpressApi
+from .errors import ProductsNotFoudException
+from .helpers import api_request, get_list_as_string, get_product_ids
+from .helpers import PageIterator, ResponseStream
+from .helpers.orders import parse_order
+from .helpers.products import build_product
+from .helpers.requests import decode_object
 from . import models
 
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import List, Union
 
 
-class AliexpressApi:
+class AliexpressApi(BaseAliexpressApi):
     """Provides methods to get information from AliExpress using your API credentials.
 
     Args:
@@ -26,24 +30,32 @@ class AliexpressApi:
         language (str): Language code. Defaults to EN.
         currency (str): Currency code. Defaults to USD.
         tracking_id (str): The tracking id for link generator. Defaults to None.
+        app_signature (str): The app signature. Defaults to None.
+        product_cache (``ProductCache``): Cache for product details. Defaults to None (disabled).
+        category_index (``CategoryIndex``): Index of the category tree. Defaults to a new in-memory index.
+        rate_limiter (``RateLimiter``): Limits the API calls made. Defaults to None (no limit).
+        retry_policy (``RetryPolicy``): Retries transient errors. Defaults to None (no retries).
+        circuit_breaker (``CircuitBreaker``): Fails fast while an API method keeps failing.
+            Defaults to None (disabled).
+        sign_method (str): Request signature, ``'md5'`` or ``'hmac-sha256'``. Defaults to md5.
     """
 
-    def __init__(self,
-        key: str,
-        secret: str,
-        language: models.Language,
-        currency: models.Currency,
-        tracking_id: str = None,
-        app_signature: str = None,
-        **kwargs):
-        self._key = key
-        self._secret = secret
-        self._tracking_id = tracking_id
-        self._language = language
-        self._currency = currency
-        self._app_signature = app_signature
-        self.categories = None
-        setDefaultAppInfo(self._key, self._secret)
+    def _call(self, call: ApiCall):
+        response = api_request(call.request, call.response_name, call.object_hook, self._rate_limiter,
+                               self._retry_policy, self._circuit_breaker)
+        return call.parse(response)
+
+
+    def _response_stream(self, request, response_name, items_path, object_hook=None, parse_item=None):
+        return ResponseStream(request, response_name, items_path, object_hook, parse_item, self._rate_limiter,
+                              self._retry_policy, self._circuit_breaker)
+
+
+    def _page_iterator(self, make_call, page_size, cursor, max_pages, max_items, max_requests_per_second):
+        def fetch_page(page_no):
+            return self._call(self._page_call(make_call(page_no)))
+
+        return PageIterator(fetch_page, page_size, cursor, max_pages, max_items, max_requests_per_second)
 
 
     def get_products_details(self,
@@ -53,6 +65,9 @@ class AliexpressApi:
         **kwargs) -> List[models.Product]:
         """Get products information.
 
+        If a product cache is configured, only the products missing from the cache are
+        requested and the results are returned in the same order as ``product_ids``.
+
         Args:
             product_ids (``str | list[str]``): One or more links or product IDs.
             fields (``str | list[str]``): The fields to include in the results. Defaults to all.
@@ -69,24 +84,20 @@ class AliexpressApi:
             ``ApiRequestResponseException``
         """
         product_ids = get_product_ids(product_ids)
-        product_ids = get_list_as_string(product_ids)
+        fields = get_list_as_string(fields)
 
-        request = aliapi.rest.AliexpressAffiliateProductdetailGetRequest()
-        request.app_signature = self._app_signature
-        request.fields = get_list_as_string(fields)
-        request.product_ids = product_ids
-        request.country = country
-        request.target_currency = self._currency
-        request.target_language = self._language
-        request.tracking_id = self._tracking_id
+        if self._product_cache is None:
+            return self._call(self._products_details_call(product_ids, fields, country))
 
-        response = api_request(request, 'aliexpress_affiliate_productdetail_get_response')
+        cached, missing, request_fields = self._get_cached_products(product_ids, fields, country)
+        if missing:
+            try:
+                products = self._call(self._products_details_call(missing, request_fields, country))
+            except ProductsNotFoudException:
+                products = []
+            self._set_cached_products(missing, products, cached, fields, country)
 
-        if response.current_record_count > 0:
-            response = parse_products(response.products.product)
-            return response
-        else:
-            raise ProductsNotFoudException('No products found with current parameters')
+        return self._merge_cached_products(product_ids, cached)
 
 
     def get_affiliate_links(self,
@@ -110,23 +121,7 @@ class AliexpressApi:
             ``ApiRequestException``
             ``ApiRequestResponseException``
         """
-        if not self._tracking_id:
-            raise InvalidTrackingIdException('The tracking id is required for affiliate links')
-
-        links = get_list_as_string(links)
-
-        request = aliapi.rest.AliexpressAffiliateLinkGenerateRequest()
-        request.app_signature = self._app_signature
-        request.source_values = links
-        request.promotion_link_type = link_type
-        request.tracking_id = self._tracking_id
-
-        response = api_request(request, 'aliexpress_affiliate_link_generate_response')
-
-        if response.total_result_count > 0:
-            return response.promotion_links.promotion_link
-        else:
-            raise ProductsNotFoudException('Affiliate links not available')
+        return self._call(self._affiliate_links_call(links, link_type))
 
 
     def get_hotproducts(self,
@@ -168,30 +163,363 @@ class AliexpressApi:
             ``ApiRequestException``
             ``ApiRequestResponseException``
         """
-        request = aliapi.rest.AliexpressAffiliateHotproductQueryRequest()
-        request.app_signature = self._app_signature
-        request.category_ids = get_list_as_string(category_ids)
-        request.delivery_days = str(delivery_days)
-        request.fields = get_list_as_string(fields)
-        request.keywords = keywords
-        request.max_sale_price = max_sale_price
-        request.min_sale_price = min_sale_price
-        request.page_no = page_no
-        request.page_size = page_size
-        request.platform_product_type = platform_product_type
-        request.ship_to_country = ship_to_country
-        request.sort = sort
-        request.target_currency = self._currency
-        request.target_language = self._language
-        request.tracking_id = self._tracking_id
-
-        response = api_request(request, 'aliexpress_affiliate_hotproduct_query_response')
-
-        if response.current_record_count > 0:
-            response.products = parse_products(response.products.product)
-            return response
-        else:
-            raise ProductsNotFoudException('No products found with current parameters')
+        return self._call(self._hotproducts_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+            min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort))
+
+
+    def iter_hotproducts(self,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        keywords: str = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_size: int = 50,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        cursor: dict = None,
+        max_pages: int = None,
+        max_items: int = None,
+        max_requests_per_second: float = None,
+        **kwargs) -> PageIterator:
+        """Streams every hot product matching the query, across all pages.
+
+        The next page is fetched while the current one is consumed. Stop iterating at
+        any time, ``cursor`` of the returned iterator resumes from the next product.
+
+        Args:
+            Same query arguments as ``get_hotproducts``, without ``page_no``.
+            cursor (``dict``): ``cursor`` of a previous iteration to resume from.
+            max_pages (``int``): Maximum pages to request.
+            max_items (``int``): Maximum products to yield.
+            max_requests_per_second (``float``): Request budget for the page fetches.
+
+        Returns:
+            ``PageIterator``: Iterable of ``models.Product``.
+
+        Raises:
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        return self._page_iterator(
+            lambda page_no: self._hotproducts_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+                min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort),
+            page_size, cursor, max_pages, max_items, max_requests_per_second)
+
+
+    def stream_hotproducts(self,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        keywords: str = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_no: int = None,
+        page_size: int = None,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        **kwargs) -> ResponseStream:
+        """Streams the products of one ``get_hotproducts`` page while the response is received.
+
+        Products are decoded one by one from the socket instead of parsing the whole
+        response first, memory use does not grow with the page size. The request is
+        sent when the iteration starts.
+
+        Args:
+            Same arguments as ``get_hotproducts``.
+
+        Returns:
+            ``ResponseStream``: Iterable of ``models.Product``, its ``result`` has
+            ``total_record_count`` once exhausted. Yields nothing if no product matches.
+
+        Raises:
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        call = self._hotproducts_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+            min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort)
+        return self._response_stream(call.request, call.response_name,
+                                     ('products', 'product'), decode_object, build_product)
+
+
+    def search_products(self,
+        keywords: str = None,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_no: int = None,
+        page_size: int = None,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        **kwargs) -> models.HotProductsResponse:
+        """Search for affiliated products by keywords and filters.
+
+        Args:
+            keywords (``str``): Search products based on keywords.
+            Other arguments are the same as in ``get_hotproducts``.
+
+        Returns:
+            ``models.HotProductsResponse``: Contains response information and the list of products.
+
+        Raises:
+            ``ProductsNotFoudException``
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        return self._call(self._search_products_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+            min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort))
+
+
+    def search_products_bulk(self,
+        keywords: str = None,
+        pages: int = 5,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_size: int = 50,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        max_workers: int = 4,
+        **kwargs) -> List[models.Product]:
+        """Fetches the first pages of a product search in parallel.
+
+        The products of all pages are merged in page order and products returned
+        by more than one page are kept once.
+
+        Args:
+            keywords (``str``): Search products based on keywords.
+            pages (``int``): Number of pages to fetch. Defaults to 5.
+            max_workers (``int``): Maximum pages requested at the same time. Defaults to 4.
+            Other arguments are the same as in ``get_hotproducts``.
+
+        Returns:
+            ``list[models.Product]``: Unique products of all the pages.
+
+        Raises:
+            ``ProductsNotFoudException``
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        calls = [self._page_call(self._search_products_call(category_ids, delivery_days, fields, keywords,
+            max_sale_price, min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort))
+            for page_no in range(1, pages + 1)]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(pages, max_workers)),
+                                thread_name_prefix='product-search') as executor:
+            # Every page runs in a copy of the caller's context, keeping its request priority
+            futures = [executor.submit(contextvars.copy_context().run, self._call, call) for call in calls]
+            results = [future.result() for future in futures]
+        return self._merge_product_pages(results)
+
+
+    def iter_search_products(self,
+        keywords: str = None,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_size: int = 50,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        cursor: dict = None,
+        max_pages: int = None,
+        max_items: int = None,
+        max_requests_per_second: float = None,
+        **kwargs) -> PageIterator:
+        """Streams every product of a search, across all pages.
+        See ``iter_hotproducts`` for the iteration arguments.
+
+        Returns:
+            ``PageIterator``: Iterable of ``models.Product``.
+        """
+        return self._page_iterator(
+            lambda page_no: self._search_products_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+                min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort),
+            page_size, cursor, max_pages, max_items, max_requests_per_second)
+
+
+    def download_hotproducts(self,
+        category_id: int,
+        country: str = None,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> models.HotProductsResponse:
+        """Download one page of the hot product feed of a category.
+
+        Args:
+            category_id (``int``): The category ID.
+            country (``str``): Returns the prices of that country.
+            fields (``str | list[str]``): The fields to include in the results list. Defaults to all.
+            locale_site (``str``): The locale site, for example ``global``.
+            page_no (``int``):
+            page_size (``int``): Products on each page.
+
+        Returns:
+            ``models.HotProductsResponse``: Contains response information and the list of products.
+
+        Raises:
+            ``ProductsNotFoudException``
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        return self._call(self._hotproducts_download_call(category_id, country, fields, locale_site, page_no,
+                                                          page_size))
+
+
+    def stream_download_hotproducts(self,
+        category_id: int,
+        country: str = None,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> ResponseStream:
+        """Streams the products of one ``download_hotproducts`` page while the response is received.
+
+        Args:
+            Same arguments as ``download_hotproducts``.
+
+        Returns:
+            ``ResponseStream``: Iterable of ``models.Product``, its ``result`` has
+            ``total_record_count`` once exhausted. Yields nothing if no product matches.
+
+        Raises:
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        call = self._hotproducts_download_call(category_id, country, fields, locale_site, page_no, page_size)
+        return self._response_stream(call.request, call.response_name,
+                                     ('products', 'product'), decode_object, build_product)
+
+
+    def get_orders(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> models.OrdersResponse:
+        """Get the affiliate orders of a time range, page by page.
+
+        Args:
+            start_time (``str | datetime``): Start of the range, ``YYYY-MM-DD HH:MM:SS``.
+            end_time (``str | datetime``): End of the range, ``YYYY-MM-DD HH:MM:SS``.
+            status (``models.OrderStatus``): Order status.
+            fields (``str | list[str]``): The fields to include in the results list. Defaults to all.
+            locale_site (``str``): The locale site.
+            page_no (``int``):
+            page_size (``int``): Orders on each page. Should be between 1 and 50.
+
+        Returns:
+            ``models.OrdersResponse``: Contains response information and the list of orders.
+
+        Raises:
+            ``OrdersNotFoudException``
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        return self._call(self._orders_call(start_time, end_time, status, fields, locale_site, page_no, page_size))
+
+
+    def get_orders_by_index(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        page_size: int = None,
+        start_query_index_id: str = None,
+        **kwargs) -> models.OrdersResponse:
+        """Get the affiliate orders of a time range from a query index.
+
+        Unlike ``get_orders``, pages are read from a cursor: pass the
+        ``max_query_index_id`` of a response as ``start_query_index_id`` to get the
+        orders that follow it.
+
+        Args:
+            start_time (``str | datetime``): Start of the range, ``YYYY-MM-DD HH:MM:SS``.
+            end_time (``str | datetime``): End of the range, ``YYYY-MM-DD HH:MM:SS``.
+            status (``models.OrderStatus``): Order status.
+            fields (``str | list[str]``): The fields to include in the results list. Defaults to all.
+            page_size (``int``): Orders on each page. Should be between 1 and 50.
+            start_query_index_id (``str``): Query index to start from. Defaults to the first order.
+
+        Returns:
+            ``models.OrdersResponse``: Contains response information and the list of orders.
+
+        Raises:
+            ``OrdersNotFoudException``
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        return self._call(self._orders_by_index_call(start_time, end_time, status, fields, page_size,
+                                                     start_query_index_id))
+
+
+    def stream_orders(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> ResponseStream:
+        """Streams the orders of one ``get_orders`` page while the response is received.
+
+        Args:
+            Same arguments as ``get_orders``.
+
+        Returns:
+            ``ResponseStream``: Iterable of ``models.Order``, its ``result`` has the
+            page information once exhausted. Yields nothing if no order matches.
+
+        Raises:
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        call = self._orders_call(start_time, end_time, status, fields, locale_site, page_no, page_size)
+        return self._response_stream(call.request, call.response_name,
+                                     ('orders', 'order'), parse_item=parse_order)
+
+
+    def stream_orders_by_index(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        page_size: int = None,
+        start_query_index_id: str = None,
+        **kwargs) -> ResponseStream:
+        """Streams the orders of one ``get_orders_by_index`` page while the response is received.
+
+        Args:
+            Same arguments as ``get_orders_by_index``.
+
+        Returns:
+            ``ResponseStream``: Iterable of ``models.Order``, its ``result`` has
+            ``max_query_index_id`` once exhausted. Yields nothing if no order matches.
+
+        Raises:
+            ``ApiRequestException``
+            ``ApiRequestResponseException``
+        """
+        call = self._orders_by_index_call(start_time, end_time, status, fields, page_size, start_query_index_id)
+        return self._response_stream(call.request, call.response_name,
+                                     ('orders', 'order'), parse_item=parse_order)
 
 
     def get_categories(self, **kwargs) -> List[Union[models.Category, ChildCategory]]:
@@ -205,16 +533,7 @@ class AliexpressApi:
             ``ApiRequestException``
             ``ApiRequestResponseException``
         """
-        request = aliapi.rest.AliexpressAffiliateCategoryGetRequest()
-        request.app_signature = self._app_signature
-
-        response = api_request(request, 'aliexpress_affiliate_category_get_response')
-
-        if response.total_result_count > 0:
-            self.categories = response.categories.category
-            return self.categories
-        else:
-            raise CategoriesNotFoudException('No categories found')
+        return self._call(self._categories_call())
 
 
     def get_parent_categories(self, use_cache=True, **kwargs) -> List[models.Category]:
@@ -231,9 +550,13 @@ class AliexpressApi:
             ``ApiRequestException``
             ``ApiRequestResponseException``
         """
-        if not use_cache or not self.categories:
-            self.get_categories()
-        return filter_parent_categories(self.categories)
+        if self._categories_need_refresh(use_cache):
+            try:
+                self.get_categories()
+            except Exception:
+                if not self._can_use_stale_categories(use_cache):
+                    raise
+        return self._category_index.get_parents()
 
 
     def get_child_categories(self, parent_category_id: int, use_cache=True, **kwargs) -> List[models.ChildCategory]:
@@ -251,6 +574,10 @@ class AliexpressApi:
             ``ApiRequestException``
             ``ApiRequestResponseException``
         """
-        if not use_cache or not self.categories:
-            self.get_categories()
-        return filter_child_categories(self.categories, parent_category_id)
+        if self._categories_need_refresh(use_cache):
+            try:
+                self.get_categories()
+            except Exception:
+                if not self._can_use_stale_categories(use_cache):
+                    raise
+        return self._category_index.get_children(parent_category_id)
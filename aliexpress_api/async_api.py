@@ -0,0 +1,354 @@
+"""Asynchronous AliExpress API wrapper
+
+Same interface as ``AliexpressApi`` but every API method is a coroutine, and the
+``stream_*`` methods return streams consumed with ``async for``. Requests
+are signed and parsed with the same code as the blocking client and sent through
+a shared aiohttp session, so one event loop can serve many concurrent
+conversations without a thread per request. The product cache and the category
+snapshot are read and written in worker threads, off the event loop.
+"""
+
+from .base import ApiCall, BaseAliexpressApi
+from .errors import ProductsNotFoudException
+from .helpers import get_product_ids, get_list_as_string
+from .helpers.orders import parse_order
+from .helpers.pagination import AsyncPageIterator
+from .helpers.products import build_product
+from .helpers.streaming import AsyncResponseStream
+from .helpers.requests import async_api_request, decode_object
+from .models.category import ChildCategory
+from .skd.api.async_base import AsyncRestTransport
+from . import models
+
+import asyncio
+from datetime import datetime
+from typing import List, Union
+
+
+class AsyncAliexpressApi(BaseAliexpressApi):
+    """Provides coroutines to get information from AliExpress using your API credentials.
+
+    Takes the same arguments as ``AliexpressApi``.
+
+    Args:
+        transport (``AsyncRestTransport``): Transport shared between clients. Defaults to a new one.
+    """
+
+    def __init__(self, *args, transport: AsyncRestTransport = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._transport = transport if transport is not None else AsyncRestTransport()
+
+
+    async def _call(self, call: ApiCall):
+        response = await async_api_request(self._transport, call.request, call.response_name, call.object_hook,
+                                           self._rate_limiter, self._retry_policy, self._circuit_breaker)
+        if call.blocking:
+            return await asyncio.to_thread(call.parse, response)
+        return call.parse(response)
+
+
+    def _response_stream(self, request, response_name, items_path, object_hook=None, parse_item=None):
+        # The stream_* methods return an AsyncResponseStream, consumed with "async for"
+        return AsyncResponseStream(self._transport, request, response_name, items_path, object_hook, parse_item,
+                                   self._rate_limiter, self._retry_policy, self._circuit_breaker)
+
+
+    def _page_iterator(self, make_call, page_size, cursor, max_pages, max_items, max_requests_per_second):
+        async def fetch_page(page_no):
+            return await self._call(self._page_call(make_call(page_no)))
+
+        return AsyncPageIterator(fetch_page, page_size, cursor, max_pages, max_items, max_requests_per_second)
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+    async def close(self):
+        """Closes the underlying aiohttp session."""
+        await self._transport.close()
+
+
+    async def get_products_details(self,
+        product_ids: Union[str, List[str]],
+        fields: Union[str, List[str]] = None,
+        country: str = None,
+        **kwargs) -> List[models.Product]:
+        """Get products information. See ``AliexpressApi.get_products_details``."""
+        product_ids = get_product_ids(product_ids)
+        fields = get_list_as_string(fields)
+
+        if self._product_cache is None:
+            return await self._call(self._products_details_call(product_ids, fields, country))
+
+        # The cache may be on disk
+        cached, missing, request_fields = await asyncio.to_thread(
+            self._get_cached_products, product_ids, fields, country)
+        if missing:
+            try:
+                products = await self._call(self._products_details_call(missing, request_fields, country))
+            except ProductsNotFoudException:
+                products = []
+            await asyncio.to_thread(self._set_cached_products, missing, products, cached, fields, country)
+
+        return self._merge_cached_products(product_ids, cached)
+
+
+    async def get_affiliate_links(self,
+        links: Union[str, List[str]],
+        link_type: models.LinkType = models.LinkType.NORMAL,
+        **kwargs) -> List[models.AffiliateLink]:
+        """Converts a list of links in affiliate links. See ``AliexpressApi.get_affiliate_links``."""
+        return await self._call(self._affiliate_links_call(links, link_type))
+
+
+    async def get_hotproducts(self,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        keywords: str = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_no: int = None,
+        page_size: int = None,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        **kwargs) -> models.HotProductsResponse:
+        """Search for affiliated products with high commission. See ``AliexpressApi.get_hotproducts``."""
+        return await self._call(self._hotproducts_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+            min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort))
+
+
+    def iter_hotproducts(self,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        keywords: str = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_size: int = 50,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        cursor: dict = None,
+        max_pages: int = None,
+        max_items: int = None,
+        max_requests_per_second: float = None,
+        **kwargs) -> AsyncPageIterator:
+        """Streams every hot product matching the query with ``async for``.
+        See ``AliexpressApi.iter_hotproducts``."""
+        return self._page_iterator(
+            lambda page_no: self._hotproducts_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+                min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort),
+            page_size, cursor, max_pages, max_items, max_requests_per_second)
+
+
+    def stream_hotproducts(self,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        keywords: str = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_no: int = None,
+        page_size: int = None,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        **kwargs) -> AsyncResponseStream:
+        """Streams the products of one ``get_hotproducts`` page with ``async for``.
+        See ``AliexpressApi.stream_hotproducts``."""
+        call = self._hotproducts_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+            min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort)
+        return self._response_stream(call.request, call.response_name,
+                                     ('products', 'product'), decode_object, build_product)
+
+
+    async def search_products(self,
+        keywords: str = None,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_no: int = None,
+        page_size: int = None,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        **kwargs) -> models.HotProductsResponse:
+        """Search for affiliated products by keywords and filters. See ``AliexpressApi.search_products``."""
+        return await self._call(self._search_products_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+            min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort))
+
+
+    async def search_products_bulk(self,
+        keywords: str = None,
+        pages: int = 5,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_size: int = 50,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        max_workers: int = 4,
+        **kwargs) -> List[models.Product]:
+        """Fetches the first pages of a product search concurrently.
+        See ``AliexpressApi.search_products_bulk``."""
+        semaphore = asyncio.Semaphore(max(1, max_workers))
+
+        async def fetch_page(call):
+            async with semaphore:
+                return await self._call(call)
+
+        calls = [self._page_call(self._search_products_call(category_ids, delivery_days, fields, keywords,
+            max_sale_price, min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort))
+            for page_no in range(1, pages + 1)]
+        results = await asyncio.gather(*(fetch_page(call) for call in calls))
+        return self._merge_product_pages(results)
+
+
+    def iter_search_products(self,
+        keywords: str = None,
+        category_ids: Union[str, List[str]] = None,
+        delivery_days: int = None,
+        fields: Union[str, List[str]] = None,
+        max_sale_price: int = None,
+        min_sale_price: int = None,
+        page_size: int = 50,
+        platform_product_type: models.ProductType = None,
+        ship_to_country: str = None,
+        sort: models.SortBy = None,
+        cursor: dict = None,
+        max_pages: int = None,
+        max_items: int = None,
+        max_requests_per_second: float = None,
+        **kwargs) -> AsyncPageIterator:
+        """Streams every product of a search with ``async for``.
+        See ``AliexpressApi.iter_search_products``."""
+        return self._page_iterator(
+            lambda page_no: self._search_products_call(category_ids, delivery_days, fields, keywords, max_sale_price,
+                min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort),
+            page_size, cursor, max_pages, max_items, max_requests_per_second)
+
+
+    async def download_hotproducts(self,
+        category_id: int,
+        country: str = None,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> models.HotProductsResponse:
+        """Download one page of the hot product feed of a category. See ``AliexpressApi.download_hotproducts``."""
+        return await self._call(self._hotproducts_download_call(category_id, country, fields, locale_site, page_no,
+                                                                page_size))
+
+
+    def stream_download_hotproducts(self,
+        category_id: int,
+        country: str = None,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> AsyncResponseStream:
+        """Streams the products of one ``download_hotproducts`` page with ``async for``.
+        See ``AliexpressApi.stream_download_hotproducts``."""
+        call = self._hotproducts_download_call(category_id, country, fields, locale_site, page_no, page_size)
+        return self._response_stream(call.request, call.response_name,
+                                     ('products', 'product'), decode_object, build_product)
+
+
+    async def get_orders(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> models.OrdersResponse:
+        """Get the affiliate orders of a time range, page by page. See ``AliexpressApi.get_orders``."""
+        return await self._call(self._orders_call(start_time, end_time, status, fields, locale_site, page_no,
+                                                  page_size))
+
+
+    async def get_orders_by_index(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        page_size: int = None,
+        start_query_index_id: str = None,
+        **kwargs) -> models.OrdersResponse:
+        """Get the affiliate orders of a time range from a query index.
+        See ``AliexpressApi.get_orders_by_index``."""
+        return await self._call(self._orders_by_index_call(start_time, end_time, status, fields, page_size,
+                                                           start_query_index_id))
+
+
+    def stream_orders(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        page_no: int = None,
+        page_size: int = None,
+        **kwargs) -> AsyncResponseStream:
+        """Streams the orders of one ``get_orders`` page with ``async for``. See ``AliexpressApi.stream_orders``."""
+        call = self._orders_call(start_time, end_time, status, fields, locale_site, page_no, page_size)
+        return self._response_stream(call.request, call.response_name,
+                                     ('orders', 'order'), parse_item=parse_order)
+
+
+    def stream_orders_by_index(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        status: models.OrderStatus,
+        fields: Union[str, List[str]] = None,
+        page_size: int = None,
+        start_query_index_id: str = None,
+        **kwargs) -> AsyncResponseStream:
+        """Streams the orders of one ``get_orders_by_index`` page with ``async for``.
+        See ``AliexpressApi.stream_orders_by_index``."""
+        call = self._orders_by_index_call(start_time, end_time, status, fields, page_size, start_query_index_id)
+        return self._response_stream(call.request, call.response_name,
+                                     ('orders', 'order'), parse_item=parse_order)
+
+
+    async def get_categories(self, **kwargs) -> List[Union[models.Category, ChildCategory]]:
+        """Get all available categories, both parent and child. See ``AliexpressApi.get_categories``."""
+        return await self._call(self._categories_call())
+
+
+    async def get_parent_categories(self, use_cache=True, **kwargs) -> List[models.Category]:
+        """Get all available parent categories. See ``AliexpressApi.get_parent_categories``."""
+        if self._categories_need_refresh(use_cache):
+            try:
+                await self.get_categories()
+            except Exception:
+                if not self._can_use_stale_categories(use_cache):
+                    raise
+        return self._category_index.get_parents()
+
+
+    async def get_child_categories(self, parent_category_id: int, use_cache=True, **kwargs) -> List[models.ChildCategory]:
+        """Get all available child categories for a specific parent category.
+        See ``AliexpressApi.get_child_categories``."""
+        if self._categories_need_refresh(use_cache):
+            try:
+                await self.get_categories()
+            except Exception:
+                if not self._can_use_stale_categories(use_cache):
+                    raise
+        return self._category_index.get_children(parent_category_id)
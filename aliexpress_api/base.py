@@ -0,0 +1,294 @@
+"""Code shared by the blocking and the asynchronous API clients
+
+``BaseAliexpressApi`` builds the requests and parses the responses of every API
+method. ``AliexpressApi`` and ``AsyncAliexpressApi`` only differ in how an
+``ApiCall`` is sent: in the calling thread or on the event loop.
+"""
+
+from .cache import CategoryIndex, ProductCache, NOT_FOUND
+from .errors import ProductsNotFoudException, OrdersNotFoudException, InvalidTrackingIdException, \
+    CategoriesNotFoudException
+from .helpers import parse_products, parse_orders, get_list_as_string, get_time_string
+from .helpers.requests import decode_object, decode_products, decode_hotproducts, decode_affiliate_links, \
+    decode_categories
+from .models.category import ChildCategory
+from .ratelimit import RateLimiter
+from .retry import CircuitBreaker, RetryPolicy
+from .skd import setDefaultAppInfo, SIGN_METHOD_MD5
+from .skd import api as aliapi
+from . import models
+
+from typing import List, Union
+
+
+class ApiCall:
+    """A request ready to be sent and how to turn its response into a result.
+
+    Args:
+        request (``RestApi``): The request.
+        response_name (``str``): Key of the response in the body.
+        object_hook (``callable``): json object_hook the body is decoded with.
+        parse (``callable``): Builds the result from the response, may raise the not found errors.
+        blocking (``bool``): True if ``parse`` does file I/O and must not run on an event loop.
+    """
+
+    __slots__ = ('request', 'response_name', 'object_hook', 'parse', 'blocking')
+
+    def __init__(self, request, response_name, object_hook, parse, blocking=False):
+        self.request = request
+        self.response_name = response_name
+        self.object_hook = object_hook
+        self.parse = parse
+        self.blocking = blocking
+
+
+class BaseAliexpressApi:
+    """Request building and response handling of the API clients. See ``AliexpressApi`` for the arguments."""
+
+    def __init__(self,
+        key: str,
+        secret: str,
+        language: models.Language,
+        currency: models.Currency,
+        tracking_id: str = None,
+        app_signature: str = None,
+        product_cache: ProductCache = None,
+        category_index: CategoryIndex = None,
+        rate_limiter: RateLimiter = None,
+        retry_policy: RetryPolicy = None,
+        circuit_breaker: CircuitBreaker = None,
+        sign_method: str = SIGN_METHOD_MD5,
+        **kwargs):
+        self._key = key
+        self._secret = secret
+        self._tracking_id = tracking_id
+        self._language = language
+        self._currency = currency
+        self._app_signature = app_signature
+        self._product_cache = product_cache
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._category_index = category_index if category_index is not None else CategoryIndex()
+        self.categories = self._category_index.categories or None
+        setDefaultAppInfo(self._key, self._secret, sign_method)
+
+
+    def _page_call(self, call: ApiCall) -> ApiCall:
+        # A page past the last product is empty instead of an error, it ends the iteration
+        return ApiCall(call.request, call.response_name, call.object_hook, self._hotproducts_page, call.blocking)
+
+
+    def _products_details_call(self, product_ids: List[str], fields: str, country: str) -> ApiCall:
+        request = aliapi.rest.AliexpressAffiliateProductdetailGetRequest()
+        request.app_signature = self._app_signature
+        request.fields = fields
+        request.product_ids = get_list_as_string(product_ids)
+        request.country = country
+        request.target_currency = self._currency
+        request.target_language = self._language
+        request.tracking_id = self._tracking_id
+        return ApiCall(request, 'aliexpress_affiliate_productdetail_get_response', decode_products,
+                       self._products_details_result)
+
+
+    def _products_details_result(self, response) -> List[models.Product]:
+        if response.current_record_count > 0:
+            response = parse_products(response.products.product)
+            return response
+        else:
+            raise ProductsNotFoudException('No products found with current parameters')
+
+
+    def _product_cache_key(self, product_id: str, fields: str, country: str) -> str:
+        return self._product_cache.make_key(product_id, fields, country, self._currency, self._language)
+
+
+    def _get_cached_products(self, product_ids: List[str], fields: str, country: str):
+        cached, missing = self._product_cache.get_many(product_ids, fields=fields, country=country,
+            currency=self._currency, language=self._language)
+
+        # product_id is needed to map the results back to the cache keys
+        request_fields = fields
+        if fields and 'product_id' not in fields.split(','):
+            request_fields = fields + ',product_id'
+
+        return cached, missing, request_fields
+
+
+    def _set_cached_products(self, missing: List[str], products: List[models.Product], cached: dict,
+        fields: str, country: str):
+        if len(missing) == 1 and len(products) == 1:
+            fetched = {missing[0]: products[0]}
+        else:
+            fetched = {str(product.product_id): product for product in products}
+
+        for product_id in missing:
+            product = fetched.get(product_id, NOT_FOUND)
+            self._product_cache.set(self._product_cache_key(product_id, fields, country), product)
+            cached[product_id] = product
+
+
+    def _merge_cached_products(self, product_ids: List[str], cached: dict) -> List[models.Product]:
+        products = [cached[product_id] for product_id in product_ids if cached[product_id] is not NOT_FOUND]
+        if products:
+            return products
+        else:
+            raise ProductsNotFoudException('No products found with current parameters')
+
+
+    def _affiliate_links_call(self, links: Union[str, List[str]], link_type: models.LinkType) -> ApiCall:
+        if not self._tracking_id:
+            raise InvalidTrackingIdException('The tracking id is required for affiliate links')
+
+        links = get_list_as_string(links)
+
+        request = aliapi.rest.AliexpressAffiliateLinkGenerateRequest()
+        request.app_signature = self._app_signature
+        request.source_values = links
+        request.promotion_link_type = link_type
+        request.tracking_id = self._tracking_id
+        return ApiCall(request, 'aliexpress_affiliate_link_generate_response', decode_affiliate_links,
+                       self._affiliate_links_result)
+
+
+    def _affiliate_links_result(self, response) -> List[models.AffiliateLink]:
+        if response.total_result_count > 0:
+            return response.promotion_links.promotion_link
+        else:
+            raise ProductsNotFoudException('Affiliate links not available')
+
+
+    def _hotproducts_call(self, *args) -> ApiCall:
+        request = self._products_query_request(aliapi.rest.AliexpressAffiliateHotproductQueryRequest(), *args)
+        return ApiCall(request, 'aliexpress_affiliate_hotproduct_query_response', decode_hotproducts,
+                       self._hotproducts_result)
+
+
+    def _search_products_call(self, *args) -> ApiCall:
+        request = self._products_query_request(aliapi.rest.AliexpressAffiliateProductQueryRequest(), *args)
+        return ApiCall(request, 'aliexpress_affiliate_product_query_response', decode_hotproducts,
+                       self._hotproducts_result)
+
+
+    def _products_query_request(self, request, category_ids, delivery_days, fields, keywords, max_sale_price,
+        min_sale_price, page_no, page_size, platform_product_type, ship_to_country, sort):
+        request.app_signature = self._app_signature
+        request.category_ids = get_list_as_string(category_ids)
+        request.delivery_days = str(delivery_days) if delivery_days is not None else None
+        request.fields = get_list_as_string(fields)
+        request.keywords = keywords
+        request.max_sale_price = max_sale_price
+        request.min_sale_price = min_sale_price
+        request.page_no = page_no
+        request.page_size = page_size
+        request.platform_product_type = platform_product_type
+        request.ship_to_country = ship_to_country
+        request.sort = sort
+        request.target_currency = self._currency
+        request.target_language = self._language
+        request.tracking_id = self._tracking_id
+        return request
+
+
+    def _hotproducts_result(self, response) -> models.HotProductsResponse:
+        if response.current_record_count > 0:
+            response.products = parse_products(response.products.product)
+            return response
+        else:
+            raise ProductsNotFoudException('No products found with current parameters')
+
+
+    def _hotproducts_page(self, response):
+        try:
+            response = self._hotproducts_result(response)
+        except ProductsNotFoudException:
+            return [], 0
+        return response.products, response.total_record_count
+
+
+    def _merge_product_pages(self, pages) -> List[models.Product]:
+        products = {}
+        for page_products, _ in pages:
+            for product in page_products:
+                products.setdefault(str(getattr(product, 'product_id', id(product))), product)
+        if products:
+            return list(products.values())
+        else:
+            raise ProductsNotFoudException('No products found with current parameters')
+
+
+    def _hotproducts_download_call(self, category_id, country, fields, locale_site, page_no, page_size) -> ApiCall:
+        request = aliapi.rest.AliexpressAffiliateHotproductDownloadRequest()
+        request.app_signature = self._app_signature
+        request.category_id = category_id
+        request.country = country
+        request.fields = get_list_as_string(fields)
+        request.locale_site = locale_site
+        request.page_no = page_no
+        request.page_size = page_size
+        request.target_currency = self._currency
+        request.target_language = self._language
+        request.tracking_id = self._tracking_id
+        return ApiCall(request, 'aliexpress_affiliate_hotproduct_download_response', decode_hotproducts,
+                       self._hotproducts_result)
+
+
+    def _orders_call(self, start_time, end_time, status, fields, locale_site, page_no, page_size) -> ApiCall:
+        request = aliapi.rest.AliexpressAffiliateOrderListRequest()
+        request.app_signature = self._app_signature
+        request.end_time = get_time_string(end_time)
+        request.fields = get_list_as_string(fields)
+        request.locale_site = locale_site
+        request.page_no = page_no
+        request.page_size = page_size
+        request.start_time = get_time_string(start_time)
+        request.status = status
+        return ApiCall(request, 'aliexpress_affiliate_order_list_response', decode_object, self._orders_result)
+
+
+    def _orders_by_index_call(self, start_time, end_time, status, fields, page_size, start_query_index_id) -> ApiCall:
+        request = aliapi.rest.AliexpressAffiliateOrderListbyindexRequest()
+        request.app_signature = self._app_signature
+        request.end_time = get_time_string(end_time)
+        request.fields = get_list_as_string(fields)
+        request.page_size = page_size
+        request.start_query_index_id = start_query_index_id
+        request.start_time = get_time_string(start_time)
+        request.status = status
+        return ApiCall(request, 'aliexpress_affiliate_order_listbyindex_response', decode_object,
+                       self._orders_result)
+
+
+    def _orders_result(self, response) -> models.OrdersResponse:
+        orders = parse_orders(response)
+        if orders.orders:
+            return orders
+        else:
+            raise OrdersNotFoudException('No orders found with current parameters')
+
+
+    def _categories_call(self) -> ApiCall:
+        request = aliapi.rest.AliexpressAffiliateCategoryGetRequest()
+        request.app_signature = self._app_signature
+        # Building the index saves its snapshot file
+        return ApiCall(request, 'aliexpress_affiliate_category_get_response', decode_categories,
+                       self._categories_result, blocking=True)
+
+
+    def _categories_result(self, response) -> List[Union[models.Category, ChildCategory]]:
+        if response.total_result_count > 0:
+            self.categories = response.categories.category
+            self._category_index.build(self.categories)
+            return self.categories
+        else:
+            raise CategoriesNotFoudException('No categories found')
+
+
+    def _categories_need_refresh(self, use_cache: bool) -> bool:
+        return not use_cache or self._category_index.is_empty() or self._category_index.is_stale()
+
+
+    def _can_use_stale_categories(self, use_cache: bool) -> bool:
+        # A stale index is better than no answer when the API is unavailable
+        return use_cache and not self._category_index.is_empty()
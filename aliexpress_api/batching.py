@@ -0,0 +1,178 @@
+"""Request coalescing for product detail lookups.
+
+``aliexpress.affiliate.productdetail.get`` accepts several comma separated product
+IDs. ``ProductDetailsBatcher`` collects the lookups made by concurrent callers for
+a few milliseconds and sends them as a single request, then hands every caller
+its own product through a future. ``close`` sends the lookups still waiting and
+stops the batcher.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Union
+
+from .errors import ProductsNotFoudException
+from .helpers import get_product_ids, get_list_as_string
+from . import models
+
+
+MAX_PRODUCT_IDS_PER_CALL = 20
+
+
+class ProductDetailsBatcher:
+    """Micro-batcher in front of ``AliexpressApi.get_products_details``.
+
+    Args:
+        api (``AliexpressApi``): The API instance used to send the batched requests.
+        max_wait (``float``): Seconds to wait for more lookups before sending a batch.
+            Defaults to 5 milliseconds.
+        max_batch_size (``int``): Maximum product IDs per request. Defaults to 20.
+        max_concurrency (``int``): Maximum batched requests in flight. Defaults to 4.
+    """
+
+    def __init__(self,
+        api,
+        max_wait: float = 0.005,
+        max_batch_size: int = MAX_PRODUCT_IDS_PER_CALL,
+        max_concurrency: int = 4):
+        self.api = api
+        self.max_wait = max_wait
+        self.max_batch_size = max_batch_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='product-details')
+        self.requests_sent = 0
+        self.lookups = 0
+        self._pending = {}
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='product-details-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, product_id: str, fields: Union[str, List[str]] = None, country: str = None) -> Future:
+        """Queues a lookup and returns a future resolving to a ``models.Product``.
+
+        The future raises ``ProductsNotFoudException`` if the product is not returned.
+
+        Raises:
+            ``RuntimeError``: If the batcher is closed.
+        """
+        product_id = get_product_ids(product_id)[0]
+        fields = get_list_as_string(fields)
+        # product_id is needed to hand every product to its caller
+        if fields and 'product_id' not in fields.split(','):
+            fields += ',product_id'
+        key = (fields, country)
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('Cannot submit lookups to a closed ProductDetailsBatcher')
+            batch = self._pending.get(key)
+            if batch is None:
+                batch = self._pending[key] = {'created': time.monotonic(), 'lookups': []}
+            batch['lookups'].append((product_id, future))
+            self.lookups += 1
+            self._condition.notify()
+        return future
+
+    def get_products_details(self,
+        product_ids: Union[str, List[str]],
+        fields: Union[str, List[str]] = None,
+        country: str = None,
+        timeout: float = None) -> List[models.Product]:
+        """Same as ``AliexpressApi.get_products_details`` but coalesced with other callers."""
+        futures = [self.submit(product_id, fields, country) for product_id in get_product_ids(product_ids)]
+        products = []
+        for future in futures:
+            try:
+                products.append(future.result(timeout=timeout))
+            except ProductsNotFoudException:
+                pass
+        if products:
+            return products
+        else:
+            raise ProductsNotFoudException('No products found with current parameters')
+
+    def close(self, wait: bool = True) -> None:
+        """Sends the pending lookups without waiting for ``max_wait`` and stops the batcher.
+
+        Args:
+            wait (``bool``): Blocks until every future is resolved. Defaults to True.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if wait:
+            self._thread.join()
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self) -> dict:
+        return {'lookups': self.lookups, 'requests': self.requests_sent}
+
+    def _next_ready_batch(self):
+        """Returns a batch that is full or has waited long enough, or the time to wait."""
+        now = time.monotonic()
+        wait = None
+        for key, batch in self._pending.items():
+            ids = {product_id for product_id, _ in batch['lookups']}
+            remaining = batch['created'] + self.max_wait - now
+            if self._closed or len(ids) >= self.max_batch_size or remaining <= 0:
+                return key, wait
+            wait = remaining if wait is None else min(wait, remaining)
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                key, wait = self._next_ready_batch()
+                while key is None and not self._closed:
+                    self._condition.wait(timeout=wait)
+                    key, wait = self._next_ready_batch()
+                if key is None:
+                    # Closed and every lookup sent
+                    break
+                batch = self._pending.pop(key)
+
+            lookups = batch['lookups']
+            # Lookups beyond the batch size go back to the queue for the next request
+            product_ids = list(dict.fromkeys(product_id for product_id, _ in lookups))
+            if len(product_ids) > self.max_batch_size:
+                selected = set(product_ids[:self.max_batch_size])
+                overflow = [lookup for lookup in lookups if lookup[0] not in selected]
+                lookups = [lookup for lookup in lookups if lookup[0] in selected]
+                product_ids = product_ids[:self.max_batch_size]
+                with self._condition:
+                    pending = self._pending.setdefault(key, {'created': batch['created'], 'lookups': []})
+                    pending['lookups'][:0] = overflow
+
+            self.requests_sent += 1
+            self._executor.submit(self._send, key, product_ids, lookups)
+
+        self._executor.shutdown(wait=False)
+
+    def _send(self, key, product_ids, lookups):
+        fields, country = key
+        try:
+            products = self.api.get_products_details(product_ids, fields=fields, country=country)
+        except ProductsNotFoudException:
+            products = []
+        except Exception as error:
+            for _, future in lookups:
+                future.set_exception(error)
+            return
+
+        if len(product_ids) == 1 and len(products) == 1:
+            found = {product_ids[0]: products[0]}
+        else:
+            found = {str(getattr(product, 'product_id', '')): product for product in products}
+
+        for product_id, future in lookups:
+            if product_id in found:
+                future.set_result(found[product_id])
+            else:
+                future.set_exception(ProductsNotFoudException('Product not found: ' + product_id))
@@ -0,0 +1,4 @@
+from .memory import MemoryCache
+from .sqlite import SqliteCache
+from .products import ProductCache, NOT_FOUND
+from .categories import CategoryIndex
@@ -0,0 +1,126 @@
+"""In-memory index of the category tree."""
+
+import json
+import os
+import threading
+import time
+from typing import List, Optional, Union
+
+from .. import models
+
+
+class _Tree:
+    """Immutable maps of one version of the category tree."""
+
+    __slots__ = ('categories', 'by_id', 'children', 'parents', 'ids_by_name', 'built_at')
+
+    def __init__(self, categories, built_at):
+        self.categories = tuple(categories)
+        self.by_id = {}
+        self.children = {}
+        self.ids_by_name = {}
+        parents = []
+        for category in self.categories:
+            self.by_id[category.category_id] = category
+            self.ids_by_name.setdefault(str(category.category_name).strip().lower(), category.category_id)
+            parent_category_id = getattr(category, 'parent_category_id', None)
+            if parent_category_id is None:
+                parents.append(category)
+            else:
+                self.children.setdefault(parent_category_id, []).append(category)
+        self.parents = tuple(parents)
+        self.children = {key: tuple(value) for key, value in self.children.items()}
+        self.built_at = built_at
+
+
+class CategoryIndex:
+    """Category tree indexed by ID, by parent and by name.
+
+    The index is replaced as a whole when rebuilt, so readers never need a lock
+    and never see a half built tree.
+
+    Args:
+        ttl (``float``): Seconds after which the index is stale. Defaults to one day.
+        snapshot_path (``str``): JSON file the index is saved to and loaded from.
+            Defaults to None (no snapshot).
+    """
+
+    def __init__(self, ttl: float = 24 * 60 * 60, snapshot_path: str = None):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self._tree = _Tree((), 0.0)
+        self._lock = threading.Lock()
+        self.load_snapshot()
+
+    def build(self, categories: List[Union[models.Category, models.ChildCategory]], built_at: float = None) -> None:
+        """Replaces the index with ``categories`` and saves the snapshot."""
+        tree = _Tree(categories, time.time() if built_at is None else built_at)
+        with self._lock:
+            self._tree = tree
+        if built_at is None:
+            self.save_snapshot()
+
+    def is_empty(self) -> bool:
+        return not self._tree.categories
+
+    def is_stale(self) -> bool:
+        return time.time() - self._tree.built_at > self.ttl
+
+    @property
+    def categories(self) -> List[Union[models.Category, models.ChildCategory]]:
+        return list(self._tree.categories)
+
+    def get(self, category_id: int) -> Optional[Union[models.Category, models.ChildCategory]]:
+        return self._tree.by_id.get(category_id)
+
+    def get_parents(self) -> List[models.Category]:
+        return list(self._tree.parents)
+
+    def get_children(self, parent_category_id: int) -> List[models.ChildCategory]:
+        return list(self._tree.children.get(parent_category_id, ()))
+
+    def find_id(self, category_name: str) -> Optional[int]:
+        """Returns the ID of the category with that name, case insensitive."""
+        return self._tree.ids_by_name.get(category_name.strip().lower())
+
+    def load_snapshot(self) -> bool:
+        """Loads the snapshot if there is one. Returns True if it was loaded."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as snapshot:
+                data = json.load(snapshot)
+            categories = [
+                models.ChildCategory(**values) if 'parent_category_id' in values else models.Category(**values)
+                for values in data['categories']
+            ]
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        self.build(categories, built_at=data.get('built_at', 0.0))
+        return True
+
+    def save_snapshot(self) -> bool:
+        """Saves the index to the snapshot file. Returns False if it could not be written."""
+        if not self.snapshot_path:
+            return False
+        tree = self._tree
+        data = {'built_at': tree.built_at, 'categories': [category.to_dict() for category in tree.categories]}
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.snapshot_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as snapshot:
+                json.dump(data, snapshot, ensure_ascii=False)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        tree = self._tree
+        return {
+            'size': len(tree.categories),
+            'parents': len(tree.parents),
+            'age': round(time.time() - tree.built_at) if tree.built_at else None,
+        }
@@ -0,0 +1,79 @@
+"""Two-tier product details cache."""
+
+from typing import Dict, List, Tuple
+
+from .memory import MemoryCache
+
+
+class _NotFound:
+    """Marker stored for product IDs the API did not return."""
+
+    def __repr__(self):
+        return 'NOT_FOUND'
+
+    def __reduce__(self):
+        return 'NOT_FOUND'
+
+
+NOT_FOUND = _NotFound()
+
+
+class ProductCache:
+    """Caches product details per (product_id, fields, country, currency, language).
+
+    Lookups go to the in-process tier first and then to the optional disk tier,
+    promoting disk hits to memory. Product IDs that the API does not return are
+    cached as ``NOT_FOUND`` for a shorter time.
+
+    Args:
+        memory (``MemoryCache``): In-process tier. Defaults to a new ``MemoryCache``.
+        disk (``SqliteCache``): Optional persistent tier.
+        ttl (``float``): Seconds a product is cached. Defaults to one hour.
+        negative_ttl (``float``): Seconds a not found product ID is cached. Defaults to 5 minutes.
+    """
+
+    def __init__(self, memory: MemoryCache = None, disk=None, ttl: float = 3600, negative_ttl: float = 300):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+    @staticmethod
+    def make_key(product_id: str, fields: str, country: str, currency: str, language: str) -> str:
+        return '|'.join(str(part or '') for part in (product_id, fields, country, currency, language))
+
+    def get(self, key: str):
+        """Returns the cached product, ``NOT_FOUND`` or None on a miss."""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+                self.memory.set(key, value, ttl)
+        return value
+
+    def set(self, key: str, value):
+        ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def get_many(self, product_ids: List[str], **key_args) -> Tuple[Dict[str, object], List[str]]:
+        """Returns the cached entries by product ID and the list of product IDs to fetch."""
+        cached = {}
+        missing = []
+        for product_id in product_ids:
+            if product_id in cached or product_id in missing:
+                continue
+            value = self.get(self.make_key(product_id, **key_args))
+            if value is None:
+                missing.append(product_id)
+            else:
+                cached[product_id] = value
+        return cached, missing
+
+    def stats(self) -> dict:
+        stats = {'memory': self.memory.stats()}
+        if self.disk is not None:
+            stats['disk'] = self.disk.stats()
+        return stats
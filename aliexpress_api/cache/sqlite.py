@@ -0,0 +1,120 @@
+"""On-disk cache tier backed by SQLite."""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+class SqliteCache:
+    """Persistent cache stored in a SQLite database. Values are pickled.
+
+    ``max_size`` is enforced on every insert: the entry closest to expiring is
+    evicted to make room. Expired entries are purged every ``purge_interval``
+    writes. Expiration uses the wall clock, which is still meaningful after a restart.
+
+    Args:
+        path (str): Database file path.
+        max_size (int): Maximum number of entries. Defaults to 100000.
+        purge_interval (int): Number of writes between two purges. Defaults to 1000.
+    """
+
+    def __init__(self, path: str, max_size: int = 100000, purge_interval: int = 1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_size = max_size
+        self.purge_interval = purge_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache '
+            '(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)'
+        )
+        self._connection.execute('CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)')
+        self._connection.commit()
+        self._size = 0
+        self.purge_expired()
+
+    def get(self, key: str):
+        """Returns the cached value or None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or row[1] < time.time():
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value, ttl: float):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            exists = self._connection.execute('SELECT 1 FROM cache WHERE key = ?', (key,)).fetchone()
+            if exists is None and self._size >= self.max_size:
+                self._evict(self._size - self.max_size + 1)
+            self._connection.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, data, time.time() + ttl)
+            )
+            if exists is None:
+                self._size += 1
+            self._writes += 1
+            if self._writes % self.purge_interval == 0:
+                self._purge()
+            self._connection.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._size -= self._connection.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount
+            self._connection.commit()
+
+    def purge_expired(self) -> int:
+        """Deletes expired entries, then the entries over ``max_size``.
+
+        Returns how many were removed.
+        """
+        with self._lock:
+            removed = self._purge()
+            self._connection.commit()
+        return removed
+
+    def _purge(self) -> int:
+        removed = self._connection.execute('DELETE FROM cache WHERE expires_at < ?', (time.time(),)).rowcount
+        self.evictions += removed
+        # Recounted, other processes may write to the same file
+        self._size = self._connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if self._size > self.max_size:
+            removed += self._evict(self._size - self.max_size)
+        return removed
+
+    def _evict(self, count: int) -> int:
+        """Deletes the ``count`` entries closest to expiring."""
+        removed = self._connection.execute(
+            'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)', (count,)
+        ).rowcount
+        self._size -= removed
+        self.evictions += removed
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._connection.execute('DELETE FROM cache')
+            self._connection.commit()
+            self._size = 0
+
+    def stats(self) -> dict:
+        return {
+            'size': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,2 @@
+from .store import CatalogStore
+from .downloader import HotProductDownloader
@@ -0,0 +1,108 @@
+"""Bulk download of the hot product feed into a ``CatalogStore``."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+
+from ..ratelimit import BACKGROUND, request_priority
+from .store import CatalogStore
+
+
+class HotProductDownloader:
+    """Downloads ``aliexpress.affiliate.hotproduct.download`` for every category and country.
+
+    Every (category, country) feed is downloaded page by page, feeds run
+    concurrently. Each page is saved together with a checkpoint, so an interrupted
+    download resumes from the page after the last one saved.
+
+    Args:
+        api (``AliexpressApi``): The API instance used to download the pages.
+        store (``CatalogStore``): Where products and checkpoints are saved.
+        page_size (``int``): Products per page. Defaults to 50.
+        max_workers (``int``): Feeds downloaded at the same time. Defaults to 4.
+        fields (``str | list[str]``): The fields to download. Defaults to all.
+        locale_site (``str``): The locale site. Defaults to the API default.
+        max_pages (``int``): Maximum pages per feed. Defaults to no limit.
+        priority (``int``): Rate limiter priority of the downloads. Defaults to ``BACKGROUND``.
+    """
+
+    def __init__(self,
+        api,
+        store: CatalogStore,
+        page_size: int = 50,
+        max_workers: int = 4,
+        fields: Union[str, List[str]] = None,
+        locale_site: str = None,
+        max_pages: int = None,
+        priority: int = BACKGROUND):
+        self.api = api
+        self.store = store
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.fields = fields
+        self.locale_site = locale_site
+        self.max_pages = max_pages
+        self.priority = priority
+        self.pages_downloaded = 0
+        self.products_downloaded = 0
+        self._lock = threading.Lock()
+
+    def download(self, category_ids: List[int], countries: List[str] = None, restart: bool = False) -> dict:
+        """Downloads the feeds of every category and country.
+
+        Args:
+            category_ids (``list[int]``): Categories to download.
+            countries (``list[str]``): Countries to download the prices for. Defaults to the API default.
+            restart (``bool``): Download finished feeds again instead of skipping them.
+
+        Returns:
+            ``dict``: Products downloaded per ``'category_id/country'`` feed. Failed feeds
+            have the exception instead, they resume from their checkpoint on the next call.
+        """
+        if restart:
+            self.store.reset_checkpoints()
+        feeds = [(category_id, country) for category_id in category_ids for country in (countries or [None])]
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hotproduct-download') as executor:
+            futures = {feed: executor.submit(self.download_feed, *feed) for feed in feeds}
+
+        results = {}
+        for (category_id, country), future in futures.items():
+            key = f'{category_id}/{country or ""}'
+            error = future.exception()
+            results[key] = error if error is not None else future.result()
+        return results
+
+    def download_feed(self, category_id: int, country: str = None) -> int:
+        """Downloads one feed from its checkpoint and returns the number of products saved."""
+        with request_priority(self.priority):
+            return self._download_feed(category_id, country)
+
+    def _download_feed(self, category_id: int, country: str) -> int:
+        checkpoint = self.store.get_checkpoint(category_id, country)
+        if checkpoint is not None and checkpoint['finished']:
+            return 0
+        page_no = checkpoint['next_page_no'] if checkpoint is not None else 1
+
+        saved = 0
+        pages = 0
+        while True:
+            # Products are decoded while the page is received, the raw body is never held at once
+            stream = self.api.stream_download_hotproducts(category_id, country, self.fields, self.locale_site,
+                                                          page_no, self.page_size)
+            products = list(stream)
+            total = getattr(stream.result, 'total_record_count', None) or 0
+
+            pages += 1
+            finished = (len(products) < self.page_size or page_no * self.page_size >= total
+                        or (self.max_pages is not None and pages >= self.max_pages))
+            self.store.save_page(products, category_id, country, page_no + 1, finished)
+            saved += len(products)
+            with self._lock:
+                self.pages_downloaded += 1
+                self.products_downloaded += len(products)
+            if finished:
+                return saved
+            page_no += 1
+
+    def stats(self) -> dict:
+        return {'pages': self.pages_downloaded, 'products': self.products_downloaded}
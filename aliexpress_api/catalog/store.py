@@ -0,0 +1,165 @@
+"""Local SQLite store of downloaded products."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional
+
+from .. import models
+from ..models.base import to_float
+
+
+class CatalogStore:
+    """Products of the hot product feed, one row per product and country.
+
+    The columns used to look products up and filter them are stored as typed,
+    indexed columns, the complete product is kept as JSON. Download progress of
+    every (category, country) feed is checkpointed in the same database.
+
+    Args:
+        path (str): Database file path.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS products (
+                product_id INTEGER NOT NULL,
+                country TEXT NOT NULL,
+                category_id INTEGER,
+                product_title TEXT,
+                target_sale_price REAL,
+                target_sale_price_currency TEXT,
+                commission_rate REAL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (product_id, country)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS products_category ON products (category_id, country, target_sale_price);
+            CREATE INDEX IF NOT EXISTS products_updated_at ON products (updated_at);
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                category_id INTEGER NOT NULL,
+                country TEXT NOT NULL,
+                next_page_no INTEGER NOT NULL,
+                finished INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (category_id, country)
+            );
+        ''')
+        self._connection.commit()
+
+    def save_page(self, products: List[models.Product], category_id: int, country: str,
+                  next_page_no: int, finished: bool) -> None:
+        """Stores the products of a page and its checkpoint in one transaction."""
+        now = time.time()
+        rows = [
+            (
+                int(product.product_id),
+                country or '',
+                category_id,
+                getattr(product, 'product_title', None),
+                to_float(getattr(product, 'target_sale_price', None)),
+                getattr(product, 'target_sale_price_currency', None),
+                to_float(getattr(product, 'commission_rate', None), '%'),
+                json.dumps(product.to_dict(), ensure_ascii=False, default=vars),
+                now,
+            )
+            for product in products if getattr(product, 'product_id', None) is not None
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO products (product_id, country, category_id, product_title, '
+                'target_sale_price, target_sale_price_currency, commission_rate, data, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+            )
+            self._connection.execute(
+                'INSERT OR REPLACE INTO checkpoints (category_id, country, next_page_no, finished, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)', (category_id, country or '', next_page_no, int(finished), now)
+            )
+
+    def get_checkpoint(self, category_id: int, country: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT next_page_no, finished, updated_at FROM checkpoints WHERE category_id = ? AND country = ?',
+                (category_id, country or '')
+            ).fetchone()
+        if row is None:
+            return None
+        return {'next_page_no': row[0], 'finished': bool(row[1]), 'updated_at': row[2]}
+
+    def reset_checkpoints(self) -> None:
+        """Makes the next download start every feed from its first page again."""
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM checkpoints')
+
+    def get_product(self, product_id, country: str = None, max_age: float = None) -> Optional[models.Product]:
+        """Returns a stored product, or None if it is missing or older than ``max_age`` seconds."""
+        query = 'SELECT data FROM products WHERE product_id = ? AND updated_at >= ?'
+        parameters = [int(product_id), time.time() - max_age if max_age is not None else 0]
+        if country is not None:
+            query += ' AND country = ?'
+            parameters.append(country)
+        with self._lock:
+            row = self._connection.execute(query + ' ORDER BY updated_at DESC LIMIT 1', parameters).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return models.Product(**json.loads(row[0]))
+
+    def iter_products(self, category_id: int = None, country: str = None,
+                      max_price: float = None) -> Iterable[models.Product]:
+        """Yields the stored products matching the filters, cheapest first."""
+        conditions, parameters = [], []
+        if category_id is not None:
+            conditions.append('category_id = ?')
+            parameters.append(category_id)
+        if country is not None:
+            conditions.append('country = ?')
+            parameters.append(country)
+        if max_price is not None:
+            conditions.append('target_sale_price <= ?')
+            parameters.append(max_price)
+        query = 'SELECT data FROM products'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY target_sale_price'
+        # Rows are read in batches, the whole result is never loaded at once
+        with self._lock:
+            cursor = self._connection.execute(query, parameters)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield models.Product(**json.loads(data))
+
+    def purge(self, max_age: float) -> int:
+        """Deletes the products not refreshed in ``max_age`` seconds and returns how many."""
+        with self._lock, self._connection:
+            cursor = self._connection.execute('DELETE FROM products WHERE updated_at < ?', (time.time() - max_age,))
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._connection.execute('SELECT COUNT(*) FROM products').fetchone()[0]
+            feeds = self._connection.execute('SELECT COUNT(*), SUM(finished) FROM checkpoints').fetchone()
+        return {
+            'size': size,
+            'feeds': feeds[0],
+            'finished_feeds': feeds[1] or 0,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
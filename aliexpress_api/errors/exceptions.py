@@ -39,3 +39,15 @@ class CategoriesNotFoudException(AliexpressException):
 class InvalidTrackingIdException(AliexpressException):
     """Raised if the tracking ID is not present or invalid"""
     pass
+
+class OrdersNotFoudException(AliexpressException):
+    """Raised if no orders are found"""
+    pass
+
+class RateLimitTimeoutException(ApiRequestException):
+    """Raised if a request waited too long for the client side rate limiter"""
+    pass
+
+class CircuitOpenException(ApiRequestException):
+    """Raised without calling the API while its circuit breaker is open"""
+    pass
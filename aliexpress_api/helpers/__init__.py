@@ -1,4 +1,7 @@
 from .requests import api_request
-from .arguments import get_list_as_string, get_product_ids
+from .arguments import get_list_as_string, get_product_ids, get_time_string
 from .products import parse_products
+from .orders import parse_orders
 from .categories import filter_parent_categories, filter_child_categories
+from .pagination import PageIterator, AsyncPageIterator
+from .streaming import ResponseStream, AsyncResponseStream
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from ..tools.get_product_id import get_product_id
 from ..errors.exceptions import InvalidArgumentException
 
@@ -28,3 +30,14 @@ def get_product_ids(values):
         product_ids.append(get_product_id(value))
 
     return product_ids
+
+
+def get_time_string(value):
+    if value is None or isinstance(value, str):
+        return value
+
+    elif isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+
+    else:
+        raise InvalidArgumentException('Argument should be a datetime or string: ' + str(value))
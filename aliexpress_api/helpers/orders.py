@@ -0,0 +1,13 @@
+from .. import models
+
+
+def parse_order(values):
+    """Builds an ``Order`` from an order decoded as a ``dict``."""
+    return models.Order(**values)
+
+
+def parse_orders(response):
+    """Builds an ``OrdersResponse`` from a response decoded with ``decode_object``."""
+    values = dict(vars(response))
+    orders = getattr(values.pop('orders', None), 'order', None) or []
+    return models.OrdersResponse(orders=[models.Order(**vars(order)) for order in orders], **values)
@@ -0,0 +1,145 @@
+"""Streaming iteration over paginated API calls.
+
+``PageIterator`` yields the items of every page of a ``page_no``/``page_size`` call
+one by one. The next page is fetched in the background while the current one is
+consumed, so at most two pages are held in memory. ``cursor`` tells where the
+iteration stopped, and passing it back resumes from the following item.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Tuple
+
+
+Page = Tuple[List[Any], int]
+
+
+class PageIterator:
+    """Iterates over every item of a paginated call, prefetching the next page.
+
+    Args:
+        fetch_page (callable): Called with a page number, returns the items of the page
+            and the total number of records. An empty page ends the iteration.
+        page_size (``int``): Items requested per page.
+        cursor (``dict``): Cursor returned by a previous iteration to resume from.
+            Defaults to the first page.
+        max_pages (``int``): Stop after fetching this many pages. Defaults to no limit.
+        max_items (``int``): Stop after yielding this many items. Defaults to no limit.
+        max_requests_per_second (``float``): Request budget for the page fetches.
+            Defaults to no limit.
+    """
+
+    def __init__(self,
+        fetch_page: Callable[[int], Page],
+        page_size: int = 50,
+        cursor: dict = None,
+        max_pages: int = None,
+        max_items: int = None,
+        max_requests_per_second: float = None):
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.max_items = max_items
+        self.min_interval = 1 / max_requests_per_second if max_requests_per_second else 0.0
+        self.pages_fetched = 0
+        self.items_yielded = 0
+        cursor = cursor or {}
+        self._page_no = cursor.get('page_no', 1)
+        self._offset = cursor.get('offset', 0)
+        self._last_request = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def cursor(self) -> dict:
+        """Position of the next item, can be passed back to resume the iteration."""
+        return {'page_no': self._page_no, 'offset': self._offset}
+
+    def _wait_for_budget(self) -> float:
+        """Reserves the next request slot, returns the seconds to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._last_request + self.min_interval)
+            self._last_request = start
+            return start - now
+
+    def _has_next_page(self, page_no: int, items: List[Any], total: int) -> bool:
+        if len(items) < self.page_size or page_no * self.page_size >= total:
+            return False
+        if self.max_items is not None and self.items_yielded + len(items) - self._offset >= self.max_items:
+            return False
+        return self.max_pages is None or self.pages_fetched < self.max_pages
+
+    def _fetch(self, page_no: int) -> Page:
+        delay = self._wait_for_budget()
+        if delay > 0:
+            time.sleep(delay)
+        self.pages_fetched += 1
+        return self.fetch_page(page_no)
+
+    def _items(self, page_no: int, items: List[Any]):
+        """Yields the items of a page from the cursor offset and advances the cursor."""
+        for index in range(self._offset, len(items)):
+            if self.max_items is not None and self.items_yielded >= self.max_items:
+                return False
+            self._offset = index + 1
+            self.items_yielded += 1
+            yield items[index]
+        self._page_no, self._offset = page_no + 1, 0
+        return True
+
+    def __iter__(self):
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='page-prefetch')
+        # Pages are fetched in the context of the caller, so they keep its request priority
+        future = executor.submit(contextvars.copy_context().run, self._fetch, self._page_no)
+        try:
+            while future is not None:
+                page_no = self._page_no
+                items, total = future.result()
+                future = None
+                if self._has_next_page(page_no, items, total):
+                    future = executor.submit(contextvars.copy_context().run, self._fetch, page_no + 1)
+                finished = yield from self._items(page_no, items)
+                if not finished:
+                    return
+        finally:
+            # Early termination: drop the page that is still waiting for its turn
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+
+class AsyncPageIterator(PageIterator):
+    """Asynchronous ``PageIterator``, ``fetch_page`` is a coroutine function.
+
+    Takes the same arguments as ``PageIterator`` and is consumed with ``async for``.
+    """
+
+    def __iter__(self):
+        raise TypeError('AsyncPageIterator must be consumed with "async for"')
+
+    async def _fetch(self, page_no: int) -> Page:
+        delay = self._wait_for_budget()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.pages_fetched += 1
+        return await self.fetch_page(page_no)
+
+    async def __aiter__(self):
+        task = asyncio.ensure_future(self._fetch(self._page_no))
+        try:
+            while task is not None:
+                page_no = self._page_no
+                items, total = await task
+                task = None
+                if self._has_next_page(page_no, items, total):
+                    task = asyncio.ensure_future(self._fetch(page_no + 1))
+                for item in self._items(page_no, items):
+                    yield item
+                if self._page_no == page_no:
+                    return
+        finally:
+            if task is not None:
+                task.cancel()
@@ -1,5 +1,10 @@
+from .. import models
+
+
 def parse_product(product):
-    product.product_small_image_urls = product.product_small_image_urls.string
+    small_image_urls = getattr(product, 'product_small_image_urls', None)
+    if small_image_urls is not None and hasattr(small_image_urls, 'string'):
+        product.product_small_image_urls = small_image_urls.string
     return product
 
 
@@ -10,3 +15,8 @@ def parse_products(products):
         new_products.append(parse_product(product))
 
     return new_products
+
+
+def build_product(item):
+    """Builds a ``Product`` from a product decoded with ``decode_object``."""
+    return parse_product(models.Product(**vars(item)))
@@ -1,21 +1,76 @@
+import asyncio
+import time
 from types import SimpleNamespace
-import json
 
 from ..errors import ApiRequestException, ApiRequestResponseException
+from .. import models
 
 
-def api_request(request, response_name):
-    try:
-        response = request.getResponse()
-    except Exception as error:
-        if hasattr(error, 'message'):
-            raise ApiRequestException(error.message) from error
-        raise ApiRequestException(error) from error
+def decode_object(values):
+    """json object_hook: builds the response objects while the body is parsed."""
+    return SimpleNamespace(**values)
+
+
+class ItemsDecoder:
+    """json object_hook of one endpoint: builds the typed items while the body is parsed.
+
+    The items list is the only value of its wrapper object, such as ``{"product": [...]}``.
+    JSON objects are decoded innermost first, so the items are built from their
+    fields when the wrapper is decoded, and the object holding the wrapper under
+    ``container_key`` becomes ``response_model``. Every other object becomes a
+    ``SimpleNamespace``.
+
+    Args:
+        items_key (``str``): Key of the items list in its wrapper, such as ``'product'``.
+        item_factory (``callable``): Builds an item from its fields, such as ``models.Product``.
+        container_key (``str``): Key of the wrapper in the response result, such as ``'products'``.
+        response_model (``type``): Model of the response result. Defaults to ``SimpleNamespace``.
+    """
+
+    __slots__ = ('items_key', 'item_factory', 'container_key', 'response_model')
+
+    def __init__(self, items_key, item_factory, container_key=None, response_model=None):
+        self.items_key = items_key
+        self.item_factory = item_factory
+        self.container_key = container_key
+        self.response_model = response_model
+
+    def __call__(self, values):
+        if len(values) == 1 and self.items_key in values:
+            items = values[self.items_key]
+            if type(items) is SimpleNamespace:
+                # A single item may be sent without its list
+                items = [items]
+            if type(items) is list:
+                return SimpleNamespace(**{self.items_key: [
+                    self.item_factory(**vars(item)) if type(item) is SimpleNamespace else item for item in items
+                ]})
+        if self.response_model is not None and self.container_key in values:
+            return self.response_model(**values)
+        return SimpleNamespace(**values)
 
+
+def build_category(**values):
+    if 'parent_category_id' in values:
+        return models.ChildCategory(**values)
+    return models.Category(**values)
+
+
+decode_products = ItemsDecoder('product', models.Product)
+decode_hotproducts = ItemsDecoder('product', models.Product, 'products', models.HotProductsResponse)
+decode_affiliate_links = ItemsDecoder('promotion_link', models.AffiliateLink)
+decode_categories = ItemsDecoder('category', build_category)
+
+
+def get_request_exception(error):
+    if getattr(error, 'message', None):
+        return ApiRequestException(error.message)
+    return ApiRequestException(error)
+
+
+def parse_response(response, response_name):
     try:
-        response = response[response_name]['resp_result']
-        response = json.dumps(response)
-        response = json.loads(response, object_hook=lambda d: SimpleNamespace(**d))
+        response = getattr(response, response_name).resp_result
     except Exception as error:
         raise ApiRequestResponseException(error) from error
 
@@ -23,3 +78,101 @@ def api_request(request, response_name):
         return response.result
     else:
         raise ApiRequestResponseException(f'Response code {response.resp_code} - {response.resp_msg}')
+
+
+class RequestAttempts:
+    """Retry and circuit breaker bookkeeping of one call, shared by the blocking and async loops.
+
+    Args:
+        method (``str``): API method name.
+        retry_policy (``RetryPolicy``): Policy of the api, None for no retries.
+        circuit_breaker (``CircuitBreaker``): Circuit breaker of the api, None for none.
+    """
+
+    __slots__ = ('method', 'retry_policy', 'circuit_breaker', 'attempt', 'trial')
+
+    def __init__(self, method, retry_policy=None, circuit_breaker=None):
+        self.method = method
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.attempt = 0
+        self.trial = False
+
+    def start(self):
+        """Raises ``CircuitOpenException`` if the call must fail fast."""
+        self.attempt += 1
+        self.trial = self.circuit_breaker is not None and self.circuit_breaker.before_request(self.method)
+
+    def succeeded(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success(self.method)
+
+    def failed(self, error):
+        """Returns the seconds to wait before the next attempt, or raises the error of the call."""
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure(self.method, error)
+        if self.retry_policy is not None and self.retry_policy.should_retry(error, self.attempt):
+            self.retry_policy.record_retry()
+            return self.retry_policy.get_delay(self.attempt)
+        raise get_request_exception(error) from error
+
+    def finish(self):
+        # A trial interrupted before its outcome (limiter timeout, KeyboardInterrupt,
+        # cancelled coroutine...) must not leave the circuit half open forever
+        if self.trial:
+            self.trial = False
+            self.circuit_breaker.release_trial(self.method)
+
+
+def send_request(send, method, rate_limiter=None, retry_policy=None, circuit_breaker=None):
+    """Calls ``send()`` under the rate limiter, retry policy and circuit breaker of ``method``."""
+    attempts = RequestAttempts(method, retry_policy, circuit_breaker)
+    while True:
+        attempts.start()
+        try:
+            if rate_limiter is not None:
+                rate_limiter.acquire(method)
+            try:
+                response = send()
+            except Exception as error:
+                delay = attempts.failed(error)
+            else:
+                attempts.succeeded()
+                return response
+        finally:
+            attempts.finish()
+        time.sleep(delay)
+
+
+async def async_send_request(send, method, rate_limiter=None, retry_policy=None, circuit_breaker=None):
+    """Awaits ``send()`` under the rate limiter, retry policy and circuit breaker of ``method``."""
+    attempts = RequestAttempts(method, retry_policy, circuit_breaker)
+    while True:
+        attempts.start()
+        try:
+            if rate_limiter is not None:
+                await rate_limiter.async_acquire(method)
+            try:
+                response = await send()
+            except Exception as error:
+                delay = attempts.failed(error)
+            else:
+                attempts.succeeded()
+                return response
+        finally:
+            attempts.finish()
+        await asyncio.sleep(delay)
+
+
+def api_request(request, response_name, object_hook=decode_object, rate_limiter=None,
+                retry_policy=None, circuit_breaker=None):
+    response = send_request(lambda: request.getResponse(object_hook=object_hook), request.getapiname(),
+                            rate_limiter, retry_policy, circuit_breaker)
+    return parse_response(response, response_name)
+
+
+async def async_api_request(transport, request, response_name, object_hook=decode_object, rate_limiter=None,
+                            retry_policy=None, circuit_breaker=None):
+    response = await async_send_request(lambda: transport.getResponse(request, object_hook=object_hook),
+                                        request.getapiname(), rate_limiter, retry_policy, circuit_breaker)
+    return parse_response(response, response_name)
@@ -0,0 +1,147 @@
+"""Streaming of the items of large API responses.
+
+``ResponseStream`` yields the items of one response (the products of a hot
+product page, the orders of an order list...) while its body is read from the
+socket. Items are decoded one by one by an incremental parser, so only the
+unparsed tail of the body and the current item are held in memory, whatever the
+page size.
+"""
+
+from types import SimpleNamespace
+from typing import Any, Callable, Tuple
+
+from ..errors import ApiRequestResponseException
+from ..skd.api.stream import JsonItemParser
+from .requests import async_send_request, get_request_exception, send_request
+
+
+class ResponseStream:
+    """Iterates over the items of one API response as they are received.
+
+    The request is sent when the iteration starts, a stream can be iterated once.
+    Once it is exhausted, ``result`` has the other fields of the response result,
+    such as ``total_record_count`` or ``max_query_index_id``.
+
+    Args:
+        request: The request to send.
+        response_name (``str``): The response object name, such as
+            ``'aliexpress_affiliate_hotproduct_query_response'``.
+        items_path (``tuple[str]``): Keys from the response result to the items list,
+            such as ``('products', 'product')``.
+        object_hook: json object_hook of the items.
+        parse_item (``callable``): Called with every decoded item, returns the item yielded.
+        rate_limiter (``RateLimiter``): Limits the API calls made.
+        retry_policy (``RetryPolicy``): Retries errors received before the first item.
+        circuit_breaker (``CircuitBreaker``): Fails fast while the API method keeps failing.
+    """
+
+    def __init__(self,
+        request,
+        response_name: str,
+        items_path: Tuple[str, ...],
+        object_hook: Callable = None,
+        parse_item: Callable[[Any], Any] = None,
+        rate_limiter=None,
+        retry_policy=None,
+        circuit_breaker=None):
+        self.request = request
+        self.response_name = response_name
+        self.items_path = tuple(items_path)
+        self.parse_item = parse_item
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.object_hook = object_hook
+        self.parser = None
+        self.result = None
+        self._started = False
+
+    def _start(self) -> None:
+        if self._started:
+            raise RuntimeError('A ResponseStream can only be iterated once')
+        self._started = True
+
+    def _check_response(self, finished: bool = False) -> None:
+        """Raises if the response code is an error, sets ``result`` once ``finished``."""
+        response = self.parser.envelope.get(self.response_name)
+        resp_result = response.get('resp_result') if isinstance(response, dict) else None
+        if resp_result is None:
+            if finished:
+                raise ApiRequestResponseException(f'No {self.response_name} in the response')
+            return
+
+        resp_code = resp_result.get('resp_code')
+        if (finished or resp_code is not None) and resp_code != 200:
+            raise ApiRequestResponseException(f'Response code {resp_code} - {resp_result.get("resp_msg")}')
+        if finished:
+            result = dict(resp_result.get('result') or {})
+            result.pop(self.items_path[0], None)
+            self.result = SimpleNamespace(**result)
+
+    def _new_parser(self) -> JsonItemParser:
+        """Every attempt parses its response from scratch."""
+        self.parser = JsonItemParser((self.response_name, 'resp_result', 'result') + self.items_path,
+                                     self.object_hook)
+        return self.parser
+
+    def _parse(self, item):
+        return self.parse_item(item) if self.parse_item is not None else item
+
+    def __iter__(self):
+        self._start()
+        # Errors received before the first item are raised by send_request and retried
+        items = send_request(lambda: self.request.getStreamingResponse(self._new_parser()),
+                             self.request.getapiname(), self.rate_limiter, self.retry_policy, self.circuit_breaker)
+        try:
+            first = True
+            while True:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    break
+                except Exception as error:
+                    raise get_request_exception(error) from error
+                if first:
+                    self._check_response()
+                    first = False
+                yield self._parse(item)
+        finally:
+            items.close()
+        self._check_response(finished=True)
+
+
+class AsyncResponseStream(ResponseStream):
+    """Asynchronous ``ResponseStream``, sent through an ``AsyncRestTransport``.
+
+    Takes the transport followed by the ``ResponseStream`` arguments and is consumed
+    with ``async for``.
+    """
+
+    def __init__(self, transport, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transport = transport
+
+    def __iter__(self):
+        raise TypeError('AsyncResponseStream must be consumed with "async for"')
+
+    async def __aiter__(self):
+        self._start()
+        send = lambda: self.transport.getStreamingResponse(self.request, self._new_parser())
+        items = await async_send_request(send, self.request.getapiname(), self.rate_limiter, self.retry_policy,
+                                         self.circuit_breaker)
+        try:
+            first = True
+            while True:
+                try:
+                    item = await items.__anext__()
+                except StopAsyncIteration:
+                    break
+                except Exception as error:
+                    raise get_request_exception(error) from error
+                if first:
+                    self._check_response()
+                    first = False
+                yield self._parse(item)
+        finally:
+            await items.aclose()
+        self._check_response(finished=True)
@@ -1,7 +1,8 @@
 from .languages import Language
 from .currencies import Currency
-from .request_parameters import ProductType, SortBy, LinkType
+from .request_parameters import ProductType, SortBy, LinkType, OrderStatus
 from .affiliate_link import AffiliateLink
 from .hotproducts import HotProductsResponse
 from .product import Product
 from .category import Category, ChildCategory
+from .order import Order, OrdersResponse
@@ -0,0 +1,122 @@
+class Model:
+    """Base class for API response models.
+
+    Known fields are stored in ``__slots__`` so instances have no per-instance
+    ``__dict__``. Fields returned by the API that the model does not declare are
+    kept in a small side dictionary and are still readable as attributes.
+    """
+    __slots__ = ('_extra',)
+    _field_names = ()
+    _fields = frozenset()
+    _setters = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        field_names = []
+        setters = {}
+        for klass in reversed(cls.__mro__):
+            for name in klass.__dict__.get('__slots__', ()):
+                if name != '_extra':
+                    field_names.append(name)
+                    # The slot descriptor, setting through it skips __setattr__
+                    setters[name] = klass.__dict__[name].__set__
+        cls._field_names = tuple(field_names)
+        cls._fields = frozenset(field_names)
+        cls._setters = setters
+
+    def __init__(self, **values):
+        setters = self._setters
+        extra = None
+        for key, value in values.items():
+            setter = setters.get(key)
+            if setter is not None:
+                setter(self, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        object.__setattr__(self, '_extra', extra)
+
+    def __getattr__(self, name):
+        # Only called for attributes not found in the slots
+        if not name.startswith('__') and name != '_extra':
+            extra = self._get_extra()
+            if extra and name in extra:
+                return extra[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        if name in self._fields:
+            object.__setattr__(self, name, value)
+        else:
+            extra = self._get_extra()
+            if extra is None:
+                extra = {}
+                object.__setattr__(self, '_extra', extra)
+            extra[name] = value
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        values = ', '.join(f'{key}={value!r}' for key, value in self.to_dict().items())
+        return f'{type(self).__name__}({values})'
+
+    def _get_extra(self):
+        try:
+            return object.__getattribute__(self, '_extra')
+        except AttributeError:
+            return None
+
+    def to_dict(self) -> dict:
+        """Returns the fields that were set, including the undeclared ones."""
+        values = {}
+        for key in self._field_names:
+            try:
+                values[key] = object.__getattribute__(self, key)
+            except AttributeError:
+                pass
+        extra = self._get_extra()
+        if extra:
+            values.update(extra)
+        return values
+
+
+def to_float(value, strip: str = ''):
+    """Converts an API string like '12.50' or '7.0%' to float, None if it is not a number."""
+    if value is None:
+        return None
+    try:
+        return float(str(value).strip().rstrip(strip).replace(',', ''))
+    except ValueError:
+        return None
+
+
+class Amount:
+    """Read-only attribute converting a price field to float on access."""
+
+    def __init__(self, field: str):
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return to_float(getattr(instance, self.field, None))
+
+
+class Rate:
+    """Read-only attribute converting a percentage field such as '7.0%' to float on access."""
+
+    def __init__(self, field: str):
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return to_float(getattr(instance, self.field, None), strip='%')
@@ -1,7 +1,14 @@
-class Category:
+from .base import Model
+
+
+class Category(Model):
+    __slots__ = ('category_id', 'category_name')
+
     category_id: int
     category_name: str
 
 
 class ChildCategory(Category):
+    __slots__ = ('parent_category_id',)
+
     parent_category_id: int
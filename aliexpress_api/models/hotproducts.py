@@ -1,8 +1,11 @@
+from .base import Model
 from .product import Product
 from typing import List
 
 
-class HotProductsResponse:
+class HotProductsResponse(Model):
+    __slots__ = ('current_page_no', 'current_record_count', 'total_record_count', 'products')
+
     current_page_no: int
     current_record_count: int
     total_record_count: int
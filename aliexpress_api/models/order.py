@@ -0,0 +1,65 @@
+from .base import Model, Amount, Rate
+from typing import List
+
+
+class Order(Model):
+    __slots__ = (
+        'category_id', 'commission_rate', 'completed_settlement_time', 'created_time', 'customer_parameters',
+        'effect_detail_status', 'estimated_finished_commission', 'estimated_paid_commission', 'finished_time',
+        'is_hot_product', 'is_new_buyer', 'new_buyer_bonus_commission', 'order_id', 'order_number',
+        'order_platform', 'order_status', 'order_type', 'paid_amount', 'paid_time', 'parent_order_number',
+        'product_count', 'product_detail_url', 'product_id', 'product_main_image_url', 'product_title',
+        'publisher_id', 'settled_currency', 'ship_to_country', 'sub_order_id', 'tracking_id',
+    )
+
+    category_id: int
+    commission_rate: str
+    completed_settlement_time: str
+    created_time: str
+    customer_parameters: str
+    effect_detail_status: str
+    estimated_finished_commission: str
+    estimated_paid_commission: str
+    finished_time: str
+    is_hot_product: str
+    is_new_buyer: str
+    new_buyer_bonus_commission: str
+    order_id: int
+    order_number: int
+    order_platform: str
+    order_status: str
+    order_type: str
+    paid_amount: str
+    paid_time: str
+    parent_order_number: int
+    product_count: int
+    product_detail_url: str
+    product_id: int
+    product_main_image_url: str
+    product_title: str
+    publisher_id: int
+    settled_currency: str
+    ship_to_country: str
+    sub_order_id: int
+    tracking_id: str
+
+    # Numeric values, converted from the API strings only when accessed
+    paid_amount_value = Amount('paid_amount')
+    estimated_paid_commission_value = Amount('estimated_paid_commission')
+    estimated_finished_commission_value = Amount('estimated_finished_commission')
+    commission_rate_value = Rate('commission_rate')
+
+
+class OrdersResponse(Model):
+    __slots__ = (
+        'current_page_no', 'current_record_count', 'max_query_index_id', 'min_query_index_id',
+        'total_page_no', 'total_record_count', 'orders',
+    )
+
+    current_page_no: int
+    current_record_count: int
+    max_query_index_id: str
+    min_query_index_id: str
+    total_page_no: int
+    total_record_count: int
+    orders: List[Order]
@@ -1,7 +1,20 @@
+from .base import Model, Amount, Rate
 from typing import List
 
 
-class Product:
+class Product(Model):
+    __slots__ = (
+        'app_sale_price', 'app_sale_price_currency', 'commission_rate', 'discount', 'evaluate_rate',
+        'first_level_category_id', 'first_level_category_name', 'lastest_volume',
+        'hot_product_commission_rate', 'original_price', 'original_price_currency',
+        'product_detail_url', 'product_id', 'product_main_image_url', 'product_small_image_urls',
+        'product_title', 'product_video_url', 'promotion_link', 'relevant_market_commission_rate',
+        'sale_price', 'sale_price_currency', 'second_level_category_id', 'second_level_category_name',
+        'shop_id', 'shop_url', 'target_app_sale_price', 'target_app_sale_price_currency',
+        'target_original_price', 'target_original_price_currency', 'target_sale_price',
+        'target_sale_price_currency',
+    )
+
     app_sale_price: str
     app_sale_price_currency: str
     commission_rate: str
@@ -11,7 +24,6 @@ class Product:
     first_level_category_name: str
     lastest_volume: int
     hot_product_commission_rate: str
-    lastest_volume: int
     original_price: str
     original_price_currency: str
     product_detail_url: str
@@ -34,3 +46,16 @@ class Product:
     target_original_price_currency: str
     target_sale_price: str
     target_sale_price_currency: str
+
+    # Numeric values, converted from the API strings only when accessed
+    app_sale_price_amount = Amount('app_sale_price')
+    original_price_amount = Amount('original_price')
+    sale_price_amount = Amount('sale_price')
+    target_app_sale_price_amount = Amount('target_app_sale_price')
+    target_original_price_amount = Amount('target_original_price')
+    target_sale_price_amount = Amount('target_sale_price')
+    commission_rate_value = Rate('commission_rate')
+    hot_product_commission_rate_value = Rate('hot_product_commission_rate')
+    relevant_market_commission_rate_value = Rate('relevant_market_commission_rate')
+    discount_value = Rate('discount')
+    evaluate_rate_value = Rate('evaluate_rate')
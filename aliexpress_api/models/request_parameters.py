@@ -12,3 +12,9 @@ class SortBy:
 class LinkType:
     NORMAL = 0
     HOTLINK = 2
+
+class OrderStatus:
+    PAYMENT_COMPLETED = 'Payment Completed'
+    BUYER_CONFIRMED_RECEIPT = 'Buyer Confirmed Receipt'
+    COMPLETED_SETTLEMENT = 'Completed Settlement'
+    INVALID = 'Invalid'
@@ -0,0 +1,2 @@
+from .store import OrderStore
+from .sync import OrderSync, ORDER_STATUSES
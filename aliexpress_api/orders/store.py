@@ -0,0 +1,171 @@
+"""Local SQLite store of synced affiliate orders."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from .. import models
+from ..models.base import to_float
+
+
+class OrderStore:
+    """Affiliate orders and the query index cursors they were synced with.
+
+    One row per order. The columns used for reconciliation are typed and indexed,
+    the complete order is kept as JSON. Each status has one query index cursor,
+    with the earliest start time it has been synced from.
+
+    Args:
+        path (str): Database file path.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript('''
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id TEXT PRIMARY KEY,
+                parent_order_number TEXT,
+                order_status TEXT,
+                product_id TEXT,
+                tracking_id TEXT,
+                paid_amount REAL,
+                estimated_paid_commission REAL,
+                estimated_finished_commission REAL,
+                created_time TEXT,
+                paid_time TEXT,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS orders_status_paid_time ON orders (order_status, paid_time);
+            CREATE INDEX IF NOT EXISTS orders_created_time ON orders (created_time);
+            CREATE INDEX IF NOT EXISTS orders_parent ON orders (parent_order_number);
+            DROP TABLE IF EXISTS cursors;
+            CREATE TABLE IF NOT EXISTS status_cursors (
+                status TEXT PRIMARY KEY,
+                start_query_index_id TEXT,
+                synced_from TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        ''')
+        self._connection.commit()
+
+    def save_orders(self, orders: List[models.Order]) -> None:
+        """Stores orders, replacing the stored version of the ones already known."""
+        with self._lock, self._connection:
+            self._insert_orders(orders)
+
+    def save_page(self, orders: List[models.Order], status: str, start_query_index_id: Optional[str]) -> None:
+        """Stores the orders of a page and the cursor of their status in one transaction."""
+        with self._lock, self._connection:
+            self._insert_orders(orders)
+            self._connection.execute(
+                'UPDATE status_cursors SET start_query_index_id = ?, updated_at = ? WHERE status = ?',
+                (start_query_index_id, time.time(), status)
+            )
+
+    def _insert_orders(self, orders: List[models.Order]) -> None:
+        now = time.time()
+        rows = [
+            (
+                str(order.order_id),
+                _to_str(getattr(order, 'parent_order_number', None)),
+                getattr(order, 'order_status', None),
+                _to_str(getattr(order, 'product_id', None)),
+                getattr(order, 'tracking_id', None),
+                to_float(getattr(order, 'paid_amount', None)),
+                to_float(getattr(order, 'estimated_paid_commission', None)),
+                to_float(getattr(order, 'estimated_finished_commission', None)),
+                getattr(order, 'created_time', None),
+                getattr(order, 'paid_time', None),
+                json.dumps(order.to_dict(), ensure_ascii=False, default=vars),
+                now,
+            )
+            for order in orders if getattr(order, 'order_id', None) is not None
+        ]
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO orders (order_id, parent_order_number, order_status, product_id, '
+            'tracking_id, paid_amount, estimated_paid_commission, estimated_finished_commission, '
+            'created_time, paid_time, data, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+        )
+
+    def get_cursor(self, status: str) -> Tuple[Optional[str], Optional[str]]:
+        """Returns the ``start_query_index_id`` to resume ``status`` from and the start time
+        it has been synced from, ``(None, None)`` if it was never synced."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT start_query_index_id, synced_from FROM status_cursors WHERE status = ?', (status,)
+            ).fetchone()
+        return (row[0], row[1]) if row is not None else (None, None)
+
+    def reset_cursor(self, status: str, synced_from: str) -> None:
+        """Restarts the cursor of ``status``, the next pages are synced from ``synced_from``."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO status_cursors (status, start_query_index_id, synced_from, updated_at) '
+                'VALUES (?, NULL, ?, ?)', (status, synced_from, time.time())
+            )
+
+    def get_order(self, order_id) -> Optional[models.Order]:
+        with self._lock:
+            row = self._connection.execute('SELECT data FROM orders WHERE order_id = ?', (str(order_id),)).fetchone()
+        return models.Order(**json.loads(row[0])) if row is not None else None
+
+    def iter_orders(self, status: str = None, paid_from: str = None, paid_to: str = None) -> Iterable[models.Order]:
+        """Yields the stored orders matching the filters, by paid time."""
+        conditions, parameters = [], []
+        if status is not None:
+            conditions.append('order_status = ?')
+            parameters.append(status)
+        if paid_from is not None:
+            conditions.append('paid_time >= ?')
+            parameters.append(paid_from)
+        if paid_to is not None:
+            conditions.append('paid_time <= ?')
+            parameters.append(paid_to)
+        query = 'SELECT data FROM orders'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY paid_time'
+        # Rows are read in batches, the whole result is never loaded at once
+        with self._lock:
+            cursor = self._connection.execute(query, parameters)
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(500)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield models.Order(**json.loads(data))
+
+    def commission_totals(self) -> dict:
+        """Returns the order count and estimated commissions per status."""
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT order_status, COUNT(*), SUM(estimated_paid_commission), SUM(estimated_finished_commission) '
+                'FROM orders GROUP BY order_status'
+            ).fetchall()
+        return {
+            status: {'orders': count, 'estimated_paid_commission': paid or 0.0,
+                     'estimated_finished_commission': finished or 0.0}
+            for status, count, paid, finished in rows
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._connection.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+            cursors = self._connection.execute('SELECT COUNT(*) FROM status_cursors').fetchone()[0]
+        return {'size': size, 'cursors': cursors}
+
+
+def _to_str(value):
+    return str(value) if value is not None else None
@@ -0,0 +1,138 @@
+"""Incremental affiliate order sync with ``aliexpress.affiliate.order.listbyindex``."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Union
+
+from ..helpers import get_time_string
+from ..ratelimit import BACKGROUND, request_priority
+from .. import models
+from .store import OrderStore
+
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+ORDER_STATUSES = (
+    models.OrderStatus.PAYMENT_COMPLETED,
+    models.OrderStatus.BUYER_CONFIRMED_RECEIPT,
+    models.OrderStatus.COMPLETED_SETTLEMENT,
+    models.OrderStatus.INVALID,
+)
+
+
+class OrderSync:
+    """Keeps an ``OrderStore`` up to date with the affiliate orders of a time range.
+
+    Every status has one query index cursor, saved after each page, whatever the
+    time range synced. A sync reads:
+
+    * New orders: the pages after the status cursor, in the whole time range. A
+      rolling range such as "the last 30 days" resumes from the same cursor. A
+      range starting before the earliest one synced for the status is read again
+      from its start (a backfill).
+    * Changed orders: the orders of the last ``rescan_window`` seconds of the range
+      are read again from their first page. The cursor only moves forward, so this
+      is how a change of commission, settlement or status of an order already read
+      is picked up. Changes to older orders are only seen by a sync with a larger
+      ``rescan_window`` or starting before the earliest range synced.
+
+    Statuses are synced in parallel.
+
+    Args:
+        api (``AliexpressApi``): The API instance used to request the orders.
+        store (``OrderStore``): Where orders and cursors are saved.
+        page_size (``int``): Orders per page. Defaults to 50.
+        max_workers (``int``): Statuses synced at the same time. Defaults to 4.
+        fields (``str | list[str]``): The fields to request. Defaults to all.
+        priority (``int``): Rate limiter priority of the requests. Defaults to ``BACKGROUND``.
+        rescan_window (``float``): Seconds at the end of the range read again for changed
+            orders. Defaults to 3 days, 0 disables it.
+    """
+
+    def __init__(self,
+        api,
+        store: OrderStore,
+        page_size: int = 50,
+        max_workers: int = 4,
+        fields: Union[str, List[str]] = None,
+        priority: int = BACKGROUND,
+        rescan_window: float = 3 * 24 * 60 * 60):
+        self.api = api
+        self.store = store
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.fields = fields
+        self.priority = priority
+        self.rescan_window = rescan_window
+        self.requests_sent = 0
+        self.orders_synced = 0
+        self._lock = threading.Lock()
+
+    def sync(self,
+        start_time: Union[str, datetime],
+        end_time: Union[str, datetime],
+        statuses: List[str] = ORDER_STATUSES) -> dict:
+        """Syncs the orders of every status in the time range.
+
+        Returns:
+            ``dict``: Orders synced per status. Failed statuses have the exception instead,
+            they resume from their cursor on the next call.
+        """
+        start_time, end_time = get_time_string(start_time), get_time_string(end_time)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='order-sync') as executor:
+            futures = {status: executor.submit(self.sync_status, status, start_time, end_time) for status in statuses}
+
+        results = {}
+        for status, future in futures.items():
+            error = future.exception()
+            results[status] = error if error is not None else future.result()
+        return results
+
+    def sync_status(self, status: str, start_time: Union[str, datetime], end_time: Union[str, datetime]) -> int:
+        """Syncs one status from its saved cursor and returns the number of orders saved."""
+        with request_priority(self.priority):
+            return self._sync_status(status, get_time_string(start_time), get_time_string(end_time))
+
+    def _sync_status(self, status: str, start_time: str, end_time: str) -> int:
+        cursor, synced_from = self.store.get_cursor(status)
+        backfill = synced_from is None or start_time < synced_from
+        if backfill:
+            self.store.reset_cursor(status, start_time)
+            cursor = None
+        synced = self._sync_pages(status, start_time, end_time, cursor, save_cursor=True)
+
+        if not backfill and self.rescan_window > 0:
+            rescan_from = datetime.strptime(end_time, TIME_FORMAT) - timedelta(seconds=self.rescan_window)
+            synced += self._sync_pages(status, max(start_time, rescan_from.strftime(TIME_FORMAT)), end_time,
+                                       None, save_cursor=False)
+        return synced
+
+    def _sync_pages(self, status: str, start_time: str, end_time: str, cursor, save_cursor: bool) -> int:
+        """Reads the pages from ``cursor`` until the last one, returns the number of orders saved."""
+        synced = 0
+        while True:
+            # Orders are decoded while the page is received, the raw body is never held at once
+            stream = self.api.stream_orders_by_index(start_time, end_time, status, self.fields,
+                                                     self.page_size, cursor)
+            orders = list(stream)
+            next_cursor = (getattr(stream.result, 'max_query_index_id', None)
+                           or getattr(stream.result, 'min_query_index_id', None))
+            with self._lock:
+                self.requests_sent += 1
+                self.orders_synced += len(orders)
+
+            if next_cursor is None:
+                # Nothing after the cursor yet, the next sync asks from the same place
+                next_cursor = cursor
+            if save_cursor:
+                self.store.save_page(orders, status, next_cursor)
+            else:
+                self.store.save_orders(orders)
+            synced += len(orders)
+            if len(orders) < self.page_size or next_cursor == cursor:
+                return synced
+            cursor = next_cursor
+
+    def stats(self) -> dict:
+        return {'requests': self.requests_sent, 'orders': self.orders_synced}
@@ -0,0 +1,232 @@
+"""Client side rate limiting of API calls.
+
+The Open Platform throttles every app key. ``RateLimiter`` keeps the calls of the
+whole process under a global budget and under optional per method budgets, with
+token buckets shared by all threads. Calls waiting for a token are served by
+priority: calls made in a ``request_priority(BACKGROUND)`` block (catalog
+downloads, order syncs...) wait while interactive calls are queued.
+"""
+
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from .errors import RateLimitTimeoutException
+
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+_priority = contextvars.ContextVar('aliexpress_request_priority', default=INTERACTIVE)
+
+
+def get_request_priority() -> int:
+    """Returns the priority of the calls made from the current context."""
+    return _priority.get()
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Calls made inside the block are scheduled with ``priority``, lower goes first.
+
+    The priority is a context variable: threads started inside the block do not
+    inherit it, set it in the thread itself or run the thread in
+    ``contextvars.copy_context()``. The library's own worker threads (page prefetch,
+    bulk searches) run in the context of their caller.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Refills ``rate`` tokens per second up to ``capacity``. Not thread-safe on its own.
+
+    Args:
+        rate (``float``): Tokens added per second.
+        capacity (``float``): Maximum tokens, the largest burst allowed. Defaults to ``rate``.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = max(capacity if capacity is not None else rate, 1)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        """Returns the seconds until a token is available, 0 if there is one."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def take(self) -> None:
+        self._tokens -= 1
+
+
+class _Waiter:
+    __slots__ = ('priority', 'sequence', 'method')
+
+    def __init__(self, priority, sequence, method):
+        self.priority = priority
+        self.sequence = sequence
+        self.method = method
+
+    def goes_before(self, other) -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+class RateLimiter:
+    """Token bucket rate limiter with per method budgets and a priority queue.
+
+    A waiting call gets its token once no call of a higher priority is waiting,
+    and no earlier call of the same priority is waiting for the same method.
+
+    Args:
+        rate (``float``): Calls per second allowed for the app key. Defaults to no global limit.
+        burst (``float``): Calls allowed at once above ``rate``. Defaults to ``rate``.
+        method_rates (``dict``): Calls per second allowed for an API method name, such as
+            ``{'aliexpress.affiliate.link.generate': 5}``.
+        method_bursts (``dict``): Burst per API method name. Defaults to the method rate.
+    """
+
+    def __init__(self,
+        rate: float = None,
+        burst: float = None,
+        method_rates: Dict[str, float] = None,
+        method_bursts: Dict[str, float] = None):
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        method_bursts = method_bursts or {}
+        self._method_buckets = {
+            method: TokenBucket(method_rate, method_bursts.get(method))
+            for method, method_rate in (method_rates or {}).items()
+        }
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        # asyncio.Event of every coroutine waiting in async_acquire, with its loop
+        self._async_wakeups = {}
+        self._metrics = {}
+
+    def acquire(self, method: str, priority: int = None, timeout: float = None) -> float:
+        """Blocks until the call to ``method`` is allowed and returns the seconds waited.
+
+        Raises:
+            ``RateLimitTimeoutException``: If no token was available within ``timeout`` seconds.
+        """
+        if priority is None:
+            priority = get_request_priority()
+        started_at = time.monotonic()
+        deadline = started_at + timeout if timeout is not None else None
+        with self._condition:
+            waiter = _Waiter(priority, next(self._sequence), method)
+            self._waiters.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._try_take(waiter, now)
+                    if wait == 0:
+                        break
+                    if deadline is not None:
+                        if now >= deadline:
+                            raise RateLimitTimeoutException(f'Rate limit wait timed out for {method}')
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._condition.wait(wait)
+            finally:
+                self._waiters.remove(waiter)
+                self._notify_all()
+
+            waited = time.monotonic() - started_at
+            self._record(method, priority, waited)
+        return waited
+
+    async def async_acquire(self, method: str, priority: int = None, timeout: float = None) -> float:
+        """Coroutine version of ``acquire``, waits on the event loop instead of blocking a thread.
+
+        Shares the buckets and the queue with the blocking callers. A call cancelled
+        while waiting leaves the queue without taking a token.
+
+        Raises:
+            ``RateLimitTimeoutException``: If no token was available within ``timeout`` seconds.
+        """
+        if priority is None:
+            priority = get_request_priority()
+        started_at = time.monotonic()
+        deadline = started_at + timeout if timeout is not None else None
+        wakeup = asyncio.Event()
+        with self._condition:
+            waiter = _Waiter(priority, next(self._sequence), method)
+            self._waiters.append(waiter)
+            self._async_wakeups[wakeup] = asyncio.get_running_loop()
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    wait = self._try_take(waiter, now)
+                    if wait == 0:
+                        break
+                    wakeup.clear()
+                if deadline is not None:
+                    if now >= deadline:
+                        raise RateLimitTimeoutException(f'Rate limit wait timed out for {method}')
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                try:
+                    await asyncio.wait_for(wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self._waiters.remove(waiter)
+                del self._async_wakeups[wakeup]
+                self._notify_all()
+
+        waited = time.monotonic() - started_at
+        with self._condition:
+            self._record(method, priority, waited)
+        return waited
+
+    def _notify_all(self) -> None:
+        """Wakes every waiting call, blocking or asynchronous. Called with the lock held."""
+        self._condition.notify_all()
+        for wakeup, loop in self._async_wakeups.items():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _try_take(self, waiter: _Waiter, now: float) -> Optional[float]:
+        """Takes the tokens for ``waiter`` and returns 0, or returns how long to wait.
+
+        None means waiting for another call to go first.
+        """
+        for other in self._waiters:
+            if other.goes_before(waiter) and (other.priority < waiter.priority or other.method == waiter.method):
+                return None
+        buckets = [bucket for bucket in (self._bucket, self._method_buckets.get(waiter.method)) if bucket]
+        wait = max([bucket.wait_time(now) for bucket in buckets], default=0.0)
+        if wait == 0:
+            for bucket in buckets:
+                bucket.take()
+        return wait
+
+    def _record(self, method: str, priority: int, waited: float) -> None:
+        for key in (('methods', method), ('priorities', priority)):
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = {'calls': 0, 'wait': 0.0, 'max_wait': 0.0}
+            metric['calls'] += 1
+            metric['wait'] += waited
+            metric['max_wait'] = max(metric['max_wait'], waited)
+
+    def stats(self) -> dict:
+        with self._condition:
+            stats = {'waiting': len(self._waiters), 'methods': {}, 'priorities': {}}
+            for (group, key), metric in self._metrics.items():
+                stats[group][key] = {
+                    'calls': metric['calls'],
+                    'avg_wait_ms': round(metric['wait'] / metric['calls'] * 1000, 1),
+                    'max_wait_ms': round(metric['max_wait'] * 1000, 1),
+                }
+        return stats
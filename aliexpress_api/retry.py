@@ -0,0 +1,180 @@
+"""Retries and circuit breaking for API calls.
+
+Errors are classified as transient (throttling, ISP timeouts, unavailable
+services, network failures) or permanent (invalid parameters, permissions,
+signature...). ``RetryPolicy`` retries transient errors with exponential backoff
+and full jitter. ``CircuitBreaker`` counts the transient errors of every API
+method and fails fast while a method keeps failing, instead of letting every
+worker thread wait for its own timeout.
+"""
+
+import asyncio
+import http.client
+import random
+import ssl
+import threading
+import time
+
+from .errors import CircuitOpenException
+from .skd.api.base import RequestException, TopException
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+# TopException.errorcode values worth retrying
+TRANSIENT_ERROR_CODES = {
+    '1',    # Service currently unavailable
+    '7',    # App call limited
+    '10',   # Service currently unavailable
+    'ApiCallLimit',
+    'AppCallLimit',
+    'ServiceUnavailable',
+    'ServiceTimeout',
+}
+
+# TopException.subcode prefixes, checked before the code. isp.* errors are failures
+# of the platform, isv.* errors are caused by the request and are permanent.
+TRANSIENT_SUBCODE_PREFIXES = (
+    'isp.',
+    'accesscontrol.limited-by-',
+    'ApiCallLimit',
+)
+PERMANENT_SUBCODE_PREFIXES = (
+    'isv.',
+)
+
+TRANSIENT_EXCEPTION_TYPES = (OSError, http.client.HTTPException, TimeoutError, asyncio.TimeoutError)
+# Checked first: TLS failures are OSErrors, but a certificate or protocol error fails
+# again on every attempt. Only a TLS connection closed mid-stream is transient.
+PERMANENT_EXCEPTION_TYPES = (ssl.SSLError,)
+TRANSIENT_SSL_EXCEPTION_TYPES = (ssl.SSLEOFError, ssl.SSLZeroReturnError)
+if aiohttp is not None:
+    TRANSIENT_EXCEPTION_TYPES += (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+    PERMANENT_EXCEPTION_TYPES += (aiohttp.ClientSSLError,)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Returns True if the request may succeed when sent again."""
+    if isinstance(error, TopException):
+        subcode = str(error.subcode or '')
+        if subcode.startswith(TRANSIENT_SUBCODE_PREFIXES):
+            return True
+        if subcode.startswith(PERMANENT_SUBCODE_PREFIXES):
+            return False
+        return str(error.errorcode) in TRANSIENT_ERROR_CODES
+    if isinstance(error, RequestException):
+        return error.status is not None and (error.status >= 500 or error.status == 429)
+    if isinstance(error, PERMANENT_EXCEPTION_TYPES):
+        return isinstance(error, TRANSIENT_SSL_EXCEPTION_TYPES)
+    return isinstance(error, TRANSIENT_EXCEPTION_TYPES)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient errors.
+
+    Args:
+        max_attempts (``int``): Attempts per call, including the first one. Defaults to 3.
+        base_delay (``float``): Delay cap in seconds of the first retry. Defaults to 0.2.
+        max_delay (``float``): Largest delay cap in seconds. Defaults to 5.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 5.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def should_retry(self, error: Exception, attempt: int) -> bool:
+        """``attempt`` is the number of the attempt that failed, starting at 1."""
+        return attempt < self.max_attempts and is_transient_error(error)
+
+    def get_delay(self, attempt: int) -> float:
+        """Returns the seconds to wait before the retry following ``attempt``."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def record_retry(self) -> None:
+        """Counts a retry in ``retries``. The policy is shared by all the threads of an api."""
+        with self._lock:
+            self.retries += 1
+
+
+class CircuitBreaker:
+    """Per API method circuit breaker.
+
+    After ``failure_threshold`` consecutive transient errors the circuit of the
+    method opens and calls fail with ``CircuitOpenException`` right away. After
+    ``recovery_time`` seconds one trial call is let through: it closes the circuit
+    if it succeeds and opens it again if it fails.
+
+    Args:
+        failure_threshold (``int``): Consecutive transient errors that open the circuit. Defaults to 5.
+        recovery_time (``float``): Seconds the circuit stays open. Defaults to 30.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, recovery_time: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def before_request(self, method: str) -> bool:
+        """Raises ``CircuitOpenException`` if calls to ``method`` must fail fast.
+
+        Returns True if the call is the trial call of a half open circuit. Its outcome
+        must then be recorded, or the trial released with ``release_trial``.
+        """
+        with self._lock:
+            circuit = self._circuits.get(method)
+            if circuit is None or circuit['state'] == self.CLOSED:
+                return False
+            if circuit['state'] == self.OPEN and time.monotonic() - circuit['opened_at'] >= self.recovery_time:
+                circuit['state'] = self.HALF_OPEN
+                return True
+            circuit['rejected'] += 1
+        raise CircuitOpenException(f'Circuit open for {method}, failing fast')
+
+    def release_trial(self, method: str) -> None:
+        """Ends a trial call that neither succeeded nor failed, such as a cancelled one.
+
+        The circuit opens again and the next call becomes the new trial.
+        """
+        with self._lock:
+            circuit = self._circuits.get(method)
+            if circuit is not None and circuit['state'] == self.HALF_OPEN:
+                circuit['state'] = self.OPEN
+                circuit['opened_at'] = time.monotonic() - self.recovery_time
+
+    def record_success(self, method: str) -> None:
+        with self._lock:
+            circuit = self._circuits.get(method)
+            if circuit is not None:
+                circuit['state'] = self.CLOSED
+                circuit['failures'] = 0
+
+    def record_failure(self, method: str, error: Exception) -> None:
+        if not is_transient_error(error):
+            # The endpoint answered, the request itself was wrong
+            self.record_success(method)
+            return
+        with self._lock:
+            circuit = self._circuits.setdefault(
+                method, {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0, 'rejected': 0})
+            circuit['failures'] += 1
+            if circuit['state'] == self.HALF_OPEN or circuit['failures'] >= self.failure_threshold:
+                circuit['state'] = self.OPEN
+                circuit['opened_at'] = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                method: {'state': circuit['state'], 'failures': circuit['failures'], 'rejected': circuit['rejected']}
+                for method, circuit in self._circuits.items()
+            }
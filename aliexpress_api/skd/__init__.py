@@ -3,20 +3,22 @@ Created on 2012-6-29
 
 @author: lihao
 '''
-from .api.base import sign
+from .api.base import sign, SIGN_METHOD_MD5, SIGN_METHOD_HMAC_SHA256
+from .api.pool import getDefaultConnectionPool, setDefaultConnectionPool
 
 
 
 class appinfo(object):
-    def __init__(self,appkey,secret):
+    def __init__(self,appkey,secret,sign_method=SIGN_METHOD_MD5):
         self.appkey = appkey
         self.secret = secret
+        self.sign_method = sign_method
 
 def getDefaultAppInfo():
     pass
 
 
-def setDefaultAppInfo(appkey,secret):
-    default = appinfo(appkey,secret)
+def setDefaultAppInfo(appkey,secret,sign_method=SIGN_METHOD_MD5):
+    default = appinfo(appkey,secret,sign_method)
     global getDefaultAppInfo
     getDefaultAppInfo = lambda: default
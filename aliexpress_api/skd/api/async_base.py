@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Asynchronous transport for the generated ``RestApi`` request classes.
+
+Requests are signed by ``RestApi.prepareRequest`` and parsed by
+``RestApi.parseResponse``, only the HTTP exchange runs on aiohttp. All requests
+share one ``aiohttp.ClientSession`` and its connection pool, HTTPS connections use
+the SSLContext shared with the blocking transport.
+"""
+
+from .pool import getDefaultSSLContext, DEFAULT_CHUNK_SIZE
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+
+class AsyncRestTransport(object):
+    # ===========================================================================
+    # 异步请求传输层
+    # Args @param limit: 最大同时连接数
+    #      @param limit_per_host: 每个地址的最大同时连接数
+    #      @param keepalive_timeout: 空闲连接保持打开的秒数
+    # ===========================================================================
+
+    def __init__(self, limit=100, limit_per_host=0, keepalive_timeout=30):
+        if aiohttp is None:
+            raise ImportError("aiohttp is required for the asynchronous client")
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+
+    def getSession(self):
+        # 延迟创建, session 必须在运行中的事件循环内创建
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=getDefaultSSLContext(),
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def getResponse(self, request, authrize=None, timeout=30, object_hook=None):
+        url, body, header = request.prepareRequest(authrize)
+        scheme, domain, port = request.getEndpoint()
+        async with self.getSession().request(
+            request.getHttpMethod(),
+            "%s://%s:%s%s" % (scheme, domain, port, url),
+            data=body.encode("utf-8"),
+            headers=header,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            result = await response.read()
+            return request.parseResponse(response.status, result, response.headers.get, object_hook)
+
+    async def getStreamingResponse(self, request, parser, authrize=None, timeout=30, chunk_size=DEFAULT_CHUNK_SIZE):
+        # =======================================================================
+        # 流式获取 response 结果, 参见 RestApi.getStreamingResponse
+        # 返回 items 的异步生成器
+        # =======================================================================
+        url, body, header = request.prepareRequest(authrize)
+        scheme, domain, port = request.getEndpoint()
+        response = await self.getSession().request(
+            request.getHttpMethod(),
+            "%s://%s:%s%s" % (scheme, domain, port, url),
+            data=body.encode("utf-8"),
+            headers=header,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        )
+        if response.status != 200:
+            try:
+                result = await response.read()
+            finally:
+                response.release()
+            request.parseResponse(response.status, result, response.headers.get)
+
+        # 读到第一个 item 为止, 参见 RestApi.getStreamingResponse
+        chunks = response.content.iter_chunked(chunk_size)
+        pending, finished = [], False
+        try:
+            while not pending and "error_response" not in parser.envelope:
+                try:
+                    chunk = await chunks.__anext__()
+                except StopAsyncIteration:
+                    pending, finished = parser.close(), True
+                    break
+                pending = parser.feed(chunk)
+            if "error_response" in parser.envelope:
+                request.parseStreamingResponse(parser, response.headers.get)
+        except BaseException:
+            response.close()
+            raise
+        return self._iterItems(request, parser, response, chunks, pending, finished)
+
+    async def _iterItems(self, request, parser, response, chunks, pending, finished):
+        complete = False
+        try:
+            for item in pending:
+                yield item
+            if not finished:
+                async for chunk in chunks:
+                    for item in parser.feed(chunk):
+                        yield item
+                for item in parser.close():
+                    yield item
+            complete = True
+        finally:
+            # 未读完的连接不能复用
+            if complete:
+                response.release()
+            else:
+                response.close()
+        request.parseStreamingResponse(parser, response.headers.get)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
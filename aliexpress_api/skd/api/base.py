@@ -7,13 +7,16 @@ Created on 2012-7-3
 
 
 import hashlib
-import http.client as httplib
+import hmac
 import itertools
 import json
 import mimetypes
+import re
 import time
 import urllib
 
+from .pool import getDefaultConnectionPool, DEFAULT_CHUNK_SIZE
+
 """
 定义一些系统变量
 """
@@ -40,7 +43,60 @@ P_SUB_MSG = "sub_msg"
 N_REST = "/sync"
 
 
-def sign(secret, parameters):
+SIGN_METHOD_MD5 = "md5"
+SIGN_METHOD_HMAC_SHA256 = "hmac-sha256"
+
+SYS_PARAMETER_KEYS = (
+    P_FORMAT,
+    P_APPKEY,
+    P_SIGN_METHOD,
+    P_VERSION,
+    P_TIMESTAMP,
+    P_PARTNER_ID,
+    P_API,
+    P_SESSION,
+)
+
+
+class Signer(object):
+    # ===========================================================================
+    # 签名上下文
+    # 密钥只哈希一次: md5 签名是 md5(secret + 参数 + secret), 前缀的哈希状态被预先计算,
+    # 每次签名只复制状态; hmac-sha256 同样复制预先计算的 hmac 对象
+    # ===========================================================================
+    def __init__(self, secret, sign_method=SIGN_METHOD_MD5):
+        secret = secret.encode("utf-8")
+        if sign_method == SIGN_METHOD_MD5:
+            self.__prefix = hashlib.md5(secret)
+            self.__suffix = secret
+        elif sign_method == SIGN_METHOD_HMAC_SHA256:
+            self.__prefix = hmac.new(secret, digestmod=hashlib.sha256)
+            self.__suffix = None
+        else:
+            raise ValueError("unsupported sign_method: %s" % sign_method)
+        self.sign_method = sign_method
+
+    def sign(self, parameters):
+        # @param parameters: 排序后拼接好的参数 string
+        digest = self.__prefix.copy()
+        digest.update(parameters.encode("utf-8"))
+        if self.__suffix is not None:
+            digest.update(self.__suffix)
+        return digest.hexdigest().upper()
+
+
+_signers = {}
+
+
+def getSigner(secret, sign_method=SIGN_METHOD_MD5):
+    # 每个 (secret, sign_method) 只创建一次
+    signer = _signers.get((secret, sign_method))
+    if signer is None:
+        signer = _signers[(secret, sign_method)] = Signer(secret, sign_method)
+    return signer
+
+
+def sign(secret, parameters, sign_method=SIGN_METHOD_MD5):
     # ===========================================================================
     # '''签名方法
     # @param secret: 签名需要的密钥
@@ -49,18 +105,33 @@ def sign(secret, parameters):
     # ===========================================================================
     # 如果parameters 是字典类的话
     if hasattr(parameters, "items"):
-        keys = parameters.keys()
-        keys = list(keys)
-        keys.sort()
-
-        parameters = "%s%s%s" % (
-            secret,
-            str().join("%s%s" % (key, parameters[key]) for key in keys),
-            secret,
+        parameters = "".join(
+            "%s%s" % (key, parameters[key]) for key in sorted(parameters)
         )
-    parameters = parameters.encode("utf-8")
-    sign = hashlib.md5(parameters).hexdigest().upper()
-    return sign
+    elif sign_method == SIGN_METHOD_MD5:
+        # 字符串参数已经包含密钥
+        return hashlib.md5(parameters.encode("utf-8")).hexdigest().upper()
+    return getSigner(secret, sign_method).sign(parameters)
+
+
+_isSafeValue = re.compile(r"[A-Za-z0-9_.~-]*").fullmatch
+
+
+def quoteValue(value):
+    # 大部分参数 (数字, id, 方法名) 不需要转义, 只转义其余的参数
+    if type(value) is not str:
+        value = str(value)
+    if _isSafeValue(value):
+        return value
+    return urllib.parse.quote_plus(value)
+
+
+def urlencode(parameters):
+    # 与 urllib.parse.urlencode 的结果相同
+    return "&".join(
+        "%s=%s" % (quoteValue(key), quoteValue(value))
+        for key, value in parameters.items()
+    )
 
 
 def mixStr(pstr):
@@ -72,6 +143,13 @@ def mixStr(pstr):
         return str(pstr)
 
 
+def getField(obj, key):
+    # 兼容 dict 和 object_hook 生成的对象
+    if isinstance(obj, dict):
+        return obj.get(key)
+    return getattr(obj, key, None)
+
+
 class FileItem(object):
     def __init__(self, filename=None, content=None):
         self.filename = filename
@@ -181,8 +259,59 @@ class TopException(Exception):
 class RequestException(Exception):
     # ===========================================================================
     # 请求连接异常类
+    # Args @param status: HTTP 状态码, None 表示没有收到响应
     # ===========================================================================
-    pass
+    def __init__(self, message, status=None):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class ParameterSchema(object):
+    # ===========================================================================
+    # 请求类的参数表
+    # 每个请求类编译一次: 属性名到参数名的映射, 以及签名时所有参数 (系统参数和应用参数)
+    # 的排序, 每次请求不再遍历 __dict__ 和排序
+    # ===========================================================================
+    def __init__(self, request):
+        self.keys = frozenset(request.__dict__)
+        multipart = set(request.getMultipartParas())
+        translate = request.getTranslateParas()
+        fields = []
+        for key in request.__dict__:
+            if key.startswith("__") or key.startswith("_RestApi__") or key in multipart:
+                continue
+            name = key[1:] if key.startswith("_") else key
+            # 查询翻译字典来规避一些关键字属性
+            fields.append((translate.get(name, name), key))
+        self.fields = tuple(fields)
+        self.sign_order = tuple(
+            sorted(set(SYS_PARAMETER_KEYS).union(name for name, key in fields))
+        )
+
+    def matches(self, request):
+        return self.keys == request.__dict__.keys()
+
+    def getApplicationParameters(self, request):
+        values = request.__dict__
+        return {
+            name: values[key] for name, key in self.fields if values[key] is not None
+        }
+
+    def getSignString(self, sys_parameters, application_parameter):
+        # 与 sys_parameters.update(application_parameter) 后排序拼接的结果相同
+        parts = []
+        for name in self.sign_order:
+            value = application_parameter.get(name)
+            if value is None:
+                value = sys_parameters.get(name)
+                if value is None:
+                    continue
+            parts.append(name)
+            parts.append(value if type(value) is str else str(value))
+        return "".join(parts)
+
+
+_parameter_schemas = {}
 
 
 class RestApi(object):
@@ -190,7 +319,7 @@ class RestApi(object):
     # Rest api的基类
     # ===========================================================================
 
-    def __init__(self, domain="api-sg.aliexpress.com", port=80):
+    def __init__(self, domain="api-sg.aliexpress.com", port=443):
         # =======================================================================
         # 初始化基类
         # Args @param domain: 请求的域名或者ip
@@ -201,9 +330,9 @@ class RestApi(object):
         self.__httpmethod = "POST"
         from .. import getDefaultAppInfo
 
+        self.__sign_method = SIGN_METHOD_MD5
         if getDefaultAppInfo():
-            self.__app_key = getDefaultAppInfo().appkey
-            self.__secret = getDefaultAppInfo().secret
+            self.set_app_info(getDefaultAppInfo())
 
     def get_request_header(self):
         return {
@@ -220,6 +349,7 @@ class RestApi(object):
         # =======================================================================
         self.__app_key = appinfo.appkey
         self.__secret = appinfo.secret
+        self.__sign_method = getattr(appinfo, "sign_method", SIGN_METHOD_MD5)
 
     def getapiname(self):
         return ""
@@ -230,40 +360,46 @@ class RestApi(object):
     def getTranslateParas(self):
         return {}
 
+    def getParameterSchema(self):
+        # 请求类的参数表, 实例的属性与编译时不同 (例如后来添加的属性) 时重新编译
+        schema = _parameter_schemas.get(self.__class__)
+        if schema is None or not schema.matches(self):
+            schema = _parameter_schemas[self.__class__] = ParameterSchema(self)
+        return schema
+
     def _check_requst(self):
         pass
 
-    def getResponse(self, authrize=None, timeout=30):
+    def getEndpoint(self):
         # =======================================================================
-        # 获取response结果
+        # 请求地址 (scheme, domain, port)
         # =======================================================================
-        if self.__port == 443:
-            connection = httplib.HTTPSConnection(
-                self.__domain, self.__port, timeout=timeout
-            )
-        else:
-            connection = httplib.HTTPConnection(
-                self.__domain, self.__port, timeout=timeout
-            )
-        timestamp_temp = "%.2f" % (float(time.time()))
-        timestamp_temp = str(int(float(timestamp_temp) * 1000))
+        scheme = "https" if self.__port == 443 else "http"
+        return scheme, self.__domain, self.__port
+
+    def getHttpMethod(self):
+        return self.__httpmethod
 
+    def prepareRequest(self, authrize=None):
+        # =======================================================================
+        # 生成签名后的请求 (url, body, header), 同步和异步传输层共用
+        # =======================================================================
         sys_parameters = {
             P_FORMAT: "json",
             P_APPKEY: self.__app_key,
-            P_SIGN_METHOD: "md5",
+            P_SIGN_METHOD: self.__sign_method,
             P_VERSION: "2.0",
-            P_TIMESTAMP: timestamp_temp,
+            P_TIMESTAMP: str(int(time.time() * 1000)),
             P_PARTNER_ID: SYSTEM_GENERATE_VERSION,
             P_API: self.getapiname(),
         }
         if authrize is not None:
             sys_parameters[P_SESSION] = authrize
-        application_parameter = self.getApplicationParameters()
-        sign_parameter = sys_parameters.copy()
-        sign_parameter.update(application_parameter)
-        sys_parameters[P_SIGN] = sign(self.__secret, sign_parameter)
-        connection.connect()
+        schema = self.getParameterSchema()
+        application_parameter = schema.getApplicationParameters(self)
+        sys_parameters[P_SIGN] = getSigner(self.__secret, self.__sign_method).sign(
+            schema.getSignString(sys_parameters, application_parameter)
+        )
 
         header = self.get_request_header()
         if self.getMultipartParas():
@@ -277,56 +413,120 @@ class RestApi(object):
             body = str(form)
             header["Content-type"] = form.get_content_type()
         else:
-            body = urllib.parse.urlencode(application_parameter)
+            body = urlencode(application_parameter)
 
-        url = N_REST + "?" + urllib.parse.urlencode(sys_parameters)
-        connection.request(self.__httpmethod, url, body=body, headers=header)
-        response = connection.getresponse()
-        if response.status != 200:
+        url = N_REST + "?" + urlencode(sys_parameters)
+        return url, body, header
+
+    def parseResponse(self, status, result, getheader, object_hook=None):
+        # =======================================================================
+        # 解析响应结果
+        # @param getheader: 返回响应头的函数, 没有该响应头时返回默认值
+        # @param object_hook: json object_hook, 响应体直接解析为调用方的对象而不是 dict
+        # =======================================================================
+        if status != 200:
             raise RequestException(
                 "invalid http status "
-                + str(response.status)
+                + str(status)
                 + ",detail body:"
-                + response.read()
+                + result.decode("utf-8", "replace"),
+                status=status,
             )
-        result = response.read()
-        jsonobj = json.loads(result)
-        if "error_response" in jsonobj:
-            error = TopException()
-            if P_CODE in jsonobj["error_response"]:
-                error.errorcode = jsonobj["error_response"][P_CODE]
-            if P_MSG in jsonobj["error_response"]:
-                error.message = jsonobj["error_response"][P_MSG]
-            if P_SUB_CODE in jsonobj["error_response"]:
-                error.subcode = jsonobj["error_response"][P_SUB_CODE]
-            if P_SUB_MSG in jsonobj["error_response"]:
-                error.submsg = jsonobj["error_response"][P_SUB_MSG]
-            error.application_host = response.getheader("Application-Host", "")
-            error.service_host = response.getheader("Location-Host", "")
-            raise error
+        jsonobj = json.loads(result, object_hook=object_hook)
+        error_response = getField(jsonobj, "error_response")
+        if error_response is not None:
+            raise self.getTopException(error_response, getheader)
         return jsonobj
 
+    def getTopException(self, error_response, getheader):
+        error = TopException()
+        error.errorcode = getField(error_response, P_CODE)
+        error.message = getField(error_response, P_MSG)
+        error.subcode = getField(error_response, P_SUB_CODE)
+        error.submsg = getField(error_response, P_SUB_MSG)
+        error.application_host = getheader("Application-Host", "")
+        error.service_host = getheader("Location-Host", "")
+        return error
+
+    def parseStreamingResponse(self, parser, getheader):
+        # =======================================================================
+        # 流式响应结束后检查 error_response
+        # =======================================================================
+        error_response = parser.envelope.get("error_response")
+        if error_response is not None:
+            raise self.getTopException(error_response, getheader)
+
+    def getResponse(self, authrize=None, timeout=30, object_hook=None):
+        # =======================================================================
+        # 获取response结果
+        # =======================================================================
+        url, body, header = self.prepareRequest(authrize)
+        scheme, domain, port = self.getEndpoint()
+        # 复用连接池中的长连接
+        response, result = getDefaultConnectionPool().request(
+            scheme,
+            domain,
+            port,
+            self.__httpmethod,
+            url,
+            body=body,
+            headers=header,
+            timeout=timeout,
+        )
+        return self.parseResponse(response.status, result, response.getheader, object_hook)
+
+    def getStreamingResponse(self, parser, authrize=None, timeout=30, chunk_size=DEFAULT_CHUNK_SIZE):
+        # =======================================================================
+        # 流式获取 response 结果
+        # @param parser: JsonItemParser, 它的 envelope 保存响应的其余部分
+        # 发送请求并检查状态, 返回 items 的生成器, 边从套接字读取响应体边解析
+        # =======================================================================
+        url, body, header = self.prepareRequest(authrize)
+        scheme, domain, port = self.getEndpoint()
+        response, chunks = getDefaultConnectionPool().stream(
+            scheme,
+            domain,
+            port,
+            self.__httpmethod,
+            url,
+            body=body,
+            headers=header,
+            timeout=timeout,
+            chunk_size=chunk_size,
+        )
+        if response.status != 200:
+            self.parseResponse(response.status, b"".join(chunks), response.getheader)
+
+        # 读到第一个 item 为止: error_response 和 getResponse 一样在这次调用中抛出,
+        # 调用方的重试和熔断可以处理它
+        pending, finished = [], False
+        try:
+            while not pending and "error_response" not in parser.envelope:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    pending, finished = parser.close(), True
+                    break
+                pending = parser.feed(chunk)
+            if "error_response" in parser.envelope:
+                self.parseStreamingResponse(parser, response.getheader)
+        except BaseException:
+            chunks.close()
+            raise
+        return self.__iterItems(parser, chunks, response.getheader, pending, finished)
+
+    def __iterItems(self, parser, chunks, getheader, pending, finished):
+        try:
+            for item in pending:
+                yield item
+            if not finished:
+                for chunk in chunks:
+                    for item in parser.feed(chunk):
+                        yield item
+                for item in parser.close():
+                    yield item
+        finally:
+            chunks.close()
+        self.parseStreamingResponse(parser, getheader)
+
     def getApplicationParameters(self):
-        application_parameter = {}
-        for key in self.__dict__:
-            value = self.__dict__[key]
-            if (
-                not key.startswith("__")
-                and not key in self.getMultipartParas()
-                and not key.startswith("_RestApi__")
-                and value is not None
-            ):
-                if key.startswith("_"):
-                    application_parameter[key[1:]] = value
-                else:
-                    application_parameter[key] = value
-        # 查询翻译字典来规避一些关键字属性
-        translate_parameter = self.getTranslateParas()
-        for key in application_parameter:
-            value = application_parameter[key]
-            if key in translate_parameter:
-                application_parameter[translate_parameter[key]] = application_parameter[
-                    key
-                ]
-                del application_parameter[key]
-        return application_parameter
+        return self.getParameterSchema().getApplicationParameters(self)
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Process-wide keep-alive connection pool shared by every ``RestApi`` request.
+
+Connections are kept per (scheme, domain, port) and reused while they are
+healthy, so consecutive API calls skip the TCP (and TLS) handshake. HTTPS
+connections share one ``SSLContext`` and resume the last TLS session of their
+endpoint, so a new connection skips the full handshake as well.
+"""
+
+
+import http.client as httplib
+import select
+import ssl
+import threading
+import time
+from collections import deque
+
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_IDLE_TIMEOUT = 30.0
+DEFAULT_CHUNK_SIZE = 16 * 1024
+
+# 服务器在两次请求之间关闭了长连接时抛出的异常
+STALE_CONNECTION_ERRORS = (
+    httplib.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+_default_ssl_context = None
+
+
+def getDefaultSSLContext():
+    # ===========================================================================
+    # 共享的 SSLContext, 延迟创建 (加载 CA 证书有开销)
+    # ===========================================================================
+    global _default_ssl_context
+    if _default_ssl_context is None:
+        _default_ssl_context = ssl.create_default_context()
+    return _default_ssl_context
+
+
+class ResumingHTTPSConnection(httplib.HTTPSConnection):
+    # ===========================================================================
+    # 支持 TLS 会话复用的 HTTPS 连接
+    # Args @param tls_session: 提供给服务器的 ssl.SSLSession, None 表示完整握手
+    # ===========================================================================
+
+    def __init__(self, host, port=None, timeout=30, context=None, tls_session=None):
+        httplib.HTTPSConnection.__init__(self, host, port, timeout=timeout, context=context)
+        self.tls_session = tls_session
+        self.tls_session_saved = False
+
+    def connect(self):
+        httplib.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host if self._tunnel_host else self.host
+        self.sock = self._context.wrap_socket(
+            self.sock, server_hostname=server_hostname, session=self.tls_session
+        )
+
+
+class ConnectionPool(object):
+    # ===========================================================================
+    # 线程安全的长连接池
+    # Args @param max_size: 每个 (scheme, domain, port) 保留的空闲连接数
+    #      @param idle_timeout: 空闲连接超过该秒数后被丢弃
+    #      @param ssl_context: HTTPS 连接的 SSLContext, 默认为 getDefaultSSLContext()
+    # ===========================================================================
+
+    def __init__(self, max_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT, ssl_context=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._tls_sessions = {}
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self.tls_resumed = 0
+
+    def new_connection(self, key, timeout):
+        scheme, domain, port = key
+        with self._lock:
+            self.connections_opened += 1
+            tls_session = self._tls_sessions.get(key)
+        if scheme == "https":
+            return ResumingHTTPSConnection(
+                domain,
+                port,
+                timeout=timeout,
+                context=self.ssl_context or getDefaultSSLContext(),
+                tls_session=tls_session,
+            )
+        return httplib.HTTPConnection(domain, port, timeout=timeout)
+
+    def save_tls_session(self, key, connection):
+        # =======================================================================
+        # 保存 TLS 会话供新连接复用; TLS 1.3 的会话票据在握手之后才到达,
+        # 所以读取响应之后再保存会话
+        # =======================================================================
+        if not isinstance(connection, ResumingHTTPSConnection) or connection.tls_session_saved:
+            return
+        session = getattr(connection.sock, "session", None)
+        if session is None:
+            return
+        with self._lock:
+            self.tls_handshakes += 1
+            if connection.sock.session_reused:
+                self.tls_resumed += 1
+            self._tls_sessions[key] = session
+        # 每个连接只记录一次
+        connection.tls_session_saved = True
+
+    def is_usable(self, connection, released_at):
+        # =======================================================================
+        # 健康检查: 套接字仍然打开, 空闲时间没有超时, 并且没有可读的数据
+        # (空闲的套接字可读表示对方已关闭或收到了异常数据)
+        # =======================================================================
+        if connection.sock is None:
+            return False
+        if time.monotonic() - released_at > self.idle_timeout:
+            return False
+        try:
+            readable, _, _ = select.select([connection.sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def acquire(self, key, timeout):
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                connection, released_at = idle.pop()
+            if self.is_usable(connection, released_at):
+                connection.timeout = timeout
+                connection.sock.settimeout(timeout)
+                return connection, True
+            connection.close()
+        return self.new_connection(key, timeout), False
+
+    def release(self, key, connection):
+        if connection.sock is None:
+            return
+        expired = []
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            now = time.monotonic()
+            while idle and now - idle[0][1] > self.idle_timeout:
+                expired.append(idle.popleft()[0])
+            if len(idle) < self.max_size:
+                idle.append((connection, now))
+            else:
+                expired.append(connection)
+        for stale in expired:
+            stale.close()
+
+    def send(self, key, method, url, body=None, headers=None, timeout=30):
+        # =======================================================================
+        # 发送请求并读取响应头
+        # 返回 (connection, response). 在复用的连接上失败的请求在新连接上重试一次
+        # =======================================================================
+        connection, reused = self.acquire(key, timeout)
+        while True:
+            try:
+                connection.request(method, url, body=body, headers=headers or {})
+                return connection, connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if not reused:
+                    raise
+                connection, reused = self.new_connection(key, timeout), False
+            except Exception:
+                connection.close()
+                raise
+
+    def finish(self, key, connection, response):
+        # 响应已完整读取, 连接可以复用时放回连接池
+        self.save_tls_session(key, connection)
+        if response.will_close:
+            connection.close()
+        else:
+            self.release(key, connection)
+
+    def request(self, scheme, domain, port, method, url, body=None, headers=None, timeout=30):
+        # =======================================================================
+        # 发送请求并读取完整响应
+        # 返回 (response, body bytes)
+        # =======================================================================
+        key = (scheme, domain, port)
+        connection, response = self.send(key, method, url, body, headers, timeout)
+        try:
+            data = response.read()
+        except Exception:
+            connection.close()
+            raise
+        self.finish(key, connection, response)
+        return response, data
+
+    def stream(self, scheme, domain, port, method, url, body=None, headers=None, timeout=30,
+               chunk_size=DEFAULT_CHUNK_SIZE):
+        # =======================================================================
+        # 发送请求, 响应体按块读取
+        # 返回 (response, chunks), chunks 是响应体数据块的生成器. 响应体读完后
+        # 连接放回连接池, 生成器提前关闭时连接被关闭
+        # =======================================================================
+        key = (scheme, domain, port)
+        connection, response = self.send(key, method, url, body, headers, timeout)
+        return response, self._iterBody(key, connection, response, chunk_size)
+
+    def _iterBody(self, key, connection, response, chunk_size):
+        complete = False
+        try:
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+            complete = True
+        finally:
+            if complete:
+                self.finish(key, connection, response)
+            else:
+                connection.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "idle": sum(len(connections) for connections in self._idle.values()),
+                "opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes,
+                "tls_resumed": self.tls_resumed,
+            }
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            self._tls_sessions = {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+
+
+_default_pool = ConnectionPool()
+
+
+def getDefaultConnectionPool():
+    return _default_pool
+
+
+def setDefaultConnectionPool(max_size=None, idle_timeout=None, ssl_context=None):
+    # ===========================================================================
+    # 配置全局连接池; 已有的空闲连接保留
+    # ===========================================================================
+    if max_size is not None:
+        _default_pool.max_size = max_size
+    if idle_timeout is not None:
+        _default_pool.idle_timeout = idle_timeout
+    if ssl_context is not None:
+        _default_pool.ssl_context = ssl_context
+    return _default_pool
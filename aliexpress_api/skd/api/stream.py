@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental parser for large JSON responses.
+
+The body is fed chunk by chunk as it is read from the socket. The items of the
+array at ``path`` are decoded one by one as soon as they are complete, every
+other value is kept in ``envelope``. Only the unparsed tail of the body is
+buffered, so memory is bounded by the largest item instead of the response.
+"""
+
+import codecs
+import json
+import re
+
+WHITESPACE = " \t\n\r"
+
+# 解析状态
+_KEY_OR_END = 0
+_KEY = 1
+_COLON = 2
+_VALUE = 3
+_NEXT = 4
+_ITEM_OR_END = 5
+_ITEM = 6
+
+_INCOMPLETE = object()
+
+# 被截断的值: 数字的后续字符, 字面量的前缀
+_NUMBER_TAIL = re.compile(r"[-+0-9.eE]*")
+_LITERALS = ("true", "false", "null", "NaN", "Infinity", "-Infinity")
+
+
+class _Frame(object):
+    __slots__ = ("container", "depth", "phase", "key", "is_array")
+
+    def __init__(self, container, depth, is_array=False):
+        self.container = container
+        self.depth = depth
+        self.is_array = is_array
+        self.phase = _ITEM_OR_END if is_array else _KEY_OR_END
+        self.key = None
+
+
+class JsonItemParser(object):
+    # ===========================================================================
+    # 增量 JSON 解析器
+    # Args @param path: 从根对象到 items 数组的键, 例如
+    #                   ("xxx_response", "resp_result", "result", "products", "product")
+    #      @param object_hook: items 的 json object_hook
+    # ===========================================================================
+
+    def __init__(self, path, object_hook=None):
+        self.path = tuple(path)
+        self.envelope = {}
+        self.items = 0
+        self._decoder = json.JSONDecoder()
+        self._item_decoder = json.JSONDecoder(object_hook=object_hook)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._done = False
+        self._closed = False
+
+    def feed(self, data):
+        # 返回这一块数据中完整的 items
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(data)
+        self._pos = 0
+        return self._parse()
+
+    def close(self):
+        # 响应体结束, 返回最后的 items
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(b"", final=True)
+        self._pos = 0
+        self._closed = True
+        items = self._parse()
+        if not self._done:
+            raise ValueError("Incomplete JSON document")
+        return items
+
+    def _parse(self):
+        items = []
+        while not self._done:
+            char = self._peek()
+            if char is None:
+                break
+            if not self._stack:
+                self._expect(char, "{")
+                self._stack.append(_Frame(self.envelope, 0))
+                continue
+
+            frame = self._stack[-1]
+            phase = frame.phase
+            if phase == _NEXT:
+                if char == ",":
+                    self._pos += 1
+                    frame.phase = _ITEM if frame.is_array else _KEY
+                else:
+                    self._expect(char, "]" if frame.is_array else "}")
+                    self._pop()
+            elif phase == _KEY_OR_END and char == "}":
+                self._pos += 1
+                self._pop()
+            elif phase == _KEY_OR_END or phase == _KEY:
+                key = self._decode(self._decoder)
+                if key is _INCOMPLETE:
+                    break
+                if not isinstance(key, str):
+                    raise ValueError("Expecting property name at position %d" % self._pos)
+                frame.key = key
+                frame.phase = _COLON
+            elif phase == _COLON:
+                self._expect(char, ":")
+                frame.phase = _VALUE
+            elif phase == _VALUE:
+                if not self._enter(frame, char):
+                    value = self._decode(self._decoder)
+                    if value is _INCOMPLETE:
+                        break
+                    frame.container[frame.key] = value
+                    frame.phase = _NEXT
+            elif phase == _ITEM_OR_END and char == "]":
+                self._pos += 1
+                self._pop()
+            else:
+                item = self._decode(self._item_decoder)
+                if item is _INCOMPLETE:
+                    break
+                self.items += 1
+                items.append(item)
+                frame.phase = _NEXT
+        return items
+
+    def _enter(self, frame, char):
+        # 沿着 path 进入下一层, 其他的值整体解析
+        depth = frame.depth
+        if depth >= len(self.path) or frame.key != self.path[depth]:
+            return False
+        if depth == len(self.path) - 1:
+            if char != "[":
+                return False
+            child = _Frame(None, depth + 1, is_array=True)
+        else:
+            if char != "{":
+                return False
+            child = _Frame(frame.container.setdefault(frame.key, {}), depth + 1)
+        self._pos += 1
+        frame.phase = _NEXT
+        self._stack.append(child)
+        return True
+
+    def _pop(self):
+        self._stack.pop()
+        if not self._stack:
+            self._done = True
+
+    def _peek(self):
+        buffer, pos = self._buffer, self._pos
+        while pos < len(buffer) and buffer[pos] in WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+
+    def _expect(self, char, expected):
+        if char != expected:
+            raise ValueError("Expecting %r at position %d, got %r" % (expected, self._pos, char))
+        self._pos += 1
+
+    def _decode(self, decoder):
+        # 值不完整时等待下一块数据; 格式错误立即抛出, 缓冲区不会因为错误的值无限增长
+        try:
+            value, end = decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError as error:
+            if self._closed or not self._isTruncated(error):
+                raise
+            return _INCOMPLETE
+        if not self._closed and type(value) in (int, float) and _NUMBER_TAIL.fullmatch(self._buffer, end):
+            # 数字后面没有分隔符, 可能在下一块继续 ("1." + "5")
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+    def _isTruncated(self, error):
+        # 解析错误是因为缓冲区在值的中间结束
+        if error.msg.startswith("Unterminated string"):
+            return True
+        tail = self._buffer[error.pos:]
+        if error.msg.startswith("Invalid \\uXXXX escape"):
+            # 错误位置是转义的 "u", 代理对 "ud83d\\ude00" 共 11 个字符
+            return len(tail) < 11
+        return _NUMBER_TAIL.fullmatch(tail) is not None or any(literal.startswith(tail) for literal in _LITERALS)
@@ -1 +1 @@
-from .get_product_id import get_product_id
+from .get_product_id import get_product_id, find_product_id, is_short_link
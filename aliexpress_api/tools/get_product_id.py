@@ -1,18 +1,78 @@
 """Some useful tools."""
 
 from ..errors import ProductIdNotFoundException
+from typing import Optional
+from urllib.parse import urlparse
 import re
 
 
+# Tried in order, the first match wins
+PRODUCT_ID_PATTERNS = [
+    # /item/1005001234567890.html
+    re.compile(r'/item/(\d+)\.html'),
+    # /item/1005001234567890
+    re.compile(r'/item/(\d{10,})(?:\?|$)'),
+    # coin-index: productIds=1005001234567890
+    re.compile(r'productIds=(\d+)'),
+    # mobile app: /_m/1005001234567890
+    re.compile(r'/_m/(\d+)'),
+    # /product/1005001234567890.html
+    re.compile(r'/product/(\d+)\.html'),
+    # any long number as last path segment
+    re.compile(r'/(\d{10,})(?:\.html|$)'),
+    # query parameter: ?id=1005001234567890
+    re.compile(r'[?&]id=(\d+)'),
+]
+
+# Historical rule of get_product_id: any number followed by an extension, /32812345678.htm.
+# Too loose for arbitrary links (/__pc/3.0/sale.htm, /store/912345.html), so find_product_id
+# does not use it.
+LEGACY_PRODUCT_ID_PATTERN = re.compile(r'/(\d+)\.')
+
+LONG_NUMBER_PATTERN = re.compile(r'\d{9,}')
+PRODUCT_ID_TEXT_PATTERN = re.compile(r'^[0-9]+$')
+
+# Links that carry no product ID and must be resolved over the network
+SHORT_LINK_HOSTS = (
+    's.click.aliexpress.com',
+    'click.aliexpress.com',
+    'a.aliexpress.com',
+    'star.aliexpress.com',
+)
+
+
+def is_short_link(url: str) -> bool:
+    """Returns True if the URL is an opaque short or share link that needs to be resolved."""
+    host = urlparse(url).netloc.lower()
+    return host in SHORT_LINK_HOSTS
+
+
+def find_product_id(text: str) -> Optional[str]:
+    """Returns the product ID found in a given text or URL without network access, or None."""
+    if PRODUCT_ID_TEXT_PATTERN.match(text):
+        return text
+
+    for pattern in PRODUCT_ID_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+
+    # The longest number in the URL is usually the product ID
+    numbers = LONG_NUMBER_PATTERN.findall(text)
+    if numbers:
+        return max(numbers, key=len)
+
+    return None
+
+
 def get_product_id(text: str) -> str:
     """Returns the product ID from a given text. Raises ProductIdNotFoundException on fail."""
-    # Return if text is a product ID
-    if re.search(r'^[0-9]*$', text):
-        return text
+    product_id = find_product_id(text)
+    if product_id:
+        return product_id
 
-    # Extract product ID from URL
-    asin = re.search(r'(\/)([0-9]*)(\.)', text)
-    if asin:
-        return asin.group(2)
+    match = LEGACY_PRODUCT_ID_PATTERN.search(text)
+    if match and match.group(1):
+        return match.group(1)
     else:
         raise ProductIdNotFoundException('Product id not found: ' + text)
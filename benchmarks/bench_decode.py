@@ -0,0 +1,60 @@
+"""Cost of decoding a response body: the former round trip against the single pass.
+
+Before, ``RestApi.getResponse`` parsed the body into dicts, then ``api_request``
+serialised them back with ``json.dumps`` and parsed the text again with a
+``SimpleNamespace`` object_hook. Now the body is parsed once with the object_hook
+of the endpoint.
+
+Run from the repository root: ``python benchmarks/bench_decode.py``
+"""
+
+import json
+import os
+import sys
+import timeit
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from aliexpress_api.helpers.requests import decode_categories, decode_hotproducts, decode_object, \
+    decode_products, parse_response  # noqa: E402
+from aliexpress_api.skd.api.base import RestApi  # noqa: E402
+from payloads import CATEGORIES, DETAIL, HOTPRODUCTS  # noqa: E402
+
+
+def getheader(name, default=None):
+    return default
+
+
+def round_trip(request, body, response_name):
+    response = request.parseResponse(200, body, getheader)
+    response = json.loads(json.dumps(response), object_hook=lambda values: SimpleNamespace(**values))
+    return parse_response(response, response_name)
+
+
+def single_pass(request, body, response_name, object_hook):
+    return parse_response(request.parseResponse(200, body, getheader, object_hook), response_name)
+
+
+def main(number=500):
+    request = RestApi()
+    payloads = (
+        ('product detail', DETAIL, decode_products),
+        ('hot products, 50', HOTPRODUCTS, decode_hotproducts),
+        ('categories, 400', CATEGORIES, decode_categories),
+    )
+    for name, (response_name, body), object_hook in payloads:
+        timings = (
+            ('round trip', lambda: round_trip(request, body, response_name)),
+            ('single pass', lambda: single_pass(request, body, response_name, decode_object)),
+            ('endpoint models', lambda: single_pass(request, body, response_name, object_hook)),
+        )
+        results = []
+        for _, func in timings:
+            results.append(timeit.timeit(func, number=number) / number * 1000)
+        print(f'{name:>16} ({len(body) / 1024:5.1f} KB): '
+              + ', '.join(f'{label} {ms:.3f} ms' for (label, _), ms in zip(timings, results)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Memory of a decoded hot product page: ``SimpleNamespace`` objects against the slotted models.
+
+Run from the repository root: ``python benchmarks/bench_models.py``
+"""
+
+import gc
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from aliexpress_api.helpers.requests import decode_hotproducts, decode_object  # noqa: E402
+from payloads import HOTPRODUCTS  # noqa: E402
+
+
+def retained(body, object_hook, pages=20):
+    """Bytes held by ``pages`` decoded pages, the way a cache holds them."""
+    gc.collect()
+    tracemalloc.start()
+    kept = [json.loads(body, object_hook=object_hook) for _ in range(pages)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / pages
+
+
+def main(number=200):
+    _, body = HOTPRODUCTS
+    for name, object_hook in (('SimpleNamespace', decode_object), ('slotted models', decode_hotproducts)):
+        seconds = timeit.timeit(lambda: json.loads(body, object_hook=object_hook), number=number)
+        print(f'{name:>16}: {retained(body, object_hook) / 1024:7.1f} KB per 50 product page, '
+              f'{seconds / number * 1000:.3f} ms to decode')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""Micro-benchmark of the offline product ID extraction.
+
+Run from the repository root: ``python benchmarks/bench_product_id.py``
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+
+from aliexpress_api.tools import find_product_id  # noqa: E402
+from test_product_id import PRODUCT_ID_CORPUS  # noqa: E402
+
+
+def main(number=20000):
+    texts = [text for text, _ in PRODUCT_ID_CORPUS]
+    seconds = timeit.timeit(lambda: [find_product_id(text) for text in texts], number=number)
+    calls = number * len(texts)
+    print(f'find_product_id: {calls} calls, {seconds / calls * 1e6:.2f} us per call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Cost of signing a request: the former per call signing against the cached signers.
+
+``legacy_prepare`` is the ``RestApi.prepareRequest`` of the SDK before the
+parameter schemas and signers were cached: the parameters were collected from
+``__dict__`` and sorted on every call, and the secret was hashed every time.
+
+Run from the repository root: ``python benchmarks/bench_signing.py``
+"""
+
+import hashlib
+import os
+import sys
+import time
+import timeit
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from aliexpress_api.skd import appinfo, SIGN_METHOD_HMAC_SHA256, SIGN_METHOD_MD5  # noqa: E402
+from aliexpress_api.skd.api import base  # noqa: E402
+from aliexpress_api.skd.api.rest.AliexpressAffiliateProductQueryRequest import \
+    AliexpressAffiliateProductQueryRequest  # noqa: E402
+
+APP_KEY = '12345678'
+SECRET = 'a1b2c3d4e5f6a7b8c9d0e1f2a3b4c5d6'
+
+
+def legacy_sign(secret, parameters):
+    keys = sorted(parameters)
+    parameters = '%s%s%s' % (secret, ''.join('%s%s' % (key, parameters[key]) for key in keys), secret)
+    return hashlib.md5(parameters.encode('utf-8')).hexdigest().upper()
+
+
+def legacy_prepare(request):
+    timestamp = str(int(float('%.2f' % time.time()) * 1000))
+    sys_parameters = {
+        base.P_FORMAT: 'json',
+        base.P_APPKEY: APP_KEY,
+        base.P_SIGN_METHOD: 'md5',
+        base.P_VERSION: '2.0',
+        base.P_TIMESTAMP: timestamp,
+        base.P_PARTNER_ID: base.SYSTEM_GENERATE_VERSION,
+        base.P_API: request.getapiname(),
+    }
+    application_parameter = {}
+    for key, value in request.__dict__.items():
+        if not key.startswith('__') and key not in request.getMultipartParas() \
+                and not key.startswith('_RestApi__') and value is not None:
+            application_parameter[key[1:] if key.startswith('_') else key] = value
+    sign_parameter = sys_parameters.copy()
+    sign_parameter.update(application_parameter)
+    sys_parameters[base.P_SIGN] = legacy_sign(SECRET, sign_parameter)
+    body = urllib.parse.urlencode(application_parameter)
+    url = base.N_REST + '?' + urllib.parse.urlencode(sys_parameters)
+    return url, body, request.get_request_header()
+
+
+def search_request(sign_method):
+    request = AliexpressAffiliateProductQueryRequest()
+    request.set_app_info(appinfo(APP_KEY, SECRET, sign_method))
+    request.keywords = 'wireless earbuds bluetooth 5.3'
+    request.fields = 'product_id,product_title,target_sale_price,promotion_link'
+    request.page_no = 1
+    request.page_size = 50
+    request.sort = 'LAST_VOLUME_DESC'
+    request.target_currency = 'EUR'
+    request.target_language = 'AR'
+    request.tracking_id = 'default'
+    return request
+
+
+def report(name, func, number):
+    seconds = timeit.timeit(func, number=number)
+    print(f'{name:>28}: {seconds / number * 1e6:6.2f} us per call')
+
+
+def main(number=10000):
+    md5_request = search_request(SIGN_METHOD_MD5)
+    hmac_request = search_request(SIGN_METHOD_HMAC_SHA256)
+    parameters = dict(md5_request.getParameterSchema().getApplicationParameters(md5_request), method='x')
+    assert base.sign(SECRET, parameters) == legacy_sign(SECRET, parameters)
+
+    report('legacy sign md5', lambda: legacy_sign(SECRET, parameters), number)
+    report('sign md5', lambda: base.sign(SECRET, parameters), number)
+    report('sign hmac-sha256', lambda: base.sign(SECRET, parameters, SIGN_METHOD_HMAC_SHA256), number)
+    report('legacy prepareRequest md5', lambda: legacy_prepare(md5_request), number)
+    report('prepareRequest md5', md5_request.prepareRequest, number)
+    report('prepareRequest hmac-sha256', hmac_request.prepareRequest, number)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Synthetic API response bodies shaped like the real ones, shared by the benchmarks."""
+
+import json
+
+
+def product(product_id):
+    return {
+        'app_sale_price': '12.34', 'app_sale_price_currency': 'USD', 'commission_rate': '7.0%',
+        'discount': '35%', 'evaluate_rate': '97.8%', 'first_level_category_id': 44,
+        'first_level_category_name': 'Consumer Electronics', 'lastest_volume': 1520,
+        'hot_product_commission_rate': '9.0%', 'original_price': '18.99', 'original_price_currency': 'USD',
+        'product_detail_url': f'https://www.aliexpress.com/item/{product_id}.html', 'product_id': product_id,
+        'product_main_image_url': f'https://ae01.alicdn.com/kf/{product_id}.jpg',
+        'product_small_image_urls': {'string': [f'https://ae01.alicdn.com/kf/{product_id}_{i}.jpg' for i in range(5)]},
+        'product_title': 'Wireless Bluetooth 5.3 Earphones with Charging Case and Noise Cancelling',
+        'product_video_url': '', 'promotion_link': f'https://s.click.aliexpress.com/e/_{product_id}',
+        'relevant_market_commission_rate': '7.0%', 'sale_price': '12.34', 'sale_price_currency': 'USD',
+        'second_level_category_id': 4404, 'second_level_category_name': 'Earphones & Headphones',
+        'shop_id': 912345, 'shop_url': 'https://www.aliexpress.com/store/912345',
+        'target_app_sale_price': '11.40', 'target_app_sale_price_currency': 'EUR',
+        'target_original_price': '17.55', 'target_original_price_currency': 'EUR',
+        'target_sale_price': '11.40', 'target_sale_price_currency': 'EUR',
+    }
+
+
+def response(name, result):
+    return json.dumps({name: {'resp_result': {'resp_code': 200, 'resp_msg': 'Call succeeds', 'result': result},
+                              'request_id': '2101e9d517000000000000000'}}).encode()
+
+
+def products_result(count):
+    return {'current_page_no': 1, 'current_record_count': count, 'total_page_no': 20, 'total_record_count': 1000,
+            'products': {'product': [product(1005006000000000 + i) for i in range(count)]}}
+
+
+DETAIL = ('aliexpress_affiliate_productdetail_get_response', response(
+    'aliexpress_affiliate_productdetail_get_response', {'current_record_count': 1, 'products': {
+        'product': [product(1005006000000000)]}}))
+HOTPRODUCTS = ('aliexpress_affiliate_hotproduct_query_response', response(
+    'aliexpress_affiliate_hotproduct_query_response', products_result(50)))
+CATEGORIES = ('aliexpress_affiliate_category_get_response', response(
+    'aliexpress_affiliate_category_get_response', {'total_result_count': 400, 'categories': {'category': [
+        {'category_id': i, 'category_name': f'Category {i}', **({'parent_category_id': i // 20} if i >= 20 else {})}
+        for i in range(400)]}}))
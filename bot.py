@@ -2,10 +2,27 @@ import json
 import telebot
 from flask import Flask, request
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from telebot import types
 from aliexpress_api import AliexpressApi, models
+from aliexpress_api.batching import ProductDetailsBatcher
+from aliexpress_api.cache import ProductCache, SqliteCache
+from aliexpress_api.catalog import CatalogStore, HotProductDownloader
+from aliexpress_api.ratelimit import RateLimiter
+from aliexpress_api.retry import CircuitBreaker, RetryPolicy
+from aliexpress_api.skd import getDefaultConnectionPool
+from aliexpress_api.tools import find_product_id, is_short_link
+from services.cache import TTLCache
+from services.dedup import MemoryDedupStore, SqliteDedupStore, RequestDeduplicator
+from services.exchange_rates import ExchangeRateService
+from services.photos import PhotoCache
+from services.pipeline import Pipeline, PipelineStats
+from services.redirects import RedirectResolver
+from services.update_queue import UpdateQueue, FULL
 import re
 import os
+import signal
+import time
 from urllib.parse import urlparse, parse_qs
 import urllib.parse
 import requests
@@ -30,7 +47,15 @@ if not ALIEXPRESS_API_PUBLIC or not ALIEXPRESS_API_SECRET:
     print("Please set the environment variables or create a .env file with your API credentials.")
     exit(1)
 
-bot = telebot.TeleBot(TELEGRAM_TOKEN_BOT)
+# Optional: webhook mode (production) and its secret token
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')
+
+# في وضع webhook تتم معالجة التحديثات في طابور العمال الخاص بنا، لذلك لا نحتاج خيوط telebot
+bot = telebot.TeleBot(TELEGRAM_TOKEN_BOT, threaded=not WEBHOOK_URL)
+
+# مجلد البيانات المحلية (ذاكرة التخزين المؤقت واللقطات)
+DATA_DIR = os.getenv('DATA_DIR', 'data')
 
 # دالة جديدة لجلب IP الاستضافة
 def get_hosting_ip():
@@ -70,10 +95,46 @@ def get_hosting_ip():
 HOSTING_IP = get_hosting_ip()
 print(f"🌍 عنوان IP الاستضافة: {HOSTING_IP}")
 
+# ذاكرة مؤقتة لتفاصيل المنتجات (في الذاكرة + SQLite على القرص)
+product_cache = ProductCache(
+    disk=SqliteCache(
+        os.path.join(DATA_DIR, 'products.sqlite'),
+        max_size=int(os.getenv('PRODUCT_DISK_CACHE_SIZE', 100000)),
+    ),
+    ttl=float(os.getenv('PRODUCT_CACHE_TTL', 60 * 60)),
+)
+
+# لغة وعملة الطلبات، وهما جزء من مفتاح ذاكرة العروض
+OFFER_LANGUAGE = models.Language.AR
+OFFER_CURRENCY = models.Currency.EUR
+
+# حد لعدد طلبات API في الثانية (عام ولكل طريقة)، طلبات المستخدمين لها الأولوية على مهام الخلفية
+# API_METHOD_RATE_LIMITS مثال: aliexpress.affiliate.link.generate=5,aliexpress.affiliate.productdetail.get=10
+api_rate_limiter = RateLimiter(
+    rate=float(os.getenv('API_RATE_LIMIT', 10)),
+    burst=float(os.getenv('API_RATE_BURST', 20)),
+    method_rates={
+        method: float(rate) for method, rate in
+        (item.split('=') for item in os.getenv('API_METHOD_RATE_LIMITS', '').split(',') if item)
+    },
+)
+
+# إعادة المحاولة للأخطاء المؤقتة، وإيقاف الطلبات مؤقتا عند تعطل الخدمة بدل انتظار المهلة في كل مرة
+api_retry_policy = RetryPolicy(max_attempts=int(os.getenv('API_MAX_ATTEMPTS', 3)))
+api_circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('API_CIRCUIT_FAILURES', 5)),
+    recovery_time=float(os.getenv('API_CIRCUIT_RECOVERY', 30)),
+)
+
 # Initialize Aliexpress API
 try:
     aliexpress = AliexpressApi(ALIEXPRESS_API_PUBLIC, ALIEXPRESS_API_SECRET,
-                               models.Language.AR, models.Currency.EUR, 'telegrame_bot')
+                               OFFER_LANGUAGE, OFFER_CURRENCY, 'telegrame_bot',
+                               product_cache=product_cache,
+                               rate_limiter=api_rate_limiter,
+                               retry_policy=api_retry_policy,
+                               circuit_breaker=api_circuit_breaker)
+    product_details_batcher = ProductDetailsBatcher(aliexpress)
     print("AliExpress API initialized successfully.")
 except Exception as e:
     print(f"Error initializing AliExpress API: {e}")
@@ -101,141 +162,167 @@ btn4 = types.InlineKeyboardButton("⭐️ لعبة قلب الاوراق Flip 
 btn5 = types.InlineKeyboardButton("⭐️ لعبة GoGo Match ⭐️", url="https://s.click.aliexpress.com/e/_DDs7W5D")
 keyboard_games.add(btn1, btn2, btn3, btn4, btn5)
 
+# مهلة كل مرحلة (بالثواني) عند تجهيز العرض
+LINKS_STAGE_TIMEOUT = float(os.getenv('LINKS_STAGE_TIMEOUT', 15))
+DETAILS_STAGE_TIMEOUT = float(os.getenv('DETAILS_STAGE_TIMEOUT', 8))
+
+# مجموعة خيوط محدودة مشتركة بين جميع الطلبات
+pipeline_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PIPELINE_WORKERS', 16)),
+                                       thread_name_prefix='pipeline')
+# توقيتات مراحل تجهيز العروض، تظهر في /stats
+pipeline_stats = PipelineStats()
+
+# تجاهل التحديثات المكررة والروابط المكررة في نفس المحادثة لفترة قصيرة
+DEDUP_UPDATE_WINDOW = float(os.getenv('DEDUP_UPDATE_WINDOW', 10 * 60))
+DEDUP_RESULT_WINDOW = float(os.getenv('DEDUP_RESULT_WINDOW', 60))
+if os.getenv('DEDUP_BACKEND', 'memory') == 'sqlite':
+    dedup_store = SqliteDedupStore(os.path.join(DATA_DIR, 'dedup.sqlite'),
+                                   update_window=DEDUP_UPDATE_WINDOW, result_window=DEDUP_RESULT_WINDOW)
+else:
+    dedup_store = MemoryDedupStore(update_window=DEDUP_UPDATE_WINDOW, result_window=DEDUP_RESULT_WINDOW)
+offer_deduplicator = RequestDeduplicator(dedup_store)
+
+# ذاكرة مؤقتة للعروض الجاهزة (النص والصورة) لكل منتج، مشتركة بين جميع المستخدمين
+offer_cache = TTLCache(
+    max_size=int(os.getenv('OFFER_CACHE_SIZE', 5000)),
+    ttl=float(os.getenv('OFFER_CACHE_TTL', 15 * 60)),
+)
+
+# سعر صرف تقريبي للدولار مقابل الدينار الجزائري
+DEFAULT_USD_TO_DZD_RATE = 134.5
+
+# خدمة أسعار الصرف: تخزين مؤقت في الذاكرة مع تحديث في الخلفية وحفظ آخر قيمة على القرص
+exchange_rates = ExchangeRateService(
+    base='USD',
+    ttl=float(os.getenv('EXCHANGE_RATE_TTL', 6 * 60 * 60)),
+    snapshot_path=os.path.join(DATA_DIR, 'exchange_rates.json'),
+    fallback_rates={'DZD': DEFAULT_USD_TO_DZD_RATE},
+)
+exchange_rates.start()
+
+# نسخة محلية من قائمة المنتجات الرائجة، للإجابة عن تفاصيل المنتج بدون طلب API
+CATALOG_CATEGORIES = [int(category_id) for category_id in os.getenv('CATALOG_CATEGORIES', '').split(',') if category_id]
+CATALOG_COUNTRY = os.getenv('CATALOG_COUNTRY') or None
+CATALOG_REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', 24 * 60 * 60))
+catalog_store = CatalogStore(os.path.join(DATA_DIR, 'catalog.sqlite')) if CATALOG_CATEGORIES else None
+
+def run_catalog_downloader():
+    """تحميل المنتجات الرائجة في الخلفية ثم تحديثها دوريا"""
+    downloader = HotProductDownloader(aliexpress, catalog_store)
+    restart = False
+    while True:
+        try:
+            results = downloader.download(CATALOG_CATEGORIES, [CATALOG_COUNTRY], restart=restart)
+            print(f"📦 Catalog download: {results}")
+            catalog_store.purge(max_age=2 * CATALOG_REFRESH_INTERVAL)
+            restart = True
+        except Exception as e:
+            print(f"Error downloading catalog: {e}")
+        time.sleep(CATALOG_REFRESH_INTERVAL)
+
+if catalog_store is not None:
+    threading.Thread(target=run_catalog_downloader, name='catalog-downloader', daemon=True).start()
+
 # Define function to get exchange rate from USD to DZD (الدينار الجزائري)
 def get_usd_to_dzd_rate():
-    try:
-        response = requests.get('https://api.exchangerate-api.com/v4/latest/USD')
-        data = response.json()
-        return data['rates']['DZD']
-    except Exception as e:
-        print(f"Error fetching exchange rate: {e}")
-        # سعر صرف افتراضي إذا فشل الاتصال بالAPI
-        return 134.5  # سعر صرف تقريبي للدولار مقابل الدينار الجزائري
-
-# Define function to resolve redirect chain and get final URL
-def resolve_full_redirect_chain(link):
-    """حل جميع التوجيهات للحصول على الرابط النهائي"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                      'AppleWebKit/537.36 (KHTML, like Gecko) '
-                      'Chrome/58.0.3029.110 Safari/537.36'
-    }
-    try:
-        session_req = requests.Session()
-        response = session_req.get(link, allow_redirects=True, timeout=10, headers=headers)
-        final_url = response.url
-        print(f"🔗 Resolved URL: {link} -> {final_url}")
-        
-        # إذا كان رابط star.aliexpress، استخرج redirectUrl
-        if "star.aliexpress.com" in final_url:
-            parsed_url = urlparse(final_url)
-            params = parse_qs(parsed_url.query)
-            if 'redirectUrl' in params:
-                redirect_url = params['redirectUrl'][0]
-                print(f"🔗 Found redirectUrl: {redirect_url}")
-                # حل التوجيه مرة أخرى إذا لزم الأمر
-                if not redirect_url.startswith('http'):
-                    redirect_url = 'https:' + redirect_url
-                return resolve_full_redirect_chain(redirect_url)
-        
-        return final_url
-        
-    except requests.RequestException as e:
-        print(f"❌ Error resolving redirect chain for link {link}: {e}")
-        return link  # ارجع للرابط الأصلي إذا فشل الحل
+    """سعر الصرف من الذاكرة فقط، بدون أي اتصال بالشبكة"""
+    return exchange_rates.get_rate('DZD')
+
+# Define function to parse the product ID from an already resolved URL
+def parse_product_id(resolved_link):
+    """استخراج معرف المنتج من رابط محلول بدون أي اتصال بالشبكة"""
+    product_id = find_product_id(resolved_link)
+    if product_id:
+        print(f"✅ Extracted product ID: {product_id}")
+    else:
+        print(f"❌ Could not extract product ID from: {resolved_link}")
+    return product_id
+
+# ذاكرة مؤقتة للروابط المحلولة مع جلسة HTTP مشتركة
+redirect_resolver = RedirectResolver(
+    product_id_parser=parse_product_id,
+    ttl=float(os.getenv('REDIRECT_CACHE_TTL', 6 * 60 * 60)),
+)
+
+# Define function to get the final URL and the product ID of a link
+def resolve_product_link(link):
+    """إرجاع (الرابط النهائي، معرف المنتج)، مع تجنب الشبكة إذا كان المعرف موجوداً في الرابط"""
+    print(f"🔍 Extracting product ID from: {link}")
+
+    # المسار السريع: روابط المنتج العادية تحتوي على المعرف مباشرة
+    if not is_short_link(link):
+        product_id = find_product_id(link)
+        if product_id:
+            print(f"✅ Extracted product ID without resolving: {product_id}")
+            return link, product_id
+
+    # الروابط المختصرة تحتاج إلى حل التوجيهات (النتيجة محفوظة في الذاكرة المؤقتة)
+    return redirect_resolver.resolve(link)
 
 # Define function to extract product ID from link
 def extract_product_id(link):
     """استخراج معرف المنتج من روابط AliExpress المختلفة"""
-    print(f"🔍 Extracting product ID from: {link}")
-    
     try:
-        # First resolve any redirects to get the final URL
-        resolved_link = resolve_full_redirect_chain(link)
-        print(f"🔗 Using resolved link: {resolved_link}")
-        
-        # قائمة بأنماط الروابط المختلفة
-        patterns = [
-            # النمط الأساسي: /item/1234567890.html
-            r'/item/(\d+)\.html',
-            # نمط المنتج الطويل: /item/1005001234567890.html
-            r'/item/(\d{10,})\.html',
-            # نمط بدون .html: /item/1234567890
-            r'/item/(\d{10,})(?:\?|$)',
-            # نمط coin-index: productIds=1234567890
-            r'productIds=(\d+)',
-            # نمط تطبيق الجوال: /_m/1234567890
-            r'/_m/(\d+)',
-            # نمط المنتج البديل: /product/1234567890.html
-            r'/product/(\d+)\.html',
-            # أي رقم طويل في الرابط
-            r'/(\d{10,})(?:\.html|$)',
-            # نمط من query parameters
-            r'[?&]id=(\d+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, resolved_link)
-            if match:
-                product_id = match.group(1)
-                print(f"✅ Extracted product ID using pattern '{pattern}': {product_id}")
-                return product_id
-        
-        # إذا فشلت جميع الأنماط، جرب البحث عن أي رقم طويل
-        numbers = re.findall(r'\d{9,}', resolved_link)
-        if numbers:
-            # خذ أطول رقم (غالباً هو product_id)
-            product_id = max(numbers, key=len)
-            print(f"✅ Extracted product ID (longest number): {product_id}")
-            return product_id
-        
-        print(f"❌ Could not extract product ID from: {resolved_link}")
-        return None
-        
+        _, product_id = resolve_product_link(link)
+        return product_id
     except Exception as e:
         print(f"❌ Error in extract_product_id: {e}")
         return None
 
-# Define function to generate coin-index affiliate link for 620 channel
-def generate_coin_affiliate_link(product_id):
-    """إنشاء رابط تابع باستخدام نظام coin-index للقناة 620"""
-    try:
-        # أنشئ رابط coin-index
-        coin_index_url = f"https://m.aliexpress.com/p/coin-index/index.html?productIds={product_id}&_immersiveMode=true&from=syicon"
-        
-        # أنشئ الرابط التابع
-        affiliate_links = aliexpress.get_affiliate_links(coin_index_url)
-        if affiliate_links and len(affiliate_links) > 0:
-            return affiliate_links[0].promotion_link
-        return None
-    except Exception as e:
-        print(f"❌ Error generating coin affiliate link for product {product_id}: {e}")
-        return None
+# Define function to build the promo channel URLs (620 coin, 560 bundle, 562 super, 561 limit)
+def build_channel_urls(product_id, resolved_link):
+    """بناء روابط القنوات الأربع قبل تحويلها إلى روابط تابعة"""
+    # تشفير الرابط الأصلي لرابط bundle
+    encoded_url = urllib.parse.quote_plus(resolved_link)
+    return {
+        'coin': f"https://m.aliexpress.com/p/coin-index/index.html?productIds={product_id}&_immersiveMode=true&from=syicon",
+        'bundle': f'https://star.aliexpress.com/share/share.htm?platform=AE&businessType=ProductDetail&redirectUrl={encoded_url}?sourceType=560',
+        'super': f'https://star.aliexpress.com/share/share.htm?platform=AE&businessType=ProductDetail&redirectUrl={resolved_link}?sourceType=562&aff_fcid=',
+        'limit': f'https://star.aliexpress.com/share/share.htm?platform=AE&businessType=ProductDetail&redirectUrl={resolved_link}?sourceType=561&aff_fcid=',
+    }
 
-# Define function to generate bundle affiliate link for 560 channel
-def generate_bundle_affiliate_link(product_id, original_link):
-    """إنشاء رابط تابع باستخدام نظام bundle للقناة 560"""
-    try:
-        # تشفير الرابط الأصلي
-        encoded_url = urllib.parse.quote_plus(original_link)
-        # أنشئ رابط bundle
-        bundle_url = f'https://star.aliexpress.com/share/share.htm?platform=AE&businessType=ProductDetail&redirectUrl={encoded_url}?sourceType=560'
-        
-        # أنشئ الرابط التابع
-        affiliate_links = aliexpress.get_affiliate_links(bundle_url)
-        if affiliate_links and len(affiliate_links) > 0:
-            return affiliate_links[0].promotion_link
-        return None
-    except Exception as e:
-        print(f"❌ Error generating bundle affiliate link for product {product_id}: {e}")
-        return None
+# Define function to generate all channel affiliate links in a single API call
+def generate_affiliate_links_batch(product_id, resolved_link):
+    """إنشاء الروابط التابعة لجميع القنوات بطلب واحد وربط كل رابط بقناته عبر source_value"""
+    channel_urls = build_channel_urls(product_id, resolved_link)
+    links = dict.fromkeys(channel_urls)
+
+    # source_values مفصولة بفواصل، لذلك الروابط التي تحتوي على فاصلة ترسل وحدها
+    batched = [url for url in channel_urls.values() if ',' not in url]
+    url_groups = [batched] if batched else []
+    url_groups += [[url] for url in channel_urls.values() if ',' in url]
+
+    for urls in url_groups:
+        try:
+            affiliate_links = aliexpress.get_affiliate_links(urls)
+        except Exception as e:
+            print(f"❌ Error generating affiliate links for product {product_id}: {e}")
+            continue
+        for affiliate_link in affiliate_links:
+            for channel, url in channel_urls.items():
+                if affiliate_link.source_value == url:
+                    links[channel] = affiliate_link.promotion_link
+
+    print(f"🔗 Affiliate links for {product_id}: {links}")
+    return links
+
+# معرفات الصور (file_id) لدى Telegram، لتفادي إعادة تحميل نفس الصورة في كل مرة
+photo_cache = PhotoCache(
+    os.path.join(DATA_DIR, 'photos.sqlite'),
+    max_size=int(os.getenv('PHOTO_CACHE_SIZE', 10000)),
+    ttl=float(os.getenv('PHOTO_CACHE_TTL', 30 * 24 * 60 * 60)),
+)
+
+def send_photo(chat_id, photo_url, **kwargs):
+    """إرسال صورة عبر file_id المحفوظ إن وجد، وإلا عبر الرابط"""
+    return photo_cache.send_photo(bot.send_photo, chat_id, photo_url, **kwargs)
 
 # دالة لإرسال الصورة مع الرسالة الترحيبية
 def send_welcome_with_photo(chat_id, message_text, photo_url=None, reply_markup=None):
     """إرسال رسالة ترحيبية مع صورة"""
     try:
         if photo_url:
-            bot.send_photo(
+            send_photo(
                 chat_id,
                 photo_url,
                 caption=message_text,
@@ -423,17 +510,128 @@ def extract_link(text):
         return links[0]
     return None
 
+def build_offer_text(affiliate_links, product=None, exchange_rate=None):
+    """بناء نص العرض مع جميع الروابط التابعة، مع تفاصيل المنتج إن توفرت"""
+    if product is not None:
+        price_pro = product.target_sale_price_amount
+        # Convert price to DZD (الدينار الجزائري)
+        if exchange_rate:
+            price_pro_dzd = price_pro * exchange_rate
+        else:
+            price_pro_dzd = price_pro  # fallback to USD if exchange rate not available
+
+        message_text = (
+            f" \n🛒 منتجك هو : 🔥 \n"
+            f" {product.product_title} 🛍 \n"
+            f" سعر المنتج : "
+            f" {price_pro:.2f} دولار 💵 / {price_pro_dzd:.2f} دينار جزائري 💵\n"
+            " \n قارن بين الاسعار واشتري 🔥 \n"
+        )
+    else:
+        # Build fallback message without product details
+        message_text = "قارن بين الاسعار واشتري 🔥 \n"
+
+    # Add coin-index affiliate link for 620 channel if available
+    if affiliate_links['coin']:
+        message_text += (
+            "💰 عرض العملات (السعر النهائي عند الدفع) : \n"
+            f"الرابط {affiliate_links['coin']} \n"
+        )
+
+    # Add bundle affiliate link for 560 channel if available
+    if affiliate_links['bundle']:
+        message_text += (
+            "📦 عرض الحزمة (عروض متنوعة) : \n"
+            f"الرابط {affiliate_links['bundle']} \n"
+        )
+
+    message_text += (
+        f"💎 عرض السوبر : \n"
+        f"الرابط {affiliate_links['super']} \n"
+        f"🔥 عرض محدود : \n"
+        f"الرابط {affiliate_links['limit']} \n\n"
+    )
+    message_text += "#AliExpressSuperDeals_Bot ✅" if product is not None else "#AliExpressSaverBot ✅"
+    return message_text
+
+def fetch_product_details(product_id):
+    """جلب تفاصيل المنتج (العنوان، السعر، الصورة)"""
+    if catalog_store is not None:
+        product = catalog_store.get_product(product_id, country=CATALOG_COUNTRY or '',
+                                            max_age=CATALOG_REFRESH_INTERVAL * 2)
+        if product is not None:
+            return product
+    # الطلبات المتزامنة تجمع في طلب API واحد
+    product_details = product_details_batcher.get_products_details([
+        product_id
+    ], fields=["target_sale_price", "product_title", "product_main_image_url"], timeout=DETAILS_STAGE_TIMEOUT)
+    if product_details and len(product_details) > 0:
+        # Print all details of product in JSON format for debugging
+        print(f"Product details object: {json.dumps(product_details[0].to_dict(), indent=2, ensure_ascii=False)}")
+        return product_details[0]
+    return None
+
+def build_offer(product_id, resolved_link):
+    """تجهيز العرض: صورة المنتج مع النص، ونص بديل بدون تفاصيل المنتج"""
+    # Generate the affiliate links and fetch the product details concurrently
+    pipeline = Pipeline(pipeline_executor, name=f"offer {product_id}", stats=pipeline_stats)
+    pipeline.add('links', generate_affiliate_links_batch, product_id, resolved_link,
+                 timeout=LINKS_STAGE_TIMEOUT)
+    pipeline.add('details', fetch_product_details, product_id, timeout=DETAILS_STAGE_TIMEOUT)
+    stages = pipeline.results()
+
+    affiliate_links = stages['links'].value
+    if not affiliate_links or not affiliate_links['super'] or not affiliate_links['limit']:
+        raise Exception(f"Affiliate links not available for product {product_id}")
+
+    product = stages['details'].value
+    if stages['details'].error is not None:
+        print(f"Error fetching product details: {stages['details'].error}")
+
+    offer = {'photo': None, 'caption': None, 'text': build_offer_text(affiliate_links)}
+    if product is not None and product.target_sale_price_amount is None:
+        # السعر مفقود أو غير صالح: العرض النصي بدون تفاصيل المنتج
+        print(f"Missing or invalid price for product {product_id}: {product.target_sale_price}")
+    elif product is not None:
+        print(f"Product details: {product.product_title}, {product.target_sale_price}, {product.product_main_image_url}")
+        offer['photo'] = product.product_main_image_url
+        offer['caption'] = build_offer_text(affiliate_links, product, get_usd_to_dzd_rate())
+    return offer
+
+def get_offer(product_id, resolved_link):
+    """العرض من الذاكرة المؤقتة إن وجد، بدون توليد الروابط أو جلب التفاصيل"""
+    key = (product_id, OFFER_CURRENCY, OFFER_LANGUAGE)
+    offer = offer_cache.get(key)
+    if offer is not None:
+        print(f"⚡ Offer cache hit for product {product_id}")
+        return offer
+
+    offer = build_offer(product_id, resolved_link)
+    # العرض بدون تفاصيل المنتج لا يحفظ، لتعاد المحاولة في الطلب القادم
+    if offer['photo']:
+        offer_cache.set(key, offer)
+    return offer
+
+def send_offer(chat_id, offer):
+    if offer['photo']:
+        try:
+            send_photo(chat_id, offer['photo'], caption=offer['caption'], reply_markup=keyboard)
+            return
+        except Exception as e:
+            print(f"Error sending product offer: {e}")
+
+    # Fallback if product details couldn't be fetched in time
+    bot.send_message(chat_id, offer['text'], reply_markup=keyboard)
+
 def get_affiliate_links(message, message_id, link):
     try:
-        # حل سلسلة التوجيه أولاً
-        resolved_link = resolve_full_redirect_chain(link)
+        # حل سلسلة التوجيه (فقط للروابط المختصرة) واستخراج معرف المنتج
+        resolved_link, product_id = resolve_product_link(link)
         if not resolved_link:
             bot.delete_message(message.chat.id, message_id)
             bot.send_message(message.chat.id, "❌ لم أتمكن من حل الرابط! تأكد من رابط المنتج أو أعد المحاولة.")
             return
 
-        # استخرج معرف المنتج من الرابط المحلول
-        product_id = extract_product_id(resolved_link)
         if not product_id:
             bot.delete_message(message.chat.id, message_id)
             bot.send_message(message.chat.id, f"❌ لم أتمكن من استخراج معرف المنتج من الرابط.\nالرابط: {resolved_link}")
@@ -441,141 +639,12 @@ def get_affiliate_links(message, message_id, link):
 
         print(f"🎯 Processing product ID: {product_id}")
 
-        # Generate coin-index affiliate link for 620 channel
-        coin_affiliate_link = generate_coin_affiliate_link(product_id)
-        
-        # Generate bundle affiliate link for 560 channel
-        bundle_affiliate_link = generate_bundle_affiliate_link(product_id, resolved_link)
-        
-        # Generate other affiliate links using traditional method
-        super_links = aliexpress.get_affiliate_links(
-            f'https://star.aliexpress.com/share/share.htm?platform=AE&businessType=ProductDetail&redirectUrl={resolved_link}?sourceType=562&aff_fcid='
-        )
-        super_links = super_links[0].promotion_link
-
-        limit_links = aliexpress.get_affiliate_links(
-            f'https://star.aliexpress.com/share/share.htm?platform=AE&businessType=ProductDetail&redirectUrl={resolved_link}?sourceType=561&aff_fcid='
-        )
-        limit_links = limit_links[0].promotion_link
+        # نفس المنتج في نفس المحادثة: إعادة استعمال العرض الجاري أو الأخير
+        offer = offer_deduplicator.run(message.chat.id, product_id,
+                                       lambda: get_offer(product_id, resolved_link))
 
-        try:
-            # Get product details using the product ID
-            product_details = aliexpress.get_products_details([
-                product_id
-            ], fields=["target_sale_price", "product_title", "product_main_image_url"])
-            
-            if product_details and len(product_details) > 0:
-                # Print all details of product in JSON format for debugging
-                print(f"Product details object: {json.dumps(product_details[0].__dict__, indent=2, ensure_ascii=False)}")
-                price_pro = float(product_details[0].target_sale_price)
-                title_link = product_details[0].product_title
-                img_link = product_details[0].product_main_image_url
-                
-                # Convert price to DZD (الدينار الجزائري)
-                exchange_rate = get_usd_to_dzd_rate()
-                if exchange_rate:
-                    price_pro_dzd = price_pro * exchange_rate
-                else:
-                    price_pro_dzd = price_pro  # fallback to USD if exchange rate not available
-                
-                print(f"Product details: {title_link}, {price_pro}, {img_link}")
-                bot.delete_message(message.chat.id, message_id)
-                
-                # Build the message with all affiliate links
-                message_text = (
-                    f" \n🛒 منتجك هو : 🔥 \n"
-                    f" {title_link} 🛍 \n"
-                    f" سعر المنتج : "
-                    f" {price_pro:.2f} دولار 💵 / {price_pro_dzd:.2f} دينار جزائري 💵\n"
-                    " \n قارن بين الاسعار واشتري 🔥 \n"
-                )
-                
-                # Add coin-index affiliate link for 620 channel if available
-                if coin_affiliate_link:
-                    message_text += (
-                        "💰 عرض العملات (السعر النهائي عند الدفع) : \n"
-                        f"الرابط {coin_affiliate_link} \n"
-                    )
-                
-                # Add bundle affiliate link for 560 channel if available
-                if bundle_affiliate_link:
-                    message_text += (
-                        "📦 عرض الحزمة (عروض متنوعة) : \n"
-                        f"الرابط {bundle_affiliate_link} \n"
-                    )
-                
-                message_text += (
-                    f"💎 عرض السوبر : \n"
-                    f"الرابط {super_links} \n"
-                    f"🔥 عرض محدود : \n"
-                    f"الرابط {limit_links} \n\n"
-                    "#AliExpressSuperDeals_Bot ✅"
-                )
-                
-                bot.send_photo(message.chat.id,
-                               img_link,
-                               caption=message_text,
-                               reply_markup=keyboard)
-            else:
-                # Fallback if product details couldn't be fetched
-                bot.delete_message(message.chat.id, message_id)
-                
-                # Build fallback message without product details
-                message_text = "قارن بين الاسعار واشتري 🔥 \n"
-                
-                # Add coin-index affiliate link for 620 channel if available
-                if coin_affiliate_link:
-                    message_text += (
-                        "💰 عرض العملات (السعر النهائي عند الدفع) : \n"
-                        f"الرابط {coin_affiliate_link} \n"
-                    )
-                
-                # Add bundle affiliate link for 560 channel if available
-                if bundle_affiliate_link:
-                    message_text += (
-                        "📦 عرض الحزمة (عروض متنوعة) : \n"
-                        f"الرابط {bundle_affiliate_link} \n"
-                    )
-                
-                message_text += (
-                    f"💎 عرض السوبر : \n"
-                    f"الرابط {super_links} \n"
-                    f"🔥 عرض محدود : \n"
-                    f"الرابط {limit_links} \n\n"
-                    "#AliExpressSaverBot ✅"
-                )
-                
-                bot.send_message(message.chat.id, message_text, reply_markup=keyboard)
-        except Exception as e:
-            print(f"Error in get_affiliate_links inner try: {e}")
-            bot.delete_message(message.chat.id, message_id)
-            
-            # Build fallback message without product details but with all affiliate links
-            message_text = "قارن بين الاسعار واشتري 🔥 \n"
-            
-            # Add coin-index affiliate link for 620 channel if available
-            if coin_affiliate_link:
-                message_text += (
-                    "💰 عرض العملات (السعر النهائي عند الدفع) : \n"
-                    f"الرابط {coin_affiliate_link} \n"
-                )
-            
-            # Add bundle affiliate link for 560 channel if available
-            if bundle_affiliate_link:
-                message_text += (
-                    "📦 عرض الحزمة (عروض متنوعة) : \n"
-                    f"الرابط {bundle_affiliate_link} \n"
-                )
-            
-            message_text += (
-                f"💎 عرض السوبر : \n"
-                f"الرابط {super_links} \n"
-                f"🔥 عرض محدود : \n"
-                f"الرابط {limit_links} \n\n"
-                "#AliExpressSaverBot ✅"
-            )
-            
-            bot.send_message(message.chat.id, message_text, reply_markup=keyboard)
+        bot.delete_message(message.chat.id, message_id)
+        send_offer(message.chat.id, offer)
     except Exception as e:
         print(f"Error in get_affiliate_links: {e}")
         bot.send_message(message.chat.id, "حدث خطأ 🤷🏻‍♂️")
@@ -603,7 +672,7 @@ def get_affiliate_shopcart_link(link, message):
         affiliate_link = aliexpress.get_affiliate_links(shopcart_link)[0].promotion_link
         text2 = f"هذا رابط تخفيض السلة \n{str(affiliate_link)}"
         img_link3 = "https://i.postimg.cc/1Xrk1RJP/Copy-of-Basket-aliexpress-telegram.png"
-        bot.send_photo(message.chat.id, img_link3, caption=text2)
+        send_photo(message.chat.id, img_link3, caption=text2)
     except Exception as e:
         print(f"Error in get_affiliate_shopcart_link: {e}")
         bot.send_message(message.chat.id, "حدث خطأ 🤷🏻‍♂️")
@@ -621,10 +690,10 @@ def handle_callback_query(call):
         else:
             bot.send_message(call.message.chat.id, "..")
             img_link2 = "https://i.postimg.cc/VvmhgQ1h/Basket-aliexpress-telegram.png"
-            bot.send_photo(call.message.chat.id,
-                           img_link2,
-                           caption="روابط ألعاب جمع العملات المعدنية لإستعمالها في خفض السعر لبعض المنتجات، قم بالدخول يوميا لها للحصول على أكبر عدد ممكن في اليوم 👇",
-                           reply_markup=keyboard_games)
+            send_photo(call.message.chat.id,
+                       img_link2,
+                       caption="روابط ألعاب جمع العملات المعدنية لإستعمالها في خفض السعر لبعض المنتجات، قم بالدخول يوميا لها للحصول على أكبر عدد ممكن في اليوم 👇",
+                       reply_markup=keyboard_games)
     except Exception as e:
         print(f"Error in handle_callback_query: {e}")
 
@@ -632,12 +701,32 @@ def handle_callback_query(call):
 
 app = Flask(__name__)
 
+# طابور محدود بين webhook ومعالجات التحديثات
+update_queue = UpdateQueue(
+    lambda update: bot.process_new_updates([update]),
+    workers=int(os.getenv('UPDATE_WORKERS', 8)),
+    max_size=int(os.getenv('UPDATE_QUEUE_SIZE', 250)),
+    dedup_store=dedup_store,
+)
+
 @app.route('/webhook', methods=['POST'])
 def webhook():
     if request.method == 'POST':
-        json_str = request.get_data().decode('UTF-8')
-        update = telebot.types.Update.de_json(json_str)
-        bot.process_new_updates([update])
+        if WEBHOOK_SECRET and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != WEBHOOK_SECRET:
+            return 'Forbidden', 403
+        try:
+            json_str = request.get_data().decode('UTF-8')
+            update = telebot.types.Update.de_json(json_str)
+        except Exception as e:
+            print(f"Invalid webhook update: {e}")
+            return 'Bad Request', 400
+        if update is None:
+            return 'Bad Request', 400
+
+        # الرد فوراً على Telegram، المعالجة تتم في الخلفية
+        if update_queue.submit(update) == FULL:
+            # Telegram سيعيد إرسال التحديث لاحقاً
+            return 'Busy', 503
         return 'OK', 200
 
 @app.route('/ip')
@@ -645,23 +734,51 @@ def get_ip_route():
     """مسار ويب لعرض IP الاستضافة"""
     return f"🌍 عنوان IP الاستضافة الحالي: {HOSTING_IP}"
 
+@app.route('/stats')
+def get_stats_route():
+    """مسار ويب لعرض إحصائيات الذاكرة المؤقتة"""
+    return {
+        'redirects': redirect_resolver.stats(),
+        'products': product_cache.stats(),
+        'product_batches': product_details_batcher.stats(),
+        'updates': update_queue.stats(),
+        'offers': offer_cache.stats(),
+        'offer_dedup': offer_deduplicator.stats(),
+        'photos': photo_cache.stats(),
+        'offer_pipeline': pipeline_stats.stats(),
+        'catalog': catalog_store.stats() if catalog_store is not None else None,
+        'api_rate_limit': api_rate_limiter.stats(),
+        'api_retries': api_retry_policy.retries,
+        'api_circuits': api_circuit_breaker.stats(),
+        'api_connections': getDefaultConnectionPool().stats(),
+    }
+
 # Start Flask app in a separate thread
 def run_flask():
     app.run(host='0.0.0.0', port=5000)
 
+def shutdown():
+    """إرسال طلبات المنتجات المنتظرة قبل إيقاف البوت"""
+    product_details_batcher.close()
+
+def handle_sigterm(signum, frame):
+    # المنصة ترسل SIGTERM عند إعادة النشر، وخيط Flask لا يتوقف من تلقاء نفسه
+    shutdown()
+    os._exit(0)
+
 if __name__ == "__main__":
     # Check if we're running in production (webhook) or development (polling) mode
-    webhook_url = os.getenv('WEBHOOK_URL')
-    
-    if webhook_url:
+    if WEBHOOK_URL:
         # Production mode: Use webhook
         print("🚀 Starting bot in webhook mode...")
         print(f"🌍 استضافة IP: {HOSTING_IP}")
+        update_queue.start()
+        signal.signal(signal.SIGTERM, handle_sigterm)
         threading.Thread(target=run_flask).start()
         try:
             bot.remove_webhook()
-            bot.set_webhook(url=webhook_url)
-            print(f"✅ Webhook set to: {webhook_url}")
+            bot.set_webhook(url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET)
+            print(f"✅ Webhook set to: {WEBHOOK_URL}")
         except Exception as e:
             print(f"❌ Error setting webhook: {e}")
     else:
@@ -680,3 +797,5 @@ if __name__ == "__main__":
             print("\n👋 Bot stopped by user.")
         except Exception as e:
             print(f"❌ Error in polling mode: {e}")
+        finally:
+            shutdown()
@@ -0,0 +1 @@
+"""Supporting services used by the Telegram bot."""
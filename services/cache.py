@@ -0,0 +1,48 @@
+"""Thread-safe caching primitives shared by the bot services."""
+
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from aliexpress_api.cache import MemoryCache
+
+
+# One LRU cache with expiration for the API library and the bot services
+TTLCache = MemoryCache
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls for the same key.
+
+    The first caller runs the function, callers arriving while it is in flight
+    wait for it and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self.shared = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
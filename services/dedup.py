@@ -0,0 +1,171 @@
+"""Short-window deduplication of Telegram updates and repeated product requests.
+
+Two kinds of keys are tracked:
+
+* ``update_id``: Telegram re-delivers a webhook update when it times out, an
+  update that was already accepted is dropped.
+* ``(chat_id, product_id)``: a user pasting the same link twice gets the offer
+  rendered for the first request, or waits for it if it is still being built.
+
+``MemoryDedupStore`` keeps everything in process, ``SqliteDedupStore`` persists it
+so the window survives a restart.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+from .cache import TTLCache, SingleFlight
+
+
+class MemoryDedupStore:
+    """In-memory dedup store.
+
+    Args:
+        update_window (float): Seconds an ``update_id`` is remembered.
+        result_window (float): Seconds a rendered result is reused for the same chat and product.
+        max_size (int): Maximum remembered keys of each kind.
+    """
+
+    def __init__(self, update_window: float = 10 * 60, result_window: float = 60, max_size: int = 100000):
+        self._updates = TTLCache(max_size=max_size, ttl=update_window)
+        self._results = TTLCache(max_size=max_size, ttl=result_window)
+        self._lock = threading.Lock()
+
+    def seen_update(self, update_id: int) -> bool:
+        """Marks an update as seen. Returns True if it had already been seen."""
+        with self._lock:
+            if self._updates.get(update_id) is not None:
+                return True
+            self._updates.set(update_id, True)
+            return False
+
+    def forget_update(self, update_id: int) -> None:
+        self._updates.pop(update_id)
+
+    def get_result(self, chat_id: int, product_id: str) -> Optional[dict]:
+        return self._results.get((chat_id, product_id))
+
+    def set_result(self, chat_id: int, product_id: str, result: dict) -> None:
+        self._results.set((chat_id, product_id), result)
+
+
+class SqliteDedupStore:
+    """SQLite backed dedup store with the same interface as ``MemoryDedupStore``.
+
+    Args:
+        path (str): Database file path.
+        update_window (float): Seconds an ``update_id`` is remembered.
+        result_window (float): Seconds a rendered result is reused for the same chat and product.
+        purge_interval (int): Number of writes between two purges of the entries out of their window.
+    """
+
+    def __init__(self, path: str, update_window: float = 10 * 60, result_window: float = 60,
+                 purge_interval: int = 1000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.update_window = update_window
+        self.result_window = result_window
+        self.purge_interval = purge_interval
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS updates (update_id INTEGER PRIMARY KEY, seen_at REAL NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS results (chat_id INTEGER NOT NULL, product_id TEXT NOT NULL, '
+            'result TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (chat_id, product_id))'
+        )
+        self._connection.commit()
+        self.purge()
+
+    def seen_update(self, update_id: int) -> bool:
+        """Marks an update as seen. Returns True if it had already been seen."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT seen_at FROM updates WHERE update_id = ?', (update_id,)
+            ).fetchone()
+            if row is not None and row[0] > now - self.update_window:
+                return True
+            self._connection.execute(
+                'INSERT OR REPLACE INTO updates (update_id, seen_at) VALUES (?, ?)', (update_id, now)
+            )
+            self._written()
+            self._connection.commit()
+            return False
+
+    def forget_update(self, update_id: int) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM updates WHERE update_id = ?', (update_id,))
+            self._connection.commit()
+
+    def get_result(self, chat_id: int, product_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT result FROM results WHERE chat_id = ? AND product_id = ? AND created_at > ?',
+                (chat_id, product_id, time.time() - self.result_window)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_result(self, chat_id: int, product_id: str, result: dict) -> None:
+        with self._lock:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results (chat_id, product_id, result, created_at) VALUES (?, ?, ?, ?)',
+                (chat_id, product_id, json.dumps(result, ensure_ascii=False), time.time())
+            )
+            self._written()
+            self._connection.commit()
+
+    def purge(self) -> None:
+        """Deletes the entries that are out of their window."""
+        with self._lock:
+            self._purge()
+            self._connection.commit()
+
+    def _written(self) -> None:
+        self._writes += 1
+        if self._writes % self.purge_interval == 0:
+            self._purge()
+
+    def _purge(self) -> None:
+        now = time.time()
+        self._connection.execute('DELETE FROM updates WHERE seen_at < ?', (now - self.update_window,))
+        self._connection.execute('DELETE FROM results WHERE created_at < ?', (now - self.result_window,))
+
+
+class RequestDeduplicator:
+    """Shares the result of a (chat_id, product_id) request with its duplicates.
+
+    A recent result is reused from the store, a request that is still in flight
+    is waited for instead of being started again.
+
+    Args:
+        store (``MemoryDedupStore`` | ``SqliteDedupStore``): Where results are kept.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.reused = 0
+        self._flight = SingleFlight()
+
+    def run(self, chat_id: int, product_id: str, build: Callable[[], dict]) -> dict:
+        result = self.store.get_result(chat_id, product_id)
+        if result is not None:
+            self.reused += 1
+            return result
+        return self._flight.do((chat_id, product_id), self._build, chat_id, product_id, build)
+
+    def _build(self, chat_id: int, product_id: str, build: Callable[[], dict]) -> dict:
+        result = build()
+        self.store.set_result(chat_id, product_id, result)
+        return result
+
+    def stats(self) -> dict:
+        return {'reused': self.reused, 'in_flight_shared': self._flight.shared}
@@ -0,0 +1,137 @@
+"""Exchange rate service.
+
+Keeps the latest rates for a base currency in memory and refreshes them from
+exchangerate-api.com on a background thread. Reads never touch the network:
+an expired rate is still served (stale-while-revalidate) while the refresher is
+woken up, and the last known good rates are persisted to disk so a cold start
+has a value right away.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+
+EXCHANGE_RATE_API_URL = 'https://api.exchangerate-api.com/v4/latest/{base}'
+
+
+class ExchangeRateService:
+    """In-memory TTL cache of exchange rates with a background refresher.
+
+    Args:
+        base (str): Base currency code. Defaults to USD.
+        ttl (float): Seconds after which the rates are considered stale.
+        snapshot_path (str): File used to persist the last known good rates.
+        fallback_rates (dict): Rates returned when nothing has been fetched yet.
+        timeout (float): Timeout in seconds for the HTTP request.
+        retry_interval (float): Seconds to wait before retrying a failed refresh.
+    """
+
+    def __init__(self,
+        base: str = 'USD',
+        ttl: float = 6 * 60 * 60,
+        snapshot_path: str = None,
+        fallback_rates: Dict[str, float] = None,
+        timeout: float = 10,
+        retry_interval: float = 60):
+        self.base = base
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.fallback_rates = dict(fallback_rates or {})
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._rates = {}
+        self._fetched_at = 0.0
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """Loads the snapshot from disk and starts the background refresher."""
+        self.load_snapshot()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='exchange-rates', daemon=True)
+            self._thread.start()
+
+    def get_rate(self, currency: str) -> Optional[float]:
+        """Returns the cached rate from the base currency to ``currency``.
+
+        Never blocks on the network. Stale rates are returned while a refresh is
+        triggered in the background; the fallback rate is used until the first
+        successful fetch.
+        """
+        with self._lock:
+            rate = self._rates.get(currency)
+            stale = self.is_stale()
+        if stale:
+            self._wakeup.set()
+        if rate is None:
+            return self.fallback_rates.get(currency)
+        return rate
+
+    def is_stale(self) -> bool:
+        return time.time() - self._fetched_at > self.ttl
+
+    def refresh(self) -> bool:
+        """Fetches the latest rates. Returns False and keeps the old ones on failure."""
+        try:
+            response = requests.get(EXCHANGE_RATE_API_URL.format(base=self.base), timeout=self.timeout)
+            response.raise_for_status()
+            rates = response.json()['rates']
+        except Exception as e:
+            print(f"Error fetching exchange rate: {e}")
+            return False
+
+        with self._lock:
+            self._rates = rates
+            self._fetched_at = time.time()
+        self.save_snapshot()
+        return True
+
+    def load_snapshot(self) -> None:
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as snapshot:
+                data = json.load(snapshot)
+        except (OSError, ValueError) as e:
+            print(f"Error loading exchange rate snapshot: {e}")
+            return
+        if data.get('base') != self.base:
+            return
+        with self._lock:
+            self._rates = data['rates']
+            self._fetched_at = data['fetched_at']
+
+    def save_snapshot(self) -> None:
+        if not self.snapshot_path:
+            return
+        with self._lock:
+            data = {'base': self.base, 'rates': self._rates, 'fetched_at': self._fetched_at}
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.snapshot_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as snapshot:
+                json.dump(data, snapshot)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Error saving exchange rate snapshot: {e}")
+
+    def _run(self) -> None:
+        while True:
+            if self.is_stale() and time.time() - self._last_attempt >= self.retry_interval:
+                self._last_attempt = time.time()
+                self.refresh()
+            if self.is_stale():
+                wait = self.retry_interval - (time.time() - self._last_attempt)
+            else:
+                wait = self.ttl - (time.time() - self._fetched_at)
+            self._wakeup.wait(timeout=max(wait, 1))
+            self._wakeup.clear()
@@ -0,0 +1,142 @@
+"""Telegram ``file_id`` cache for photos sent by URL.
+
+Sending a photo by URL makes Telegram download it again on every call. The first
+send returns the ``file_id`` of the uploaded photo, later sends of the same URL
+pass that ``file_id`` instead, which costs no download at all. The recently used
+mappings are kept in a bounded memory cache, all of them in SQLite so they survive
+restarts. A ``file_id`` Telegram no longer accepts is dropped and the photo is
+sent from its URL again.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .cache import TTLCache
+
+# Descriptions of the 400 errors Telegram returns for an unusable ``file_id``,
+# e.g. "Bad Request: wrong file identifier/HTTP URL specified"
+INVALID_FILE_ID_DESCRIPTIONS = (
+    'wrong file identifier',
+    'wrong remote file',
+    'file_id',
+)
+
+def is_invalid_file_id_error(error: Exception) -> bool:
+    """Returns True if Telegram rejected the photo because of its ``file_id``."""
+    if getattr(error, 'error_code', None) != 400:
+        return False
+    description = str(getattr(error, 'description', error)).lower()
+    return any(marker in description for marker in INVALID_FILE_ID_DESCRIPTIONS)
+
+
+class PhotoCache:
+    """Maps photo URLs to the Telegram ``file_id`` returned by their first send.
+
+    Args:
+        path (str): SQLite database file. The cache is in memory only when None.
+        max_size (int): Maximum number of mappings kept in memory.
+        ttl (float): Seconds a mapping is kept after its last send from URL.
+        purge_interval (int): Number of writes between two purges of the expired SQLite rows.
+    """
+
+    def __init__(self, path: str = None, max_size: int = 10000, ttl: float = 30 * 24 * 60 * 60,
+                 purge_interval: int = 1000):
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self._file_ids = TTLCache(max_size=max_size, ttl=ttl)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._connection = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS photos (url TEXT PRIMARY KEY, file_id TEXT NOT NULL, '
+                'updated_at REAL NOT NULL)'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS photos_updated_at ON photos (updated_at)')
+            self._purge()
+            self._connection.commit()
+
+    def get(self, url: str) -> Optional[str]:
+        file_id = self._file_ids.get(url)
+        if file_id is not None or self._connection is None:
+            return file_id
+
+        # Not used recently, it may still be on disk
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT file_id, updated_at FROM photos WHERE url = ? AND updated_at > ?',
+                (url, time.time() - self.ttl)
+            ).fetchone()
+        if row is None:
+            return None
+        self._file_ids.set(url, row[0], ttl=row[1] + self.ttl - time.time())
+        return row[0]
+
+    def set(self, url: str, file_id: str) -> None:
+        with self._lock:
+            self._file_ids.set(url, file_id)
+            if self._connection is not None:
+                self._connection.execute(
+                    'INSERT OR REPLACE INTO photos (url, file_id, updated_at) VALUES (?, ?, ?)',
+                    (url, file_id, time.time())
+                )
+                self._writes += 1
+                if self._writes % self.purge_interval == 0:
+                    self._purge()
+                self._connection.commit()
+
+    def _purge(self) -> None:
+        self._connection.execute('DELETE FROM photos WHERE updated_at < ?', (time.time() - self.ttl,))
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._file_ids.pop(url)
+            self.invalidated += 1
+            if self._connection is not None:
+                self._connection.execute('DELETE FROM photos WHERE url = ?', (url,))
+                self._connection.commit()
+
+    def send_photo(self, send: Callable[..., Any], chat_id: int, url: str, **kwargs) -> Any:
+        """Sends a photo through ``send`` (``bot.send_photo``), by ``file_id`` when known.
+
+        Returns the sent message.
+        """
+        file_id = self.get(url)
+        if file_id is not None:
+            try:
+                message = send(chat_id, file_id, **kwargs)
+                self.hits += 1
+                return message
+            except Exception as e:
+                if not is_invalid_file_id_error(e):
+                    raise
+                print(f"Cached file_id rejected for {url}: {e}")
+                self.invalidate(url)
+
+        self.misses += 1
+        message = send(chat_id, url, **kwargs)
+        photos = getattr(message, 'photo', None)
+        if photos:
+            # The last size is the largest, the one Telegram sends back by default
+            self.set(url, photos[-1].file_id)
+        return message
+
+    def stats(self) -> dict:
+        return {
+            'size': len(self._file_ids),
+            'evictions': self._file_ids.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidated': self.invalidated,
+        }
@@ -0,0 +1,139 @@
+"""Request-scoped execution pipeline.
+
+Runs the independent stages of a single bot request concurrently on a shared,
+bounded thread pool. Every stage has its own timeout; stages that fail or do not
+finish in time are reported as missing so the caller can assemble a partial
+result instead of waiting for the slowest remote call.
+"""
+
+import threading
+import time
+from concurrent.futures import Executor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict
+
+
+class StageResult:
+    """Outcome of a single pipeline stage.
+
+    Args:
+        name (str): Stage name.
+        value (Any): Value returned by the stage, None if it failed or timed out.
+        error (Exception): Exception raised by the stage, if any.
+        timed_out (bool): True if the stage did not finish before its timeout.
+        elapsed (float): Seconds from submission until the stage finished, or until
+            it was given up on if it timed out.
+    """
+
+    def __init__(self, name: str, value: Any = None, error: Exception = None,
+                 timed_out: bool = False, elapsed: float = 0.0):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.timed_out = timed_out
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+class PipelineStats:
+    """Aggregated stage timings of every pipeline run, for monitoring."""
+
+    def __init__(self):
+        self.runs = 0
+        self._total = 0.0
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, total: float, stages: Dict[str, StageResult]) -> None:
+        with self._lock:
+            self.runs += 1
+            self._total += total
+            for stage in stages.values():
+                timings = self._stages.setdefault(
+                    stage.name, {'count': 0, 'timeouts': 0, 'errors': 0, 'elapsed': 0.0, 'max': 0.0}
+                )
+                timings['count'] += 1
+                timings['timeouts'] += stage.timed_out
+                timings['errors'] += stage.error is not None
+                timings['elapsed'] += stage.elapsed
+                timings['max'] = max(timings['max'], stage.elapsed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'runs': self.runs,
+                'avg_ms': round(self._total / self.runs * 1000, 1) if self.runs else 0.0,
+                'stages': {
+                    name: {
+                        'count': timings['count'],
+                        'timeouts': timings['timeouts'],
+                        'errors': timings['errors'],
+                        'avg_ms': round(timings['elapsed'] / timings['count'] * 1000, 1),
+                        'max_ms': round(timings['max'] * 1000, 1),
+                    }
+                    for name, timings in self._stages.items()
+                },
+            }
+
+
+class Pipeline:
+    """Submits stages to an executor as soon as they are added and collects them.
+
+    Args:
+        executor (Executor): Bounded executor shared by all requests.
+        name (str): Label used in the timing log.
+        stats (PipelineStats): Receives the stage timings of this run, if given.
+    """
+
+    def __init__(self, executor: Executor, name: str = 'pipeline', stats: PipelineStats = None):
+        self._executor = executor
+        self._name = name
+        self._stats = stats
+        self._stages = {}
+        self._finished = {}
+        self._started = time.monotonic()
+
+    def add(self, name: str, func: Callable, *args, timeout: float = None, **kwargs) -> None:
+        """Starts a stage in the background. Timeout counts from this call."""
+        submitted = time.monotonic()
+        future = self._executor.submit(func, *args, **kwargs)
+        future.add_done_callback(lambda _: self._finished.setdefault(name, time.monotonic()))
+        self._stages[name] = (future, submitted, timeout)
+
+    def result(self, name: str) -> StageResult:
+        """Waits for a stage within its remaining timeout and returns its outcome."""
+        future, submitted, timeout = self._stages[name]
+        remaining = None
+        if timeout is not None:
+            remaining = max(0.0, submitted + timeout - time.monotonic())
+
+        try:
+            value = future.result(timeout=remaining)
+            stage = StageResult(name, value=value)
+        except FutureTimeoutError:
+            stage = StageResult(name, timed_out=True)
+        except Exception as error:
+            stage = StageResult(name, error=error)
+
+        stage.elapsed = self._finished.get(name, time.monotonic()) - submitted
+        return stage
+
+    def results(self) -> Dict[str, StageResult]:
+        """Collects every stage, logs the per-stage timings and records them in the stats."""
+        stages = {name: self.result(name) for name in self._stages}
+        total = time.monotonic() - self._started
+        self.log_timings(stages, total)
+        if self._stats is not None:
+            self._stats.record(total, stages)
+        return stages
+
+    def log_timings(self, stages: Dict[str, StageResult], total: float) -> None:
+        timings = ', '.join(
+            f"{stage.name}={stage.elapsed * 1000:.0f}ms"
+            + (' (timeout)' if stage.timed_out else '')
+            + (' (error)' if stage.error is not None else '')
+            for stage in stages.values()
+        )
+        print(f"⏱️ {self._name}: total={total * 1000:.0f}ms, {timings}")
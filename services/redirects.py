@@ -0,0 +1,94 @@
+"""Redirect resolution for AliExpress short links.
+
+Short links (s.click, a.aliexpress, star.aliexpress shares...) are resolved to
+their final product URL through one shared, pooled HTTP session. Results are kept
+in a bounded LRU+TTL cache and concurrent lookups of the same link share a single
+network resolution.
+"""
+
+from typing import Callable, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import TTLCache, SingleFlight
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+                  'AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/58.0.3029.110 Safari/537.36'
+}
+
+
+class RedirectResolver:
+    """Resolves links to ``(final_url, product_id)`` with caching and single-flight.
+
+    Args:
+        product_id_parser (callable): Extracts the product ID from a final URL.
+        max_size (int): Maximum number of cached links.
+        ttl (float): Seconds a resolved link is kept in cache.
+        timeout (float): Timeout in seconds for each HTTP request.
+        pool_size (int): Connections kept per host by the shared session.
+    """
+
+    def __init__(self,
+        product_id_parser: Callable[[str], Optional[str]] = None,
+        max_size: int = 4096,
+        ttl: float = 6 * 60 * 60,
+        timeout: float = 10,
+        pool_size: int = 20):
+        self.product_id_parser = product_id_parser or (lambda url: None)
+        self.timeout = timeout
+        self.cache = TTLCache(max_size=max_size, ttl=ttl)
+        self._flight = SingleFlight()
+        self._session = requests.Session()
+        self._session.headers.update(DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+    def resolve(self, link: str) -> Tuple[str, Optional[str]]:
+        """Returns the final URL and its product ID. Falls back to the link itself on error."""
+        result = self.cache.get(link)
+        if result is not None:
+            return result
+        return self._flight.do(link, self._resolve, link)
+
+    def _resolve(self, link: str) -> Tuple[str, Optional[str]]:
+        try:
+            final_url = self._follow(link)
+        except requests.RequestException as e:
+            print(f"❌ Error resolving redirect chain for link {link}: {e}")
+            return link, self.product_id_parser(link)
+
+        result = (final_url, self.product_id_parser(final_url))
+        self.cache.set(link, result)
+        # The final URL resolves to itself, cache it to skip a second lookup
+        self.cache.set(final_url, result)
+        return result
+
+    def _follow(self, link: str) -> str:
+        # stream=True: only the final URL is needed, the page body is never downloaded
+        response = self._session.get(link, allow_redirects=True, timeout=self.timeout, stream=True)
+        response.close()
+        final_url = response.url
+        print(f"🔗 Resolved URL: {link} -> {final_url}")
+
+        # star.aliexpress share pages carry the product URL in redirectUrl
+        if "star.aliexpress.com" in final_url:
+            params = parse_qs(urlparse(final_url).query)
+            if 'redirectUrl' in params:
+                redirect_url = params['redirectUrl'][0]
+                print(f"🔗 Found redirectUrl: {redirect_url}")
+                if not redirect_url.startswith('http'):
+                    redirect_url = 'https:' + redirect_url
+                return self._follow(redirect_url)
+
+        return final_url
+
+    def stats(self) -> dict:
+        stats = self.cache.stats()
+        stats['shared'] = self._flight.shared
+        return stats
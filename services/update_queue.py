@@ -0,0 +1,126 @@
+"""Bounded queue between the webhook and the update handlers.
+
+The webhook only validates and enqueues the Telegram update, so it can answer
+Telegram right away. A fixed pool of workers drains the queue. Updates of the same
+chat always go to the same worker, which keeps them in order, and updates already
+seen (Telegram re-delivers on timeout) are dropped by ``update_id``.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from .dedup import MemoryDedupStore
+
+
+QUEUED = 'queued'
+DUPLICATE = 'duplicate'
+FULL = 'full'
+
+# Update fields that carry the chat the update belongs to
+CHAT_FIELDS = ('message', 'edited_message', 'channel_post', 'edited_channel_post')
+
+
+def get_chat_id(update) -> Optional[int]:
+    """Returns the chat ID of a telebot ``Update``, None if it has no chat."""
+    for field in CHAT_FIELDS:
+        message = getattr(update, field, None)
+        if message is not None:
+            return message.chat.id
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None and callback_query.message is not None:
+        return callback_query.message.chat.id
+    return None
+
+
+class UpdateQueue:
+    """Per-chat ordered worker pool with backpressure and ``update_id`` deduplication.
+
+    Args:
+        handler (callable): Called with each update on a worker thread.
+        workers (int): Number of worker threads.
+        max_size (int): Maximum queued updates per worker. ``submit`` reports FULL beyond it.
+        dedup_store (``MemoryDedupStore`` | ``SqliteDedupStore``): Remembers the accepted
+            ``update_id``. Defaults to an in-memory store.
+    """
+
+    def __init__(self,
+        handler: Callable[[Any], None],
+        workers: int = 4,
+        max_size: int = 250,
+        dedup_store=None):
+        self.handler = handler
+        self.dedup_store = dedup_store if dedup_store is not None else MemoryDedupStore()
+        self.queued = 0
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+        self._queues = [queue.Queue(maxsize=max_size) for _ in range(workers)]
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self) -> None:
+        for index, updates in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(updates,), name=f'update-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, update) -> str:
+        """Enqueues an update without blocking. Returns QUEUED, DUPLICATE or FULL."""
+        if self.dedup_store.seen_update(update.update_id):
+            with self._lock:
+                self.duplicates += 1
+            return DUPLICATE
+
+        chat_id = get_chat_id(update)
+        key = chat_id if chat_id is not None else update.update_id
+        updates = self._queues[hash(key) % len(self._queues)]
+        try:
+            updates.put_nowait((time.monotonic(), update))
+        except queue.Full:
+            # Telegram will deliver it again, it must not be taken for a duplicate then
+            self.dedup_store.forget_update(update.update_id)
+            with self._lock:
+                self.rejected += 1
+            return FULL
+
+        with self._lock:
+            self.queued += 1
+        return QUEUED
+
+    def stats(self) -> dict:
+        depths = [updates.qsize() for updates in self._queues]
+        handled = self.processed + self.failed
+        return {
+            'depth': sum(depths),
+            'max_worker_depth': max(depths),
+            'queued': self.queued,
+            'processed': self.processed,
+            'failed': self.failed,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'avg_wait_ms': round(self.wait_time / handled * 1000, 1) if handled else 0.0,
+        }
+
+    def _run(self, updates: queue.Queue) -> None:
+        while True:
+            queued_at, update = updates.get()
+            waited = time.monotonic() - queued_at
+            try:
+                self.handler(update)
+                failed = False
+            except Exception as e:
+                print(f"Error processing update {update.update_id}: {e}")
+                failed = True
+            finally:
+                updates.task_done()
+
+            with self._lock:
+                self.wait_time += waited
+                if failed:
+                    self.failed += 1
+                else:
+                    self.processed += 1
@@ -0,0 +1,105 @@
+"""``AsyncAliexpressApi`` against an in-memory transport: blocking I/O stays off the event loop."""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from aliexpress_api import AliexpressApi, AsyncAliexpressApi, models
+from aliexpress_api.cache import CategoryIndex, ProductCache
+
+CATEGORIES = {'total_result_count': 2, 'categories': {'category': [
+    {'category_id': 1, 'category_name': 'A'},
+    {'category_id': 11, 'category_name': 'A1', 'parent_category_id': 1},
+]}}
+
+
+def products(request):
+    ids = request.product_ids.split(',')
+    return {'current_record_count': len(ids), 'products': {'product': [
+        {'product_id': int(product_id), 'product_title': f'T{product_id}'} for product_id in ids]}}
+
+
+class FakeTransport:
+    """Answers like the API, from the thread of the event loop."""
+
+    def __init__(self):
+        self.methods = []
+
+    async def getResponse(self, request, object_hook=None):
+        method = request.getapiname()
+        self.methods.append(method)
+        result = products(request) if method.endswith('productdetail.get') else CATEGORIES
+        body = {method.replace('.', '_') + '_response': {'resp_result': {'resp_code': 200, 'result': result}}}
+        return json.loads(json.dumps(body), object_hook=object_hook)
+
+    async def close(self):
+        pass
+
+
+class ThreadCheckingCache(ProductCache):
+    """Records the threads the cache is used from."""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def get_many(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().get_many(*args, **kwargs)
+
+    def set(self, *args, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().set(*args, **kwargs)
+
+
+class ThreadCheckingIndex(CategoryIndex):
+
+    def save_snapshot(self):
+        self.thread = threading.get_ident()
+        return super().save_snapshot()
+
+
+class AsyncAliexpressApiTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.cache = ThreadCheckingCache()
+        self.index = ThreadCheckingIndex(snapshot_path=os.path.join(directory, 'categories.json'))
+        self.transport = FakeTransport()
+        self.api = AsyncAliexpressApi('key', 'secret', models.Language.EN, models.Currency.EUR,
+                                      product_cache=self.cache, category_index=self.index, transport=self.transport)
+
+    def test_is_not_a_blocking_client(self):
+        self.assertNotIsInstance(self.api, AliexpressApi)
+
+    def test_product_cache_is_used_off_the_event_loop(self):
+        async def main():
+            first = await self.api.get_products_details(['1', '2'])
+            second = await self.api.get_products_details(['2', '1'])
+            return first, second, threading.get_ident()
+
+        first, second, loop_thread = asyncio.run(main())
+        self.assertEqual([product.product_id for product in first], [1, 2])
+        self.assertEqual([product.product_id for product in second], [2, 1])
+        self.assertEqual(len(self.transport.methods), 1)
+        self.assertTrue(self.cache.threads)
+        self.assertNotIn(loop_thread, self.cache.threads)
+
+    def test_category_snapshot_is_written_off_the_event_loop(self):
+        async def main():
+            children = await self.api.get_child_categories(1)
+            return children, threading.get_ident()
+
+        children, loop_thread = asyncio.run(main())
+        self.assertEqual([category.category_id for category in children], [11])
+        self.assertTrue(os.path.exists(self.index.snapshot_path))
+        self.assertNotEqual(self.index.thread, loop_thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
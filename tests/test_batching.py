@@ -0,0 +1,78 @@
+"""Coalescing, batch splitting and shutdown of ``ProductDetailsBatcher``."""
+
+import threading
+import time
+import unittest
+
+from aliexpress_api import models
+from aliexpress_api.batching import MAX_PRODUCT_IDS_PER_CALL, ProductDetailsBatcher
+from aliexpress_api.errors import ProductsNotFoudException
+
+
+MISSING = '999'
+
+
+class FakeApi:
+    """Returns the requested products, except ``MISSING``."""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_products_details(self, product_ids, fields=None, country=None):
+        with self._lock:
+            self.calls.append(list(product_ids))
+        products = [models.Product(product_id=int(product_id)) for product_id in product_ids
+                    if product_id != MISSING]
+        if not products:
+            raise ProductsNotFoudException('No products found with current parameters')
+        return products
+
+
+class ProductDetailsBatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.api = FakeApi()
+
+    def batcher(self, **kwargs):
+        batcher = ProductDetailsBatcher(self.api, **kwargs)
+        self.addCleanup(batcher.close)
+        return batcher
+
+    def test_concurrent_lookups_share_a_request(self):
+        batcher = self.batcher(max_wait=0.05)
+        futures = [batcher.submit(product_id) for product_id in ('1', '2', '2', '3')]
+        self.assertEqual([future.result(1).product_id for future in futures], [1, 2, 2, 3])
+        self.assertEqual(self.api.calls, [['1', '2', '3']])
+        self.assertEqual(batcher.stats(), {'lookups': 4, 'requests': 1})
+
+    def test_overflow_is_split_and_every_future_resolves(self):
+        batcher = self.batcher(max_wait=60)
+        product_ids = [str(product_id) for product_id in range(1, MAX_PRODUCT_IDS_PER_CALL + 6)]
+        futures = [batcher.submit(product_id) for product_id in product_ids]
+        # The full batch is sent right away, the rest when the batcher is closed
+        self.assertEqual(futures[0].result(1).product_id, 1)
+        batcher.close()
+        self.assertEqual([future.result(0).product_id for future in futures], list(range(1, 26)))
+        self.assertEqual([len(call) for call in self.api.calls], [MAX_PRODUCT_IDS_PER_CALL, 5])
+
+    def test_missing_products_fail_their_own_future(self):
+        batcher = self.batcher(max_wait=0.01)
+        found, missing = batcher.submit('1'), batcher.submit(MISSING)
+        self.assertEqual(found.result(1).product_id, 1)
+        with self.assertRaises(ProductsNotFoudException):
+            missing.result(1)
+
+    def test_close_sends_the_pending_lookups(self):
+        batcher = self.batcher(max_wait=60)
+        futures = [batcher.submit(product_id) for product_id in ('1', '2')]
+        started_at = time.monotonic()
+        batcher.close()
+        self.assertLess(time.monotonic() - started_at, 1)
+        self.assertTrue(all(future.done() for future in futures))
+        with self.assertRaises(RuntimeError):
+            batcher.submit('3')
+
+
+if __name__ == '__main__':
+    unittest.main()
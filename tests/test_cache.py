@@ -0,0 +1,87 @@
+"""The LRU cache with expiration and the SQLite product cache tier."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from aliexpress_api.cache import MemoryCache, SqliteCache, memory
+from services.cache import TTLCache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class MemoryCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(memory, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_is_the_cache_of_the_services(self):
+        self.assertIs(TTLCache, MemoryCache)
+
+    def test_entries_expire_after_their_ttl(self):
+        cache = MemoryCache(ttl=10)
+        cache.set('default', 1)
+        cache.set('short', 2, ttl=1)
+        self.clock.now += 5
+        self.assertIsNone(cache.get('short'))
+        self.assertEqual(cache.get('default'), 1)
+        self.clock.now += 6
+        self.assertEqual(cache.get('default', 'missing'), 'missing')
+        self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = MemoryCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.evictions, 1)
+
+
+class SqliteCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cache.sqlite')
+
+    def test_max_size_is_enforced_on_insert(self):
+        cache = SqliteCache(self.path, max_size=3, purge_interval=1000)
+        for index, key in enumerate('abcd'):
+            cache.set(key, index, ttl=100 + index)
+        # The entry closest to expiring made room
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual([cache.get(key) for key in 'bcd'], [1, 2, 3])
+        cache.set('d', 4, ttl=100)
+        self.assertEqual(cache.stats()['size'], 3)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_size_survives_a_restart(self):
+        cache = SqliteCache(self.path, max_size=2)
+        cache.set('a', 1, ttl=100)
+        cache.set('b', 2, ttl=101)
+        cache.delete('b')
+        reopened = SqliteCache(self.path, max_size=2)
+        self.assertEqual(reopened.stats()['size'], 1)
+        reopened.set('b', 2, ttl=101)
+        reopened.set('c', 3, ttl=102)
+        self.assertEqual(reopened.stats()['size'], 2)
+        self.assertIsNone(reopened.get('a'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""``update_id`` and product request deduplication, in memory and in SQLite."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from services.dedup import MemoryDedupStore, RequestDeduplicator, SqliteDedupStore
+from services.update_queue import DUPLICATE, FULL, QUEUED, UpdateQueue
+
+
+def make_update(update_id, chat_id=10):
+    return SimpleNamespace(update_id=update_id, message=SimpleNamespace(chat=SimpleNamespace(id=chat_id)))
+
+
+class SqliteDedupStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'dedup.sqlite')
+
+    def test_duplicate_updates_are_rejected_across_restarts(self):
+        updates = UpdateQueue(lambda update: None, dedup_store=SqliteDedupStore(self.path))
+        self.assertEqual(updates.submit(make_update(1)), QUEUED)
+        self.assertEqual(updates.submit(make_update(1)), DUPLICATE)
+        self.assertEqual(updates.stats()['duplicates'], 1)
+
+        restarted = UpdateQueue(lambda update: None, dedup_store=SqliteDedupStore(self.path))
+        self.assertEqual(restarted.submit(make_update(1)), DUPLICATE)
+        self.assertEqual(restarted.submit(make_update(2)), QUEUED)
+
+    def test_rejected_update_is_forgotten(self):
+        store = SqliteDedupStore(self.path)
+        # Not started: nothing drains the queue
+        updates = UpdateQueue(lambda update: None, workers=1, max_size=1, dedup_store=store)
+        self.assertEqual(updates.submit(make_update(1)), QUEUED)
+        self.assertEqual(updates.submit(make_update(2)), FULL)
+        self.assertFalse(store.seen_update(2))
+        self.assertTrue(store.seen_update(1))
+
+    def test_updates_are_remembered_for_the_window(self):
+        store = SqliteDedupStore(self.path, update_window=0.05)
+        self.assertFalse(store.seen_update(1))
+        self.assertTrue(store.seen_update(1))
+        time.sleep(0.1)
+        self.assertFalse(store.seen_update(1))
+
+    def test_results(self):
+        store = SqliteDedupStore(self.path, result_window=0.05)
+        store.set_result(10, '1005', {'text': 'offer'})
+        self.assertEqual(store.get_result(10, '1005'), {'text': 'offer'})
+        self.assertIsNone(store.get_result(11, '1005'))
+        time.sleep(0.1)
+        self.assertIsNone(store.get_result(10, '1005'))
+
+
+class RequestDeduplicatorTest(unittest.TestCase):
+
+    def test_concurrent_duplicates_share_one_build(self):
+        deduplicator = RequestDeduplicator(MemoryDedupStore())
+        started = threading.Event()
+        release = threading.Event()
+        builds = []
+
+        def build():
+            builds.append(1)
+            started.set()
+            release.wait(5)
+            return {'text': 'offer'}
+
+        results = []
+        first = threading.Thread(target=lambda: results.append(deduplicator.run(10, '1005', build)))
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=lambda: results.append(deduplicator.run(10, '1005', build)))
+        second.start()
+        while deduplicator.stats()['in_flight_shared'] == 0:
+            time.sleep(0.001)
+        release.set()
+        first.join()
+        second.join()
+
+        self.assertEqual(results, [{'text': 'offer'}] * 2)
+        self.assertEqual(len(builds), 1)
+        # Later duplicates reuse the stored result
+        self.assertEqual(deduplicator.run(10, '1005', build), {'text': 'offer'})
+        self.assertEqual(deduplicator.stats()['reused'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Incremental order sync against an in-memory stand-in of ``order.listbyindex``."""
+
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from aliexpress_api import models
+from aliexpress_api.orders import OrderStore, OrderSync
+
+PAID = models.OrderStatus.PAYMENT_COMPLETED
+
+
+class FakeOrderApi:
+    """Serves the orders of a status and time range by query index, like the API."""
+
+    def __init__(self):
+        self.orders = []
+        self.calls = []
+
+    def add(self, day, commission='1.00', status=PAID):
+        order = {'order_id': 1000 + len(self.orders), 'index': len(self.orders) + 1, 'order_status': status,
+                 'paid_time': f'2026-10-{day:02d} 12:00:00', 'estimated_paid_commission': commission}
+        self.orders.append(order)
+        return order
+
+    def stream_orders_by_index(self, start_time, end_time, status, fields, page_size, start_query_index_id):
+        self.calls.append((start_time, end_time, status, start_query_index_id))
+        after = int(start_query_index_id or 0)
+        page = [order for order in self.orders if order['order_status'] == status and order['index'] > after
+                and start_time <= order['paid_time'] <= end_time][:page_size]
+        result = SimpleNamespace(max_query_index_id=str(page[-1]['index']) if page else None)
+        items = [models.Order(**{key: value for key, value in order.items() if key != 'index'}) for order in page]
+        return FakeStream(items, result)
+
+
+class FakeStream(list):
+
+    def __init__(self, items, result):
+        super().__init__(items)
+        self.result = result
+
+
+class OrderSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.store = OrderStore(os.path.join(directory, 'orders.sqlite'))
+        self.api = FakeOrderApi()
+        self.sync = OrderSync(self.api, self.store, page_size=5, rescan_window=2 * 24 * 60 * 60)
+
+    def sync_days(self, first, last):
+        return self.sync.sync_status(PAID, f'2026-10-{first:02d} 00:00:00', f'2026-10-{last:02d} 23:59:59')
+
+    def test_backfill_reads_every_page(self):
+        for day in range(1, 11):
+            self.api.add(day)
+        self.assertEqual(self.sync_days(1, 10), 10)
+        self.assertEqual(len(self.api.calls), 3)
+        self.assertEqual(self.store.get_cursor(PAID), ('10', '2026-10-01 00:00:00'))
+
+    def test_rolling_window_resumes_from_the_status_cursor(self):
+        for day in range(1, 11):
+            self.api.add(day)
+        self.sync_days(1, 10)
+        new = self.api.add(11)
+        self.api.calls.clear()
+
+        self.sync_days(2, 11)
+        # One page after the cursor, then the orders of the last two days read again
+        self.assertEqual(self.api.calls, [
+            ('2026-10-02 00:00:00', '2026-10-11 23:59:59', PAID, '10'),
+            ('2026-10-09 23:59:59', '2026-10-11 23:59:59', PAID, None),
+        ])
+        self.assertIsNotNone(self.store.get_order(new['order_id']))
+        self.assertEqual(self.store.get_cursor(PAID)[0], '11')
+
+    def test_changed_orders_in_the_rescan_window_are_updated(self):
+        old = self.api.add(1)
+        recent = self.api.add(10)
+        self.sync_days(1, 10)
+        old['estimated_paid_commission'] = recent['estimated_paid_commission'] = '2.50'
+
+        self.sync_days(1, 10)
+        self.assertEqual(self.store.get_order(recent['order_id']).estimated_paid_commission, '2.50')
+        # Out of the rescan window, changes are not requested
+        self.assertEqual(self.store.get_order(old['order_id']).estimated_paid_commission, '1.00')
+
+    def test_earlier_start_backfills_from_scratch(self):
+        self.api.add(1)
+        self.api.add(5)
+        self.sync_days(5, 10)
+        self.assertIsNone(self.store.get_order(1000))
+        self.api.calls.clear()
+
+        self.sync_days(1, 10)
+        self.assertEqual(self.api.calls, [('2026-10-01 00:00:00', '2026-10-10 23:59:59', PAID, None)])
+        self.assertIsNotNone(self.store.get_order(1000))
+        self.assertEqual(self.store.get_cursor(PAID)[1], '2026-10-01 00:00:00')
+
+    def test_interrupted_backfill_resumes_from_its_last_page(self):
+        for day in range(1, 11):
+            self.api.add(day)
+        stream = self.api.stream_orders_by_index
+
+        def fail_on_second_page(*args):
+            if len(self.api.calls) == 1:
+                raise ConnectionResetError()
+            return stream(*args)
+
+        self.api.stream_orders_by_index = fail_on_second_page
+        with self.assertRaises(ConnectionResetError):
+            self.sync_days(1, 10)
+        self.api.stream_orders_by_index = stream
+        self.api.calls.clear()
+
+        self.sync_days(1, 10)
+        self.assertEqual(self.api.calls[0][3], '5')
+        self.assertEqual(self.store.stats(), {'size': 10, 'cursors': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+"""Page limits, cursors and prefetch cancellation of the page iterators, and bulk product searches."""
+
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from aliexpress_api import AliexpressApi, models
+from aliexpress_api.helpers.pagination import AsyncPageIterator, PageIterator
+from aliexpress_api.ratelimit import BACKGROUND, get_request_priority, request_priority
+
+
+class FakePages:
+    """``total`` numbered items served ``page_size`` at a time, records the pages requested."""
+
+    def __init__(self, page_size=5, total=100):
+        self.page_size = page_size
+        self.total = total
+        self.requested = []
+
+    def __call__(self, page_no):
+        self.requested.append(page_no)
+        start = (page_no - 1) * self.page_size
+        return list(range(start, min(start + self.page_size, self.total))), self.total
+
+
+class PageIteratorTest(unittest.TestCase):
+
+    def test_reads_every_page(self):
+        pages = FakePages(total=12)
+        self.assertEqual(list(PageIterator(pages, 5)), list(range(12)))
+        self.assertEqual(pages.requested, [1, 2, 3])
+
+    def test_max_pages(self):
+        pages = FakePages()
+        iterator = PageIterator(pages, 5, max_pages=3)
+        self.assertEqual(list(iterator), list(range(15)))
+        self.assertEqual(pages.requested, [1, 2, 3])
+        self.assertEqual(iterator.pages_fetched, 3)
+
+    def test_max_items_does_not_prefetch_past_the_limit(self):
+        pages = FakePages()
+        iterator = PageIterator(pages, 5, max_items=7)
+        self.assertEqual(list(iterator), list(range(7)))
+        self.assertEqual(pages.requested, [1, 2])
+        self.assertEqual(iterator.cursor, {'page_no': 2, 'offset': 2})
+
+    def test_cursor_resumes_from_the_next_item(self):
+        pages = FakePages(total=12)
+        iterator = PageIterator(pages, 5, max_items=7)
+        list(iterator)
+        self.assertEqual(list(PageIterator(pages, 5, cursor=iterator.cursor)), list(range(7, 12)))
+
+    def test_early_stop_does_not_wait_for_the_prefetch(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        pages = FakePages()
+
+        def fetch_page(page_no):
+            if page_no > 1:
+                release.wait(5)
+            return pages(page_no)
+
+        started_at = time.monotonic()
+        for item in PageIterator(fetch_page, 5):
+            break
+        self.assertLess(time.monotonic() - started_at, 1)
+        release.set()
+        self.assertEqual(pages.requested[0], 1)
+        self.assertNotIn(3, pages.requested)
+
+    def test_must_be_consumed_with_async_for(self):
+        with self.assertRaises(TypeError):
+            iter(AsyncPageIterator(FakePages(), 5))
+
+
+class AsyncPageIteratorTest(unittest.TestCase):
+
+    def collect(self, iterator):
+        async def main():
+            return [item async for item in iterator]
+        return asyncio.run(main())
+
+    def test_max_pages_and_max_items(self):
+        pages = FakePages()
+
+        async def fetch_page(page_no):
+            return pages(page_no)
+
+        self.assertEqual(self.collect(AsyncPageIterator(fetch_page, 5, max_pages=2)), list(range(10)))
+        self.assertEqual(self.collect(AsyncPageIterator(fetch_page, 5, max_items=7)), list(range(7)))
+        self.assertEqual(pages.requested, [1, 2, 1, 2])
+
+    def test_early_stop_cancels_the_prefetch(self):
+        pages = FakePages()
+        cancelled = []
+
+        async def fetch_page(page_no):
+            if page_no > 1:
+                try:
+                    await asyncio.sleep(5)
+                except asyncio.CancelledError:
+                    cancelled.append(page_no)
+                    raise
+            return pages(page_no)
+
+        async def main():
+            iterator = AsyncPageIterator(fetch_page, 5).__aiter__()
+            first = await iterator.__anext__()
+            # Let the prefetch start before the iteration is closed
+            await asyncio.sleep(0)
+            await iterator.aclose()
+            await asyncio.sleep(0)
+            return first
+
+        self.assertEqual(asyncio.run(main()), 0)
+        self.assertEqual(cancelled, [2])
+
+
+class SearchProductsBulkTest(unittest.TestCase):
+
+    def test_pages_are_merged_in_order_in_the_caller_context(self):
+        api = AliexpressApi('key', 'secret', models.Language.EN, models.Currency.EUR)
+        priorities = []
+
+        def fake_call(call):
+            priorities.append(get_request_priority())
+            page_no = call.request.page_no
+            # Consecutive pages overlap by one product
+            products = [models.Product(product_id=product_id)
+                        for product_id in range(page_no * 2 - 2, page_no * 2 + 1)]
+            return call.parse(SimpleNamespace(current_record_count=len(products), total_record_count=100,
+                                              products=SimpleNamespace(product=products)))
+
+        api._call = fake_call
+        with request_priority(BACKGROUND):
+            products = api.search_products_bulk('x', pages=3, page_size=3, max_workers=3)
+        self.assertEqual([product.product_id for product in products], list(range(7)))
+        self.assertEqual(priorities, [BACKGROUND] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
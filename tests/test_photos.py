@@ -0,0 +1,67 @@
+"""Detection of rejected ``file_id`` errors and the fallback of ``PhotoCache``."""
+
+import unittest
+from types import SimpleNamespace
+
+from services.photos import PhotoCache, is_invalid_file_id_error
+
+
+class TelegramError(Exception):
+
+    def __init__(self, description, error_code=400):
+        super().__init__(description)
+        self.description = description
+        self.error_code = error_code
+
+
+class IsInvalidFileIdErrorTest(unittest.TestCase):
+
+    def test_file_id_errors(self):
+        for description in ('Bad Request: wrong file identifier/HTTP URL specified',
+                            'Bad Request: wrong remote file identifier specified: Wrong padding length',
+                            'Bad Request: wrong file_id or the file is temporarily unavailable'):
+            with self.subTest(description=description):
+                self.assertTrue(is_invalid_file_id_error(TelegramError(description)))
+
+    def test_other_errors(self):
+        for error in (TelegramError('Bad Request: message text is empty'),
+                      TelegramError('Bad Request: file is too big'),
+                      TelegramError('Bad Request: failed to get HTTP URL content'),
+                      TelegramError('Bad Request: wrong file identifier', error_code=429),
+                      ValueError('wrong file identifier')):
+            with self.subTest(error=error):
+                self.assertFalse(is_invalid_file_id_error(error))
+
+
+class PhotoCacheTest(unittest.TestCase):
+
+    def test_rejected_file_id_is_sent_again_from_its_url(self):
+        photos = PhotoCache()
+        photos.set('https://example.com/1.jpg', 'stale')
+        sent = []
+
+        def send(chat_id, photo, **kwargs):
+            sent.append(photo)
+            if photo == 'stale':
+                raise TelegramError('Bad Request: wrong file identifier/HTTP URL specified')
+            return SimpleNamespace(photo=[SimpleNamespace(file_id='small'), SimpleNamespace(file_id='fresh')])
+
+        photos.send_photo(send, 10, 'https://example.com/1.jpg')
+        self.assertEqual(sent, ['stale', 'https://example.com/1.jpg'])
+        self.assertEqual(photos.get('https://example.com/1.jpg'), 'fresh')
+        self.assertEqual(photos.stats()['invalidated'], 1)
+
+    def test_other_errors_are_raised(self):
+        photos = PhotoCache()
+        photos.set('https://example.com/1.jpg', 'cached')
+
+        def send(chat_id, photo, **kwargs):
+            raise TelegramError('Bad Request: file is too big')
+
+        with self.assertRaises(TelegramError):
+            photos.send_photo(send, 10, 'https://example.com/1.jpg')
+        self.assertEqual(photos.get('https://example.com/1.jpg'), 'cached')
+
+
+if __name__ == '__main__':
+    unittest.main()
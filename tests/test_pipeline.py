@@ -0,0 +1,58 @@
+"""Stage results and aggregated timings of ``Pipeline``."""
+
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from services.pipeline import Pipeline, PipelineStats
+
+
+def failing_stage():
+    raise ValueError('stage error')
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.release = threading.Event()
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(self.release.set)
+
+    def run_pipeline(self, stats):
+        pipeline = Pipeline(self.executor, stats=stats)
+        pipeline.add('fast', lambda: 'value', timeout=1)
+        pipeline.add('failing', failing_stage, timeout=1)
+        pipeline.add('slow', self.release.wait, 5, timeout=0.02)
+        return pipeline.results()
+
+    def test_stage_results(self):
+        stages = self.run_pipeline(PipelineStats())
+        self.assertTrue(stages['fast'].ok)
+        self.assertEqual(stages['fast'].value, 'value')
+        self.assertIsInstance(stages['failing'].error, ValueError)
+        self.assertTrue(stages['slow'].timed_out)
+        self.assertGreaterEqual(stages['slow'].elapsed, 0.02)
+        self.assertLess(stages['fast'].elapsed, stages['slow'].elapsed)
+
+    def test_timings_are_recorded(self):
+        stats = PipelineStats()
+        self.run_pipeline(stats)
+        self.run_pipeline(stats)
+
+        summary = stats.stats()
+        self.assertEqual(summary['runs'], 2)
+        self.assertGreaterEqual(summary['avg_ms'], 20)
+        self.assertEqual(set(summary['stages']), {'fast', 'failing', 'slow'})
+        self.assertEqual(summary['stages']['fast'],
+                         dict(summary['stages']['fast'], count=2, timeouts=0, errors=0))
+        self.assertEqual(summary['stages']['failing']['errors'], 2)
+        self.assertEqual(summary['stages']['slow']['timeouts'], 2)
+        self.assertGreaterEqual(summary['stages']['slow']['max_ms'], 20)
+
+    def test_empty_stats(self):
+        self.assertEqual(PipelineStats().stats(), {'runs': 0, 'avg_ms': 0.0, 'stages': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""URL shapes seen in shared AliExpress links and the product ID expected from each."""
+
+import unittest
+
+from aliexpress_api.errors import ProductIdNotFoundException
+from aliexpress_api.tools import find_product_id, get_product_id, is_short_link
+
+
+# (text, product ID found offline, or None when the link must be resolved)
+PRODUCT_ID_CORPUS = [
+    ('1005006123456789', '1005006123456789'),
+    ('https://www.aliexpress.com/item/1005006123456789.html', '1005006123456789'),
+    ('https://ar.aliexpress.com/item/1005006123456789.html?spm=a2g0o.home.0.0&gatewayAdapt=glo2ara',
+     '1005006123456789'),
+    ('https://m.aliexpress.com/item/1005006123456789.html?pdp_npi=4%40dis%21EUR', '1005006123456789'),
+    ('https://aliexpress.ru/item/1005006123456789.html?sku_id=12000036000000000', '1005006123456789'),
+    ('https://www.aliexpress.com/item/32812345678.html', '32812345678'),
+    ('https://www.aliexpress.com/item/1005006123456789', '1005006123456789'),
+    ('https://www.aliexpress.com/item/1005006123456789?srcSns=sns_Copy', '1005006123456789'),
+    ('https://m.aliexpress.com/p/coin-index/index.html?productIds=1005006123456789', '1005006123456789'),
+    ('https://m.aliexpress.com/_m/1005006123456789', '1005006123456789'),
+    ('https://www.aliexpress.com/product/1005006123456789.html', '1005006123456789'),
+    ('https://www.aliexpress.us/1005006123456789.html', '1005006123456789'),
+    ('https://star.aliexpress.com/share/share.htm?redirectUrl=x&id=1005006123456789', '1005006123456789'),
+    ('https://sale.aliexpress.com/__pc/bundle.htm?itemIds=1005006123456789', '1005006123456789'),
+    ('https://sale.aliexpress.com/__pc/3.0/sale.htm', None),
+    ('https://www.aliexpress.com/store/912345.html', None),
+    ('https://www.aliexpress.com/store/912345', None),
+    ('https://s.click.aliexpress.com/e/_DlXyZab', None),
+    ('https://a.aliexpress.com/_mKp1AbC', None),
+    ('https://www.aliexpress.com/', None),
+]
+
+SHORT_LINKS = [
+    ('https://s.click.aliexpress.com/e/_DlXyZab', True),
+    ('https://a.aliexpress.com/_mKp1AbC', True),
+    ('https://www.aliexpress.com/item/1005006123456789.html', False),
+]
+
+
+class FindProductIdTest(unittest.TestCase):
+
+    def test_corpus(self):
+        for text, expected in PRODUCT_ID_CORPUS:
+            with self.subTest(text=text):
+                self.assertEqual(find_product_id(text), expected)
+
+    def test_short_links(self):
+        for url, expected in SHORT_LINKS:
+            with self.subTest(url=url):
+                self.assertEqual(is_short_link(url), expected)
+
+
+class GetProductIdTest(unittest.TestCase):
+
+    def test_corpus(self):
+        for text, expected in PRODUCT_ID_CORPUS:
+            if expected is not None:
+                with self.subTest(text=text):
+                    self.assertEqual(get_product_id(text), expected)
+
+    def test_legacy_extension_rule(self):
+        self.assertEqual(get_product_id('https://www.aliexpress.com/32812345.htm'), '32812345')
+
+    def test_not_found(self):
+        with self.assertRaises(ProductIdNotFoundException):
+            get_product_id('https://s.click.aliexpress.com/e/_DlXyZab')
+
+
+if __name__ == '__main__':
+    unittest.main()
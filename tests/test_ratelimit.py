@@ -0,0 +1,151 @@
+"""Token buckets, the priority queue and the async acquire of ``RateLimiter``."""
+
+import asyncio
+import contextvars
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from aliexpress_api.errors import RateLimitTimeoutException
+from aliexpress_api.helpers.pagination import PageIterator
+from aliexpress_api.ratelimit import BACKGROUND, INTERACTIVE, RateLimiter, TokenBucket, _Waiter, \
+    get_request_priority, request_priority
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_refills_at_rate_up_to_capacity(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        now = bucket._updated_at
+        for _ in range(2):
+            self.assertEqual(bucket.wait_time(now), 0)
+            bucket.take()
+        self.assertAlmostEqual(bucket.wait_time(now), 0.1)
+        self.assertAlmostEqual(bucket.wait_time(now + 0.05), 0.05)
+        self.assertEqual(bucket.wait_time(now + 0.11), 0)
+
+        # An idle bucket holds no more than its capacity
+        now += 100
+        for _ in range(2):
+            self.assertEqual(bucket.wait_time(now), 0)
+            bucket.take()
+        self.assertGreater(bucket.wait_time(now), 0)
+
+    def test_capacity_defaults_to_the_rate(self):
+        self.assertEqual(TokenBucket(rate=5).capacity, 5)
+        self.assertEqual(TokenBucket(rate=0.5).capacity, 1)
+
+
+class RateLimiterTest(unittest.TestCase):
+
+    def test_waiters_are_ordered_by_priority_then_arrival(self):
+        waiters = [_Waiter(BACKGROUND, 0, 'm'), _Waiter(INTERACTIVE, 2, 'm'), _Waiter(INTERACTIVE, 1, 'm')]
+        ordered = sorted(waiters, key=lambda waiter: sum(other.goes_before(waiter) for other in waiters))
+        self.assertEqual([(waiter.priority, waiter.sequence) for waiter in ordered],
+                         [(INTERACTIVE, 1), (INTERACTIVE, 2), (BACKGROUND, 0)])
+
+    def test_interactive_calls_go_before_queued_background_calls(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        limiter.acquire('m')
+        served = []
+
+        def acquire(priority):
+            limiter.acquire('m', priority)
+            served.append(priority)
+
+        background = threading.Thread(target=acquire, args=(BACKGROUND,))
+        background.start()
+        time.sleep(0.01)
+        interactive = threading.Thread(target=acquire, args=(INTERACTIVE,))
+        interactive.start()
+        background.join()
+        interactive.join()
+        self.assertEqual(served, [INTERACTIVE, BACKGROUND])
+
+    def test_method_budgets_are_separate(self):
+        limiter = RateLimiter(method_rates={'slow': 1})
+        limiter.acquire('slow')
+        with self.assertRaises(RateLimitTimeoutException):
+            limiter.acquire('slow', timeout=0.01)
+        self.assertLess(limiter.acquire('fast', timeout=0.01), 0.01)
+
+    def test_priority_of_the_context(self):
+        limiter = RateLimiter(rate=1000)
+        with request_priority(BACKGROUND):
+            limiter.acquire('m')
+        limiter.acquire('m')
+        self.assertEqual(set(limiter.stats()['priorities']), {INTERACTIVE, BACKGROUND})
+
+
+class RequestPriorityTest(unittest.TestCase):
+
+    def test_copied_context_is_inherited_by_workers(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            with request_priority(BACKGROUND):
+                inherited = executor.submit(contextvars.copy_context().run, get_request_priority)
+                plain = executor.submit(get_request_priority)
+            self.assertEqual(inherited.result(), BACKGROUND)
+            self.assertEqual(plain.result(), INTERACTIVE)
+        self.assertEqual(get_request_priority(), INTERACTIVE)
+
+    def test_prefetched_pages_keep_the_priority(self):
+        priorities = []
+
+        def fetch_page(page_no):
+            priorities.append(get_request_priority())
+            return list(range(5)), 15
+
+        with request_priority(BACKGROUND):
+            self.assertEqual(len(list(PageIterator(fetch_page, 5))), 15)
+        self.assertEqual(priorities, [BACKGROUND] * 3)
+
+
+class AsyncAcquireTest(unittest.TestCase):
+
+    def test_waits_for_the_next_token(self):
+        limiter = RateLimiter(rate=20, burst=1)
+
+        async def main():
+            await limiter.async_acquire('m')
+            return await limiter.async_acquire('m')
+
+        self.assertGreater(asyncio.run(main()), 0.03)
+        self.assertEqual(limiter.stats()['methods']['m']['calls'], 2)
+
+    def test_cancelled_call_takes_no_token(self):
+        limiter = RateLimiter(rate=10, burst=1)
+        limiter.acquire('m')
+
+        async def main():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(limiter.async_acquire('m'), 0.01)
+            # Past the refill of the token a cancelled call could have taken
+            await asyncio.sleep(0.15)
+
+        asyncio.run(main())
+        self.assertEqual(limiter.stats()['waiting'], 0)
+        self.assertLess(limiter.acquire('m', timeout=0.01), 0.01)
+
+    def test_timeout(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        limiter.acquire('m')
+        with self.assertRaises(RateLimitTimeoutException):
+            asyncio.run(limiter.async_acquire('m', timeout=0.01))
+
+    def test_woken_by_a_blocking_caller(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        limiter.acquire('m')
+        blocking = threading.Thread(target=limiter.acquire, args=('m',))
+        blocking.start()
+        time.sleep(0.01)
+        # Queued behind the thread, the coroutine has no token to wait for: only the
+        # wakeup sent when the thread leaves the queue lets it go on
+        started_at = time.monotonic()
+        asyncio.run(limiter.async_acquire('m', timeout=1))
+        blocking.join()
+        self.assertLess(time.monotonic() - started_at, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+"""Transient error classification, circuit breaker states and the retry loop."""
+
+import asyncio
+import http.client
+import ssl
+import unittest
+from unittest import mock
+
+from aliexpress_api import retry
+from aliexpress_api.errors import ApiRequestException, CircuitOpenException
+from aliexpress_api.helpers.requests import async_send_request, send_request
+from aliexpress_api.retry import CircuitBreaker, RetryPolicy, is_transient_error
+from aliexpress_api.skd.api.base import RequestException, TopException
+
+
+def top_exception(errorcode=None, subcode=None):
+    error = TopException()
+    error.errorcode = errorcode
+    error.subcode = subcode
+    return error
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class IsTransientErrorTest(unittest.TestCase):
+
+    def test_classification(self):
+        cases = [
+            (top_exception('7'), True),
+            (top_exception('ServiceUnavailable'), True),
+            (top_exception('15', 'isp.top-remote-connection-timeout'), True),
+            (top_exception('15', 'isv.invalid-parameter'), False),
+            (top_exception('7', 'isv.invalid-parameter'), False),
+            (top_exception('25'), False),
+            (RequestException('invalid http status 503', status=503), True),
+            (RequestException('invalid http status 429', status=429), True),
+            (RequestException('invalid http status 404', status=404), False),
+            (RequestException('invalid http status 5'), False),
+            (ConnectionResetError(), True),
+            (TimeoutError(), True),
+            (asyncio.TimeoutError(), True),
+            (http.client.RemoteDisconnected(), True),
+            (ssl.SSLCertVerificationError(), False),
+            (ssl.SSLError(), False),
+            (ssl.SSLEOFError(), True),
+            (ValueError(), False),
+        ]
+        for error, transient in cases:
+            with self.subTest(error=repr(error)):
+                self.assertIs(is_transient_error(error), transient)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(retry, 'time', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker(failure_threshold=2, recovery_time=30)
+
+    def state(self):
+        return self.breaker.stats()['m']['state']
+
+    def open_circuit(self):
+        self.breaker.record_failure('m', ConnectionResetError())
+        self.breaker.record_failure('m', ConnectionResetError())
+
+    def test_opens_after_consecutive_transient_failures(self):
+        self.breaker.record_failure('m', ConnectionResetError())
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker.before_request('m'))
+        self.breaker.record_failure('m', ConnectionResetError())
+        self.assertEqual(self.state(), CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenException):
+            self.breaker.before_request('m')
+        self.assertEqual(self.breaker.stats()['m']['rejected'], 1)
+
+    def test_permanent_error_resets_the_failures(self):
+        self.breaker.record_failure('m', ConnectionResetError())
+        self.breaker.record_failure('m', top_exception('15', 'isv.invalid-parameter'))
+        self.breaker.record_failure('m', ConnectionResetError())
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+
+    def test_half_open_trial_success_closes(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.before_request('m'))
+        self.assertEqual(self.state(), CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(CircuitOpenException):
+            self.breaker.before_request('m')
+        self.breaker.record_success('m')
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+        self.assertFalse(self.breaker.before_request('m'))
+
+    def test_half_open_trial_failure_opens_again(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.breaker.before_request('m')
+        self.breaker.record_failure('m', ConnectionResetError())
+        self.assertEqual(self.state(), CircuitBreaker.OPEN)
+        self.clock.now += 29
+        with self.assertRaises(CircuitOpenException):
+            self.breaker.before_request('m')
+
+    def test_released_trial_lets_the_next_call_through(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.assertTrue(self.breaker.before_request('m'))
+        self.breaker.release_trial('m')
+        self.assertEqual(self.state(), CircuitBreaker.OPEN)
+        self.assertTrue(self.breaker.before_request('m'))
+
+    def test_release_after_outcome_does_nothing(self):
+        self.open_circuit()
+        self.clock.now += 30
+        self.breaker.before_request('m')
+        self.breaker.record_success('m')
+        self.breaker.release_trial('m')
+        self.assertEqual(self.state(), CircuitBreaker.CLOSED)
+
+
+class FlakySend:
+    """Raises the given errors, then returns 'ok'."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return 'ok'
+
+
+class SendRequestTest(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+    def test_transient_errors_are_retried(self):
+        send = FlakySend(ConnectionResetError(), RequestException('status 503', status=503))
+        self.assertEqual(send_request(send, 'm', retry_policy=self.policy), 'ok')
+        self.assertEqual(send.calls, 3)
+        self.assertEqual(self.policy.retries, 2)
+
+    def test_attempts_are_limited(self):
+        send = FlakySend(*[ConnectionResetError()] * 3)
+        with self.assertRaises(ApiRequestException):
+            send_request(send, 'm', retry_policy=self.policy)
+        self.assertEqual(send.calls, 3)
+        self.assertEqual(self.policy.retries, 2)
+
+    def test_permanent_errors_are_not_retried(self):
+        send = FlakySend(top_exception('15', 'isv.invalid-parameter'))
+        with self.assertRaises(ApiRequestException):
+            send_request(send, 'm', retry_policy=self.policy)
+        self.assertEqual(send.calls, 1)
+        self.assertEqual(self.policy.retries, 0)
+
+    def test_no_policy_no_retry(self):
+        send = FlakySend(ConnectionResetError())
+        with self.assertRaises(ApiRequestException):
+            send_request(send, 'm')
+        self.assertEqual(send.calls, 1)
+
+    def test_open_circuit_stops_the_retries(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_time=30)
+        send = FlakySend(ConnectionResetError(), ConnectionResetError())
+        with self.assertRaises(CircuitOpenException):
+            send_request(send, 'm', retry_policy=self.policy, circuit_breaker=breaker)
+        self.assertEqual(send.calls, 2)
+
+    def test_interrupted_trial_is_released(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        breaker.record_failure('m', ConnectionResetError())
+        with self.assertRaises(KeyboardInterrupt):
+            send_request(FlakySend(KeyboardInterrupt()), 'm', circuit_breaker=breaker)
+        self.assertEqual(breaker.stats()['m']['state'], CircuitBreaker.OPEN)
+        self.assertEqual(send_request(FlakySend(), 'm', circuit_breaker=breaker), 'ok')
+        self.assertEqual(breaker.stats()['m']['state'], CircuitBreaker.CLOSED)
+
+
+class AsyncSendRequestTest(unittest.TestCase):
+
+    def test_transient_errors_are_retried(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+        flaky = FlakySend(ConnectionResetError())
+
+        async def send():
+            return flaky()
+
+        self.assertEqual(asyncio.run(async_send_request(send, 'm', retry_policy=policy)), 'ok')
+        self.assertEqual(flaky.calls, 2)
+        self.assertEqual(policy.retries, 1)
+
+    def test_cancelled_trial_is_released(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+        breaker.record_failure('m', ConnectionResetError())
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def main():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(async_send_request(hang, 'm', circuit_breaker=breaker), 0.01)
+            self.assertEqual(breaker.stats()['m']['state'], CircuitBreaker.OPEN)
+
+            async def ok():
+                return 'ok'
+            return await async_send_request(ok, 'm', circuit_breaker=breaker)
+
+        self.assertEqual(asyncio.run(main()), 'ok')
+        self.assertEqual(breaker.stats()['m']['state'], CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Incremental parsing of streamed responses, whatever the chunk boundaries."""
+
+import json
+import unittest
+
+from aliexpress_api.skd.api.stream import JsonItemParser
+
+
+PATH = ('r', 'result', 'items')
+ITEMS = [
+    {'id': 1005006000000001, 'price': 1.5, 'rate': -2.5e-3, 'big': 1E+21, 'title': 'café ☕ \U0001f600',
+     'escaped': 'a "quoted" \\ back\nslash', 'flags': [True, False, None], 'nested': {'a': [[], {}]}},
+    {'id': 0, 'price': 10, 'title': ''},
+    {'id': -7, 'price': 0.125, 'title': 'x'},
+]
+DOCUMENT = ('{"r": {"code": 200, "result": {"count": 3, "items": %s, "ratio": 0.75, "ok": true}}, '
+            '"x": 1.5, "y": -12e3, "z": null, "name": "\\u00e9t\\u00e9"}') % json.dumps(ITEMS)
+
+
+def expected_envelope(document):
+    envelope = json.loads(document)
+    del envelope['r']['result']['items']
+    return envelope
+
+
+def parse(chunks):
+    parser = JsonItemParser(PATH)
+    items = []
+    for chunk in chunks:
+        items.extend(parser.feed(chunk))
+    items.extend(parser.close())
+    return parser, items
+
+
+class JsonItemParserTest(unittest.TestCase):
+
+    def test_split_at_every_offset(self):
+        for document in (DOCUMENT, json.dumps(json.loads(DOCUMENT), indent=2),
+                         json.dumps(json.loads(DOCUMENT), ensure_ascii=False)):
+            data = document.encode('utf-8')
+            for offset in range(len(data) + 1):
+                with self.subTest(offset=offset):
+                    parser, items = parse([data[:offset], data[offset:]])
+                    self.assertEqual(items, ITEMS)
+                    self.assertEqual(parser.envelope, expected_envelope(document))
+                    self.assertEqual(parser.items, len(ITEMS))
+
+    def test_byte_by_byte(self):
+        data = DOCUMENT.encode('utf-8')
+        parser, items = parse([data[i:i + 1] for i in range(len(data))])
+        self.assertEqual(items, ITEMS)
+        self.assertEqual(parser.envelope, expected_envelope(DOCUMENT))
+
+    def test_items_are_returned_as_soon_as_complete(self):
+        data = DOCUMENT.encode('utf-8')
+        end_of_first = data.index(b'}, {"id": 0') + 1
+        parser = JsonItemParser(PATH)
+        self.assertEqual(parser.feed(data[:end_of_first + 1]), ITEMS[:1])
+
+    def test_object_hook(self):
+        parser = JsonItemParser(PATH, object_hook=lambda values: tuple(sorted(values)))
+        items = parser.feed(DOCUMENT.encode('utf-8')) + parser.close()
+        self.assertEqual(items[1], ('id', 'price', 'title'))
+
+    def test_number_at_end_of_document(self):
+        parser, items = parse([b'{"r": {"result": {"items": [1, 2.5]}}, "x": 1', b'.5}'])
+        self.assertEqual(items, [1, 2.5])
+        self.assertEqual(parser.envelope['x'], 1.5)
+
+    def test_malformed_item_fails_before_close(self):
+        parser = JsonItemParser(PATH)
+        with self.assertRaises(ValueError):
+            parser.feed(b'{"r": {"result": {"items": [{"id": 1}, {"id": x')
+
+    def test_malformed_number_fails_before_close(self):
+        parser = JsonItemParser(PATH)
+        with self.assertRaises(ValueError):
+            parser.feed(b'{"r": {"result": {"items": [{"id": 1.2.3}, ')
+
+    def test_malformed_envelope_fails_before_close(self):
+        parser = JsonItemParser(PATH)
+        with self.assertRaises(ValueError):
+            parser.feed(b'{"r": {"code": tru, "result": {"items": []}}}')
+
+    def test_incomplete_document(self):
+        parser = JsonItemParser(PATH)
+        parser.feed(b'{"r": {"result": {"items": [{"id": 1}')
+        with self.assertRaises(ValueError):
+            parser.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+"""HTTPS keep-alive and TLS session resumption of the connection pool, against a local server.
+
+The server uses the self-signed certificate of ``localhost.pem``, which the client
+context trusts as its only CA.
+"""
+
+import os
+import ssl
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from aliexpress_api.skd.api.pool import ConnectionPool
+
+
+CERTIFICATE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'localhost.pem')
+BODY = b'{"ok": true}'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class TLSConnectionPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(CERTIFICATE)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        cls.server.daemon_threads = True
+        cls.server.socket = context.wrap_socket(cls.server.socket, server_side=True)
+        cls.port = cls.server.server_address[1]
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def new_pool(self, **kwargs):
+        pool = ConnectionPool(ssl_context=ssl.create_default_context(cafile=CERTIFICATE), **kwargs)
+        self.addCleanup(pool.clear)
+        return pool
+
+    def post(self, pool):
+        response, data = pool.request('https', 'localhost', self.port, 'POST', '/router/rest', body=b'a=1',
+                                      headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        self.assertEqual(response.status, 200)
+        self.assertEqual(data, BODY)
+
+    def test_keep_alive_reuses_one_connection(self):
+        pool = self.new_pool()
+        for _ in range(5):
+            self.post(pool)
+        stats = pool.stats()
+        self.assertEqual(stats['opened'], 1)
+        self.assertEqual(stats['tls_handshakes'], 1)
+        self.assertEqual(stats['tls_resumed'], 0)
+        self.assertEqual(stats['idle'], 1)
+
+    def test_new_connections_resume_the_tls_session(self):
+        # Idle connections are never reused, every request opens a connection
+        pool = self.new_pool(idle_timeout=-1)
+        for _ in range(5):
+            self.post(pool)
+        stats = pool.stats()
+        self.assertEqual(stats['opened'], 5)
+        self.assertEqual(stats['tls_handshakes'], 5)
+        self.assertEqual(stats['tls_resumed'], 4)
+
+    def test_untrusted_certificate_is_rejected(self):
+        pool = ConnectionPool(ssl_context=ssl.create_default_context())
+        with self.assertRaises(ssl.SSLCertVerificationError):
+            pool.request('https', 'localhost', self.port, 'POST', '/router/rest', body=b'a=1')
+        self.assertEqual(pool.stats()['tls_handshakes'], 0)
+
+
+class ConnectionPoolTest(unittest.TestCase):
+
+    def test_opened_connections_are_counted_across_threads(self):
+        pool = ConnectionPool()
+
+        def open_connections():
+            for _ in range(1000):
+                pool.new_connection(('http', 'localhost', 80), timeout=1)
+
+        threads = [threading.Thread(target=open_connections) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(pool.stats()['opened'], 8000)
+
+
+if __name__ == '__main__':
+    unittest.main()
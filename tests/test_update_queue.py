@@ -0,0 +1,82 @@
+"""Per-chat ordering and backpressure of ``UpdateQueue``."""
+
+import random
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from services.update_queue import DUPLICATE, FULL, QUEUED, UpdateQueue
+
+
+def make_update(update_id, chat_id):
+    return SimpleNamespace(update_id=update_id, message=SimpleNamespace(chat=SimpleNamespace(id=chat_id)))
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('Timed out')
+        time.sleep(0.005)
+
+
+class UpdateQueueTest(unittest.TestCase):
+
+    def test_updates_of_a_chat_are_handled_in_order(self):
+        handled = {}
+        lock = threading.Lock()
+
+        def handler(update):
+            time.sleep(random.uniform(0, 0.002))
+            with lock:
+                handled.setdefault(update.message.chat.id, []).append(update.update_id)
+
+        updates = UpdateQueue(handler, workers=4)
+        updates.start()
+        update_ids = {}
+        for update_id in range(1, 121):
+            chat_id = update_id % 6
+            update_ids.setdefault(chat_id, []).append(update_id)
+            self.assertEqual(updates.submit(make_update(update_id, chat_id)), QUEUED)
+
+        wait_for(lambda: updates.stats()['processed'] == 120)
+        self.assertEqual(handled, update_ids)
+
+    def test_full_queue_rejects_without_blocking(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        updates = UpdateQueue(lambda update: release.wait(5), workers=1, max_size=1)
+        updates.start()
+        self.assertEqual(updates.submit(make_update(1, 10)), QUEUED)
+        wait_for(lambda: updates.stats()['depth'] == 0)
+        # The worker is busy with the first update, the second one fills the queue
+        self.assertEqual(updates.submit(make_update(2, 10)), QUEUED)
+        self.assertEqual(updates.submit(make_update(3, 10)), FULL)
+        self.assertEqual(updates.stats()['rejected'], 1)
+
+        release.set()
+        wait_for(lambda: updates.stats()['processed'] == 2)
+        # Telegram delivers the rejected update again
+        self.assertEqual(updates.submit(make_update(3, 10)), QUEUED)
+
+    def test_failing_handler_does_not_stop_the_worker(self):
+        def handler(update):
+            if update.update_id == 1:
+                raise ValueError('handler error')
+
+        updates = UpdateQueue(handler, workers=1)
+        updates.start()
+        updates.submit(make_update(1, 10))
+        updates.submit(make_update(2, 10))
+        wait_for(lambda: updates.stats()['processed'] == 1)
+        self.assertEqual(updates.stats()['failed'], 1)
+
+    def test_duplicates_are_dropped(self):
+        updates = UpdateQueue(lambda update: None, workers=1)
+        self.assertEqual(updates.submit(make_update(1, 10)), QUEUED)
+        self.assertEqual(updates.submit(make_update(1, 10)), DUPLICATE)
+
+
+if __name__ == '__main__':
+    unittest.main()